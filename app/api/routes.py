@@ -1,20 +1,29 @@
+import functools
 from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Request, Form
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
-from typing import List, Dict, Any
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
+from typing import List, Dict, Any, Optional
 from app.models.schema import (
     SchemaValidationRequest, 
     SchemaValidationResponse, 
+    BatchValidationRequest,
+    BatchValidationResponse,
+    ValidationJob,
     BestPractice,
-    SchemaType
+    SchemaType,
+    AnalysisMode
 )
 from app.services.ai_service import AIService
 from app.services.vector_store import VectorStoreService
-from app.core.config import settings, SUPPORTED_SCHEMA_TYPES
+from app.services.cache import generate_schema_id
+from app.services.job_queue import JobQueue, JobStore
+from app.services.circuit_breaker import CircuitBreaker, ProviderUnavailableError
+from app.core.config import settings, SUPPORTED_SCHEMA_TYPES, SUPPORTED_GPT_MODELS, SUPPORTED_CLAUDE_MODELS
 from app.core.auth import auth_manager, require_admin_auth, is_authenticated
+from app.core.usage import usage_tracker
 from loguru import logger
-import hashlib
 import datetime
-from pydantic import BaseModel
+import json
+from pydantic import BaseModel, Field
 
 router = APIRouter()
 
@@ -26,16 +35,28 @@ class ModelConfigResponse(BaseModel):
     current_model: str
     message: str = None
 
+class RoutingConfigRequest(BaseModel):
+    enabled: Optional[bool] = None
+    score_threshold: Optional[float] = Field(None, gt=0)
+    fast_model: Optional[str] = None
+    claude_fast_model: Optional[str] = None
+
 # Initialize services with error handling
 vector_store = VectorStoreService()
 
 try:
-    ai_service = AIService()
+    ai_service = AIService(vector_store=vector_store)
     logger.info("AI service initialized successfully")
 except Exception as e:
     logger.warning(f"AI service initialization failed: {e}")
     ai_service = None
 
+try:
+    job_queue = JobQueue(ai_service, JobStore()) if ai_service else None
+except Exception as e:
+    logger.warning(f"Job queue initialization failed: {e}")
+    job_queue = None
+
 
 @router.post("/validate", response_model=SchemaValidationResponse)
 async def validate_schema(request: SchemaValidationRequest):
@@ -60,26 +81,158 @@ async def validate_schema(request: SchemaValidationRequest):
         response = await ai_service.analyze_schema(request)
         
         # Generate schema ID for tracking
-        schema_hash = hashlib.md5(request.schema_content.encode()).hexdigest()
-        response.schema_id = f"{request.schema_type.value}_{schema_hash[:8]}"
+        response.schema_id = generate_schema_id(request)
         
         logger.info(f"Schema validation completed with ID: {response.schema_id}")
         return response
         
+    except ProviderUnavailableError as e:
+        logger.warning(f"Rejecting schema validation, AI provider unavailable: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"AI provider temporarily unavailable: {str(e)}",
+            headers={"Retry-After": str(max(1, int(e.retry_after)))}
+        )
     except Exception as e:
         logger.error(f"Error validating schema: {e}")
         raise HTTPException(status_code=500, detail=f"Schema validation failed: {str(e)}")
 
 
+@router.post("/validate/stream")
+async def validate_schema_stream(request: SchemaValidationRequest) -> StreamingResponse:
+    """
+    Validate a schema and stream the analysis as Server-Sent Events.
+    
+    Emits a `recommendation` event for each recommendation as soon as it is
+    complete, then a final `result` event with the full response (score,
+    summary and schema ID). Failures are reported as an `error` event.
+    """
+    if ai_service is None:
+        raise HTTPException(status_code=503, detail="AI service is not available. Please check server configuration.")
+    
+    if not request.schema_content.strip():
+        raise HTTPException(status_code=400, detail="Schema content cannot be empty")
+    
+    logger.info(f"Received streaming schema validation request for type: {request.schema_type}")
+    
+    schema_id = generate_schema_id(request)
+    
+    async def event_stream():
+        yield _format_sse("start", {"schema_id": schema_id})
+        async for event, data in ai_service.analyze_schema_stream(request):
+            if event == "result":
+                data["schema_id"] = schema_id
+            yield _format_sse(event, data)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format a Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/validate/batch", response_model=BatchValidationResponse)
+async def validate_schema_batch(batch: BatchValidationRequest, stream: bool = False):
+    """
+    Validate many schemas in one request with bounded concurrency.
+    
+    Items are analyzed concurrently (up to `concurrency`, capped by server
+    configuration) under the provider rate limits. A failing item is reported
+    in its own result and does not fail the batch. With `stream=true` results
+    are returned as NDJSON, one line per item in completion order.
+    """
+    if ai_service is None:
+        raise HTTPException(status_code=503, detail="AI service is not available. Please check server configuration.")
+    
+    if len(batch.items) > settings.batch_max_items:
+        raise HTTPException(status_code=400, detail=f"Batch too large. Maximum is {settings.batch_max_items} items")
+    
+    concurrency = min(batch.concurrency or settings.batch_default_concurrency, settings.batch_max_concurrency)
+    logger.info(f"Received batch validation request with {len(batch.items)} items (concurrency {concurrency})")
+    
+    def with_schema_id(item_result):
+        if item_result.result is not None:
+            item_result.result.schema_id = generate_schema_id(batch.items[item_result.index])
+        return item_result
+    
+    if stream:
+        async def ndjson_stream():
+            async for item_result in ai_service.analyze_batch(batch.items, concurrency):
+                yield with_schema_id(item_result).model_dump_json() + "\n"
+        
+        return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+    
+    start_time = datetime.datetime.utcnow()
+    results = [
+        with_schema_id(item_result)
+        async for item_result in ai_service.analyze_batch(batch.items, concurrency)
+    ]
+    results.sort(key=lambda item_result: item_result.index)
+    succeeded = sum(1 for item_result in results if item_result.status == "success")
+    
+    logger.info(f"Batch validation completed: {succeeded}/{len(results)} succeeded")
+    return BatchValidationResponse(
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results,
+        processing_time=(datetime.datetime.utcnow() - start_time).total_seconds()
+    )
+
+
+@router.post("/jobs", response_model=ValidationJob, status_code=202)
+async def submit_validation_job(request: SchemaValidationRequest) -> ValidationJob:
+    """
+    Submit a schema for asynchronous validation.
+    
+    Returns a job ID immediately; poll `GET /jobs/{job_id}` for the result.
+    Jobs keep running if the client disconnects and survive service restarts.
+    """
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue is not available. Please check server configuration.")
+    
+    if not request.schema_content.strip():
+        raise HTTPException(status_code=400, detail="Schema content cannot be empty")
+    
+    try:
+        return await job_queue.submit(request)
+    except Exception as e:
+        logger.error(f"Error submitting validation job: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to submit validation job: {str(e)}")
+
+
+@router.get("/jobs/{job_id}", response_model=ValidationJob)
+async def get_validation_job(job_id: str, wait: float = 0) -> ValidationJob:
+    """
+    Get the status and result of a validation job.
+    
+    Set `wait` (seconds) to long-poll until the job finishes or the wait expires.
+    """
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue is not available. Please check server configuration.")
+    
+    job = await job_queue.get(job_id, wait=min(max(wait, 0), settings.job_long_poll_max))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Validation job not found")
+    return job
+
+
 @router.post("/validate/simple")
 async def validate_schema_simple(
     schema_content: str,
-    schema_type: SchemaType
+    schema_type: SchemaType,
+    analysis_mode: Optional[AnalysisMode] = None
 ) -> Dict[str, Any]:
     """
     Get simple recommendations for a schema without full analysis.
     
     This is a lighter-weight endpoint that returns just a list of key recommendations.
+    In fast mode it answers from local rules alone, without calling the AI provider.
     """
     try:
         # Check if AI service is available
@@ -89,12 +242,14 @@ async def validate_schema_simple(
         if not schema_content.strip():
             raise HTTPException(status_code=400, detail="Schema content cannot be empty")
         
+        mode = analysis_mode or AnalysisMode(settings.analysis_mode)
         recommendations = await ai_service.get_schema_recommendations_only(
-            schema_content, schema_type
+            schema_content, schema_type, mode
         )
         
         return {
             "schema_type": schema_type.value,
+            "analysis_mode": mode.value,
             "recommendations": recommendations,
             "timestamp": datetime.datetime.utcnow().isoformat()
         }
@@ -187,17 +342,15 @@ async def get_best_practices(schema_type: SchemaType = None) -> List[Dict[str, A
     """
     try:
         if schema_type:
-            practices = vector_store.get_all_practices_for_schema_type(schema_type)
+            list_practices = functools.partial(vector_store.get_all_practices_for_schema_type, schema_type)
         else:
-            # Get all practices
-            all_results = vector_store.collection.get()
-            practices = []
-            for i, doc in enumerate(all_results["documents"]):
-                practices.append({
-                    "id": all_results["ids"][i],
-                    "content": doc,
-                    "metadata": all_results["metadatas"][i]
-                })
+            list_practices = vector_store.get_all_practices
+        
+        if vector_store.catalog.loaded:
+            practices = list_practices()
+        else:
+            # Without the catalog, listings query ChromaDB, which blocks
+            practices = await vector_store.run_in_executor(list_practices)
         
         return practices
         
@@ -214,12 +367,17 @@ async def add_best_practice(
 ) -> Dict[str, str]:
     """Add a new best practice to the vector store."""
     try:
-        success = vector_store.add_best_practice(practice)
+        if await vector_store.run_in_executor(vector_store.has_practice, practice.id):
+            raise HTTPException(status_code=409, detail=f"Best practice {practice.id} already exists")
+        
+        success = await vector_store.add_best_practice_async(practice)
         if success:
             return {"message": f"Best practice {practice.id} added successfully"}
         else:
             raise HTTPException(status_code=500, detail="Failed to add best practice")
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error adding best practice: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to add best practice: {str(e)}")
@@ -236,13 +394,17 @@ async def update_best_practice(
     try:
         # Ensure the practice ID matches
         practice.id = practice_id
+        if not await vector_store.run_in_executor(vector_store.has_practice, practice_id):
+            raise HTTPException(status_code=404, detail="Best practice not found")
         
-        success = vector_store.update_practice(practice)
+        success = await vector_store.update_practice_async(practice)
         if success:
             return {"message": f"Best practice {practice_id} updated successfully"}
         else:
             raise HTTPException(status_code=500, detail="Failed to update best practice")
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error updating best practice: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to update best practice: {str(e)}")
@@ -256,32 +418,43 @@ async def delete_best_practice(
 ) -> Dict[str, str]:
     """Delete a best practice from the vector store."""
     try:
-        success = vector_store.delete_practice(practice_id)
+        success = await vector_store.delete_practice_async(practice_id)
         if success:
             return {"message": f"Best practice {practice_id} deleted successfully"}
         else:
             raise HTTPException(status_code=404, detail="Best practice not found")
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error deleting best practice: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to delete best practice: {str(e)}")
 
 
 @router.get("/health")
-async def health_check() -> Dict[str, str]:
+async def health_check() -> Dict[str, Any]:
     """Health check endpoint."""
     try:
         # Test vector store connection
-        _ = vector_store.collection.count()
+        _ = await vector_store.run_in_executor(vector_store.collection.count)
         
         # Test AI service configuration
         ai_status = "available" if ai_service else "unavailable"
         ai_provider = ai_service.provider if ai_service else "none"
         
+        # Report degraded while the primary provider's circuit breaker is not closed
+        breakers = {
+            name: provider.breaker.state for name, provider in ai_service.providers.items()
+        } if ai_service else {}
+        status = "healthy"
+        if ai_service and ai_service.llm.breaker.state != CircuitBreaker.CLOSED:
+            status = "degraded"
+        
         return {
-            "status": "healthy",
+            "status": status,
             "ai_service": ai_status,
             "ai_provider": ai_provider,
+            "circuit_breakers": breakers,
             "timestamp": datetime.datetime.utcnow().isoformat()
         }
         
@@ -294,14 +467,28 @@ async def health_check() -> Dict[str, str]:
 async def get_service_stats() -> Dict[str, Any]:
     """Get service statistics."""
     try:
-        # Get vector store stats
-        collection_count = vector_store.collection.count()
-        
         return {
-            "total_best_practices": collection_count,
+            "total_best_practices": len(vector_store.catalog) if vector_store.catalog.loaded
+            else await vector_store.run_in_executor(vector_store.collection.count),
+            "best_practices": vector_store.catalog.get_stats(),
             "supported_schema_types": len(SchemaType),
             "ai_provider": ai_service.provider if ai_service else "none",
             "ai_service_status": "available" if ai_service else "unavailable",
+            "cache": ai_service.cache.get_stats() if ai_service else None,
+            "coalescing": ai_service.single_flight.get_stats() if ai_service else None,
+            "rate_limiter": ai_service.llm.rate_limiter.get_stats() if ai_service else None,
+            "prompt_cache": ai_service.llm.get_prompt_cache_stats() if ai_service else None,
+            "prompt_context": ai_service.prompt_builder.get_stats() if ai_service else None,
+            "embedding_cache": vector_store.get_embedding_cache_stats(),
+            "routing": ai_service.router.get_stats() if ai_service else None,
+            "resilience": ai_service.resilient_caller.get_stats() if ai_service else None,
+            "structured_output": ai_service.output_parser.get_stats() if ai_service else None,
+            "rule_engine": ai_service.rule_engine.get_stats() if ai_service else None,
+            "stage_latency": ai_service.get_stage_stats() if ai_service else None,
+            "providers": {
+                name: provider.get_health() for name, provider in ai_service.providers.items()
+            } if ai_service else None,
+            "jobs": await job_queue.get_stats() if job_queue else None,
             "timestamp": datetime.datetime.utcnow().isoformat()
         }
         
@@ -310,6 +497,54 @@ async def get_service_stats() -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=f"Failed to get stats: {str(e)}")
 
 
+@router.get("/cache/stats")
+async def get_cache_stats() -> Dict[str, Any]:
+    """Get validation result cache hit/miss statistics."""
+    if ai_service is None:
+        raise HTTPException(status_code=503, detail="AI service is not available. Please check server configuration.")
+    return ai_service.cache.get_stats()
+
+
+@router.delete("/cache")
+async def purge_cache(
+    request: Request,
+    _: bool = Depends(require_admin_auth)
+) -> Dict[str, Any]:
+    """Purge all cached validation results."""
+    try:
+        if ai_service is None:
+            raise HTTPException(status_code=503, detail="AI service is not available. Please check server configuration.")
+        
+        removed = await ai_service.cache.clear()
+        return {"message": "Validation cache purged successfully", "entries_removed": removed}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error purging cache: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to purge cache: {str(e)}")
+
+
+@router.get("/usage")
+async def get_usage(
+    request: Request,
+    _: bool = Depends(require_admin_auth)
+) -> Dict[str, Any]:
+    """Get LLM token usage and estimated cost by schema type, platform, model and client."""
+    return usage_tracker.get_report()
+
+
+@router.delete("/usage")
+async def reset_usage(
+    request: Request,
+    _: bool = Depends(require_admin_auth)
+) -> Dict[str, Any]:
+    """Reset the LLM usage totals."""
+    usage_tracker.reset()
+    logger.info("LLM usage totals reset")
+    return {"message": "Usage totals reset successfully"}
+
+
 @router.get("/config/model", response_model=ModelConfigResponse)
 async def get_current_model() -> ModelConfigResponse:
     """Get the current GPT model configuration."""
@@ -329,15 +564,10 @@ async def update_gpt_model(
     """Update the GPT model configuration."""
     try:
         # Validate the model name (basic validation)
-        valid_models = [
-            "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-3.5-turbo",
-            "gpt-4", "gpt-4-turbo-preview"
-        ]
-        
-        if config_request.model not in valid_models:
+        if config_request.model not in SUPPORTED_GPT_MODELS:
             raise HTTPException(
                 status_code=400, 
-                detail=f"Invalid model. Must be one of: {', '.join(valid_models)}"
+                detail=f"Invalid model. Must be one of: {', '.join(SUPPORTED_GPT_MODELS)}"
             )
         
         # Update the settings
@@ -345,6 +575,8 @@ async def update_gpt_model(
         
         # Log the change
         logger.info(f"GPT model updated to: {config_request.model}")
+        if ai_service is not None:
+            ai_service.router.check_tiers(ai_service.provider)
         
         return ModelConfigResponse(
             current_model=config_request.model,
@@ -358,6 +590,58 @@ async def update_gpt_model(
         raise HTTPException(status_code=500, detail=f"Failed to update model: {str(e)}")
 
 
+@router.get("/config/routing")
+async def get_routing_config() -> Dict[str, Any]:
+    """Get the model routing configuration and per-tier latency."""
+    if ai_service is None:
+        raise HTTPException(status_code=503, detail="AI service is not available. Please check server configuration.")
+    return {**ai_service.router.get_config(), "latency": ai_service.router.get_stats()}
+
+
+@router.post("/config/routing")
+async def update_routing_config(
+    config_request: RoutingConfigRequest,
+    request: Request,
+    _: bool = Depends(require_admin_auth)
+) -> Dict[str, Any]:
+    """Update the model routing thresholds and fast tier models."""
+    try:
+        if ai_service is None:
+            raise HTTPException(status_code=503, detail="AI service is not available. Please check server configuration.")
+        
+        if config_request.fast_model is not None and config_request.fast_model not in SUPPORTED_GPT_MODELS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid model. Must be one of: {', '.join(SUPPORTED_GPT_MODELS)}"
+            )
+        if (config_request.claude_fast_model is not None
+                and config_request.claude_fast_model not in SUPPORTED_CLAUDE_MODELS):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid Claude model. Must be one of: {', '.join(SUPPORTED_CLAUDE_MODELS)}"
+            )
+        
+        if config_request.enabled is not None:
+            settings.router_enabled = config_request.enabled
+        if config_request.score_threshold is not None:
+            settings.router_score_threshold = config_request.score_threshold
+        if config_request.fast_model is not None:
+            settings.router_fast_model = config_request.fast_model
+        if config_request.claude_fast_model is not None:
+            settings.claude_fast_model = config_request.claude_fast_model
+        
+        routing_config = ai_service.router.get_config()
+        logger.info(f"Model routing updated: {routing_config}")
+        ai_service.router.check_tiers(ai_service.provider)
+        return {**routing_config, "message": "Routing configuration updated successfully"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating routing config: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to update routing config: {str(e)}")
+
+
 # Example schemas for testing
 @router.get("/examples")
 async def get_example_schemas() -> Dict[str, Dict[str, str]]:
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 import os
 
 
@@ -12,8 +12,65 @@ class Settings(BaseSettings):
     # AI Provider Configuration
     openai_api_key: Optional[str] = None
     anthropic_api_key: Optional[str] = None
-    ai_provider: str = "openai"  # or 'anthropic'
+    ai_provider: str = "openai"  # or 'anthropic', or 'fake' for offline load testing
     gpt_model: str = "gpt-4o-mini"  # configurable GPT model
+    claude_model: str = "claude-3-sonnet-20240229"  # model used on the Anthropic path
+    
+    # Model Routing Configuration (gpt_model / claude_model serve the strong tier)
+    router_enabled: bool = True
+    router_score_threshold: float = 6.0  # complexity score at which the strong model is used
+    router_fast_model: str = "gpt-4o-mini"  # fast tier on the OpenAI path (same as the gpt_model default)
+    claude_fast_model: str = "claude-3-haiku-20240307"  # fast tier on the Anthropic path
+    
+    # LLM HTTP Connection Pool Configuration (shared by all provider clients)
+    llm_max_connections: int = 200
+    llm_max_keepalive_connections: int = 50
+    llm_keepalive_expiry: float = 30.0  # seconds an idle connection is kept open
+    llm_connect_timeout: float = 10.0
+    llm_request_timeout: float = 60.0  # per-call timeout in seconds
+    llm_max_retries: int = 2  # retries with jittered backoff on timeouts, connection errors, 429s and 5xx
+    llm_retry_base_delay: float = 0.5  # backoff ceiling for the first retry (seconds, doubled per retry)
+    llm_retry_max_delay: float = 8.0
+    
+    # Request Hedging and Failover Configuration
+    hedge_enabled: bool = False
+    hedge_percentile: float = 95.0  # hedge once the primary is slower than this latency percentile
+    hedge_min_delay: float = 1.0  # never hedge earlier than this many seconds
+    hedge_min_samples: int = 20  # primary latency samples needed before hedging starts
+    hedge_cross_provider: bool = True  # send the hedge to the other configured provider when available
+    failover_enabled: bool = True  # retry on the other configured provider when the primary fails
+    
+    # Circuit Breaker and Adaptive Concurrency Configuration (per provider)
+    breaker_window: int = 20  # recent calls considered for the error rate
+    breaker_min_calls: int = 10  # calls needed in the window before the breaker can open
+    breaker_error_rate: float = 0.5  # failure rate (errors and slow calls) that opens the breaker
+    breaker_slow_call_seconds: float = 30.0  # calls slower than this count as failures
+    breaker_cooldown: float = 30.0  # seconds the breaker stays open before a probe call
+    llm_concurrency_initial: int = 20  # starting limit on outstanding calls per provider
+    llm_concurrency_max: int = 100
+    llm_concurrency_latency_target: float = 20.0  # slower calls shrink the limit
+    llm_concurrency_backoff: float = 0.5  # multiplicative decrease on errors and slow calls
+    llm_concurrency_queue_timeout: float = 5.0  # seconds to wait for a free slot before failing fast
+    
+    # Provider Rate Limits (token buckets per provider; 0 disables a limit)
+    openai_rpm: int = 500
+    openai_tpm: int = 200000
+    anthropic_rpm: int = 50
+    anthropic_tpm: int = 40000
+    
+    # Fake Provider Configuration (AI_PROVIDER=fake: local, schema-aware responses without API calls)
+    fake_latency_distribution: str = "lognormal"  # fixed, uniform, exponential or lognormal
+    fake_latency_seconds: float = 1.0  # median time to first token (uniform: mean of 0..2x)
+    fake_latency_sigma: float = 0.5  # spread of the lognormal distribution
+    fake_tokens_per_second: float = 100.0  # completion token throughput after the first token (0 = instant)
+    fake_error_rate: float = 0.0  # share of calls failing with a transient 503
+    fake_timeout_rate: float = 0.0  # share of calls that hang until the request timeout
+    fake_seed: Optional[int] = None  # seed for reproducible latency and failure sequences
+    
+    # Batch Validation Configuration
+    batch_max_items: int = 500
+    batch_default_concurrency: int = 8
+    batch_max_concurrency: int = 32
     
     # Authentication Configuration
     admin_password: Optional[str] = None  # Admin panel password (can be encrypted)
@@ -28,14 +85,57 @@ class Settings(BaseSettings):
     collection_name: str = "schema_best_practices"
     # Control whether to auto-populate default best practices (disable in production)
     auto_populate_defaults: bool = os.environ.get("AUTO_POPULATE_DEFAULTS", "true").lower() == "true"
+    embedding_cache_max_entries: int = 2048  # query embeddings kept in memory for repeated searches
+    vector_store_workers: int = 4  # threads running embedding and Chroma calls off the event loop
     
     # Database Configuration
     database_url: str = "sqlite:///./schema_validator.db"
     
+    # Validation Job Queue Configuration
+    job_workers: int = 4  # in-process workers running queued validation jobs
+    job_long_poll_max: int = 60  # maximum seconds a job status request may wait
+    job_max_attempts: int = 5  # runs of a job while its provider is unavailable (breaker open, degraded)
+    job_retry_base_delay: float = 5.0  # backoff before re-running such a job (seconds, doubled per attempt)
+    job_retry_max_delay: float = 300.0
+    job_retention_seconds: int = 604800  # completed and failed jobs older than this are deleted (0 = keep)
+    job_prune_interval: float = 3600.0  # seconds between job retention sweeps
+    
     # Redis Configuration
     redis_url: str = "redis://localhost:6379/0"
     cache_ttl: int = 3600
     
+    # Prompt Assembly Configuration
+    prompt_context_token_budget: int = 1500  # max tokens of per-type practice context (cacheable prefix)
+    prompt_dynamic_context_budget: int = 500  # max tokens of extra semantic hits (variable suffix)
+    prompt_semantic_candidates: int = 10  # semantic search hits considered for the context
+    prompt_static_cache_max_entries: int = 256  # per-(type, platform, settled rules) practice blocks kept in memory
+    prompt_caching_enabled: bool = True  # mark the prompt prefix cacheable on the Anthropic path
+    structured_output_enabled: bool = True  # JSON schema output (OpenAI) / forced tool use (Anthropic)
+    llm_parse_retries: int = 1  # re-ask when a response does not match the analysis schema
+    
+    # Chunked Analysis Configuration (large schemas are analyzed as parallel entity-level parts)
+    chunking_enabled: bool = True
+    chunking_threshold_chars: int = 12000  # schemas larger than this are chunked automatically
+    chunk_max_chars: int = 6000  # target size of one chunk
+    chunk_concurrency: int = 8  # chunks of one schema analyzed concurrently
+    
+    # Local Rule Engine Configuration
+    analysis_mode: str = "full"  # default mode: fast (local rules only), hybrid (rules + AI) or full (AI only)
+    
+    # Validation Result Cache Configuration
+    cache_enabled: bool = True
+    cache_max_entries: int = 1024  # bounded in-process LRU tier
+    redis_cache_enabled: bool = False  # shared second tier at redis_url
+    schema_versions_max_entries: int = 4096  # schema contents kept by schema_id for incremental re-validation
+    
+    # Usage Accounting Configuration
+    model_prices: Dict[str, Dict[str, float]] = {}  # per-model overrides of MODEL_PRICES (JSON)
+    usage_max_clients: int = 100  # distinct X-Client-Id values tracked; later ones are counted as "other"
+    
+    # Metrics Configuration (Prometheus exposition at /metrics)
+    metrics_enabled: bool = True
+    event_loop_lag_interval: float = 0.5  # seconds between event loop lag probes
+    
     # Logging
     log_level: str = "INFO"
     
@@ -120,8 +220,36 @@ SUPPORTED_SCHEMA_TYPES = [
     "sql_ddl"
 ]
 
+# GPT models selectable from the admin config endpoints
+SUPPORTED_GPT_MODELS = [
+    "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-3.5-turbo",
+    "gpt-4", "gpt-4-turbo-preview"
+]
+
+# Claude models selectable as the Anthropic fast tier
+SUPPORTED_CLAUDE_MODELS = [
+    "claude-3-haiku-20240307", "claude-3-sonnet-20240229"
+]
+
+# USD per million tokens: input, cached input (prompt cache reads) and output.
+# Override or extend with MODEL_PRICES='{"gpt-4o": {"input": 2.5, "cached_input": 1.25, "output": 10}}'
+MODEL_PRICES = {
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4-turbo": {"input": 10.00, "cached_input": 10.00, "output": 30.00},
+    "gpt-4-turbo-preview": {"input": 10.00, "cached_input": 10.00, "output": 30.00},
+    "gpt-4": {"input": 30.00, "cached_input": 30.00, "output": 60.00},
+    "gpt-3.5-turbo": {"input": 0.50, "cached_input": 0.50, "output": 1.50},
+    "claude-3-sonnet-20240229": {"input": 3.00, "cached_input": 0.30, "output": 15.00},
+    "claude-3-haiku-20240307": {"input": 0.25, "cached_input": 0.03, "output": 1.25},
+    "fake-schema-analyzer": {"input": 0.0, "cached_input": 0.0, "output": 0.0}
+}
+
 # AI prompts configuration
-SCHEMA_ANALYSIS_PROMPT = """
+# Analysis prompts are split into a stable prefix (system instructions, output
+# JSON contract and the per-schema-type practice block) and a variable suffix
+# (the schema itself), so providers can reuse a cached prompt prefix.
+SCHEMA_ANALYSIS_SYSTEM_PROMPT = """
 You are an expert database schema architect. Analyze the provided schema and provide detailed recommendations for improvements.
 
 Consider the following aspects:
@@ -134,27 +262,50 @@ Consider the following aspects:
 7. **Security**: Are there any security considerations?
 8. **Documentation**: Is the schema self-documenting?
 
-Schema Type: {schema_type}
-Schema Content:
-{schema_content}
-
-Best Practices Context:
-{best_practices_context}
-
 Provide your analysis in the following JSON format:
-{{
+{
     "overall_score": <1-10>,
     "recommendations": [
-        {{
+        {
             "category": "<category>",
             "severity": "<low|medium|high>",
             "description": "<detailed description>",
             "suggestion": "<specific improvement suggestion>",
             "impact": "<expected impact of the change>"
-        }}
+        }
     ],
     "best_practices_applied": ["<list of applied best practices>"],
     "missing_best_practices": ["<list of missing best practices>"],
     "summary": "<overall summary of the schema quality>"
-}}
+}
+"""
+
+SCHEMA_ANALYSIS_PRACTICES_BLOCK = """
+Best Practices Context ({schema_type} schemas):
+{best_practices_context}
+"""
+
+# Prepended to the prompt suffix when a large schema is analyzed in parts
+SCHEMA_CHUNK_NOTE = """Note: this is part {index} of {total} of a larger {schema_type} schema, containing {entities}.
+Analyze only the entities shown; the other parts are analyzed separately.
+
+"""
+
+# Prepended to the prompt suffix when only the changed entities of a schema are re-analyzed
+SCHEMA_CHANGE_NOTE = """Note: this is part {index} of {total} of the entities added or changed since the previous version of a larger {schema_type} schema, containing {entities}.
+Analyze only the entities shown; the unchanged entities were analyzed before.
+
+"""
+
+# Prepended to the prompt suffix in hybrid mode, listing practices already checked by local rules
+SCHEMA_SETTLED_RULES_NOTE = """These best practices were already checked by deterministic rules; do not report findings about them:
+{rules}
+
+"""
+
+SCHEMA_ANALYSIS_USER_PROMPT = """{additional_context}Schema Type: {schema_type}
+Schema Content:
+{schema_content}
+
+Analyze this schema and respond in the JSON format described above.
 """
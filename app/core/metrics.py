@@ -0,0 +1,145 @@
+import asyncio
+import time
+from typing import Optional
+from prometheus_client import Counter, Gauge, Histogram
+from app.core.config import settings
+from loguru import logger
+
+
+# Analyses take seconds to a minute; storage and parsing stages take milliseconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+REQUEST_LATENCY = Histogram(
+    "schema_validator_http_request_duration_seconds",
+    "HTTP request latency by route (until the response body is sent)",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge("schema_validator_http_requests_in_flight", "HTTP requests currently being served")
+
+STAGE_LATENCY = Histogram(
+    "schema_validator_stage_duration_seconds",
+    "Time spent in each analysis stage per request",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+ANALYSIS_ERRORS = Counter("schema_validator_analysis_errors", "Analyses that failed")
+
+VECTOR_LATENCY = Histogram(
+    "schema_validator_vector_search_duration_seconds",
+    "Vector store latency by operation (embedding, query, scan)",
+    ["operation"],
+    buckets=LATENCY_BUCKETS
+)
+
+LLM_LATENCY = Histogram(
+    "schema_validator_llm_request_duration_seconds",
+    "Latency of successful LLM provider calls",
+    ["provider"],
+    buckets=LATENCY_BUCKETS
+)
+LLM_IN_FLIGHT = Gauge("schema_validator_llm_requests_in_flight", "LLM provider calls in progress", ["provider"])
+LLM_ERRORS = Counter("schema_validator_llm_errors", "Failed LLM provider calls", ["provider", "error"])
+LLM_TOKENS = Counter(
+    "schema_validator_llm_tokens",
+    "LLM tokens by kind (prompt, completion, cached prompt)",
+    ["provider", "model", "kind"]
+)
+LLM_COST = Counter("schema_validator_llm_cost_usd", "Estimated LLM spend in USD", ["provider", "model"])
+
+CACHE_LOOKUPS = Counter(
+    "schema_validator_cache_lookups",
+    "Validation cache lookups by result (memory_hit, redis_hit, miss)",
+    ["result"]
+)
+CACHE_HIT_RATIO = Gauge("schema_validator_cache_hit_ratio", "Share of validation cache lookups that were hits")
+EMBEDDING_CACHE_LOOKUPS = Counter(
+    "schema_validator_embedding_cache_lookups",
+    "Query embedding cache lookups by result (hit, miss)",
+    ["result"]
+)
+EMBEDDING_CACHE_HIT_RATIO = Gauge(
+    "schema_validator_embedding_cache_hit_ratio",
+    "Share of query embedding cache lookups that were hits"
+)
+EMBEDDING_SECONDS_SAVED = Counter(
+    "schema_validator_embedding_cache_saved_seconds",
+    "Estimated embedding time saved by query embedding cache hits"
+)
+
+EVENT_LOOP_LAG = Gauge("schema_validator_event_loop_lag_seconds", "Most recent event loop lag")
+EVENT_LOOP_LAG_HISTOGRAM = Histogram(
+    "schema_validator_event_loop_lag_distribution_seconds",
+    "Event loop lag (delay of a scheduled wake-up past its due time)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording HTTP latency and in-flight requests.
+    
+    Requests are labelled with the matched route template (e.g.
+    /api/v1/jobs/{job_id}) rather than the raw path, so label cardinality
+    stays bounded. Streaming responses are timed until their last chunk.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = 500
+        
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        start = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"],
+                getattr(route, "path", "other"),
+                str(status)
+            ).observe(time.perf_counter() - start)
+
+
+class EventLoopLagMonitor:
+    """Periodically measure how late the event loop runs a scheduled wake-up."""
+    
+    def __init__(self, interval: float = settings.event_loop_lag_interval):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Event loop lag monitor started ({self.interval}s interval)")
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - scheduled - self.interval)
+            EVENT_LOOP_LAG.set(lag)
+            EVENT_LOOP_LAG_HISTOGRAM.observe(lag)
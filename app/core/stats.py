@@ -0,0 +1,99 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+
+class LatencyStats:
+    """Rolling-window latency tracker with percentile summaries."""
+    
+    def __init__(self, window: int = 1000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+    
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+    
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Get the given percentile (0-100) over the recent window."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(percentile / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get count, mean and percentile summary in seconds."""
+        if not self.samples:
+            return {"count": self.count, "avg": None, "p50": None, "p95": None, "p99": None, "max": None}
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 4),
+            "p50": round(self.percentile(50), 4),
+            "p95": round(self.percentile(95), 4),
+            "p99": round(self.percentile(99), 4),
+            "max": round(max(self.samples), 4)
+        }
+
+
+class StageTimings:
+    """
+    Wall-clock time spent in each named stage of one request.
+    
+    Stages may nest; time spent in an inner stage is not counted again in
+    the enclosing one, so the stage durations add up to the instrumented time.
+    """
+    
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self._open: List[list] = []  # [name, start, time spent in nested stages]
+    
+    @contextmanager
+    def stage(self, name: str):
+        entry = [name, time.perf_counter(), 0.0]
+        self._open.append(entry)
+        try:
+            yield
+        finally:
+            self._open.pop()
+            elapsed = time.perf_counter() - entry[1]
+            self.add(name, elapsed - entry[2])
+            if self._open:
+                self._open[-1][2] += elapsed
+    
+    def add(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+    
+    def as_dict(self) -> Dict[str, float]:
+        """Get the stage durations in milliseconds."""
+        return {name: round(seconds * 1000, 2) for name, seconds in self.stages.items()}
+
+
+_current_timings: ContextVar[Optional[StageTimings]] = ContextVar("stage_timings", default=None)
+
+
+def start_timings() -> StageTimings:
+    """Start recording stage timings for the current request (and the tasks it spawns)."""
+    timings = StageTimings()
+    _current_timings.set(timings)
+    return timings
+
+
+def stop_timings():
+    """Stop recording stage timings in the current context."""
+    _current_timings.set(None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a stage of the current request; a no-op when no request is being timed."""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    with timings.stage(name):
+        yield
@@ -0,0 +1,153 @@
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from app.core.config import settings, MODEL_PRICES
+from app.core.metrics import LLM_COST
+
+
+CLIENT_ID_HEADER = b"x-client-id"
+ANONYMOUS_CLIENT = "anonymous"
+OTHER_CLIENTS = "other"  # clients seen after usage_max_clients distinct ones
+MAX_CLIENT_ID_LENGTH = 64
+_CLIENT_ID_UNSAFE = re.compile(r"[^\w.:@-]")  # client ids end up in reports and the admin panel
+UNATTRIBUTED = "unknown"
+
+USAGE_DIMENSIONS = ("schema_type", "platform", "model", "client")
+
+_client_id: ContextVar[str] = ContextVar("client_id", default=ANONYMOUS_CLIENT)
+_usage_labels: ContextVar[Dict[str, str]] = ContextVar("usage_labels", default={})
+
+
+def set_usage_labels(schema_type: str, platform: Optional[str] = None):
+    """Attribute the LLM calls made for the current request to a schema type and platform."""
+    _usage_labels.set({"schema_type": schema_type, "platform": platform or "none"})
+
+
+def get_model_prices(model: str) -> Optional[Dict[str, float]]:
+    """Get the USD per million token prices for a model, if known."""
+    return {**MODEL_PRICES, **settings.model_prices}.get(model)
+
+
+def call_cost(model: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Estimate the cost of one call in USD, or None for a model without a price."""
+    prices = get_model_prices(model)
+    if prices is None:
+        return None
+    cached_price = prices.get("cached_input", prices["input"])
+    return (
+        (prompt_tokens - cached_tokens) * prices["input"]
+        + cached_tokens * cached_price
+        + completion_tokens * prices["output"]
+    ) / 1_000_000
+
+
+class ClientIdMiddleware:
+    """ASGI middleware attributing a request's LLM usage to the client named in X-Client-Id."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        client_id = ANONYMOUS_CLIENT
+        for name, value in scope["headers"]:
+            if name == CLIENT_ID_HEADER:
+                client_id = _CLIENT_ID_UNSAFE.sub("_", value.decode("latin-1").strip())[:MAX_CLIENT_ID_LENGTH]
+                break
+        
+        token = _client_id.set(client_id or ANONYMOUS_CLIENT)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _client_id.reset(token)
+
+
+class UsageTracker:
+    """
+    Token usage and estimated cost of LLM calls, aggregated in process.
+    
+    Every provider call is recorded (including retries, hedges and chunk
+    calls) and attributed to the schema type, platform, model and client of
+    the request that made it.
+    """
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        self.started_at = time.time()
+        self.totals = self._empty_totals()
+        self.breakdown: Dict[str, Dict[str, Dict[str, Any]]] = {dimension: {} for dimension in USAGE_DIMENSIONS}
+        self.unpriced_models = set()
+    
+    def record(self, provider: str, model: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int):
+        """Record the usage reported for one provider call."""
+        cost = call_cost(model, prompt_tokens, cached_tokens, completion_tokens)
+        savings = 0.0
+        if cost is None:
+            self.unpriced_models.add(model)
+            cost = 0.0
+        else:
+            prices = get_model_prices(model)
+            savings = cached_tokens * (prices["input"] - prices.get("cached_input", prices["input"])) / 1_000_000
+            LLM_COST.labels(provider, model).inc(cost)
+        
+        labels = _usage_labels.get()
+        keys = {
+            "schema_type": labels.get("schema_type", UNATTRIBUTED),
+            "platform": labels.get("platform", UNATTRIBUTED),
+            "model": model,
+            "client": self._client_key(_client_id.get())
+        }
+        buckets = [self.totals] + [
+            self.breakdown[dimension].setdefault(key, self._empty_totals()) for dimension, key in keys.items()
+        ]
+        for bucket in buckets:
+            bucket["calls"] += 1
+            bucket["prompt_tokens"] += prompt_tokens
+            bucket["cached_tokens"] += cached_tokens
+            bucket["completion_tokens"] += completion_tokens
+            bucket["cost_usd"] += cost
+            bucket["cache_savings_usd"] += savings
+    
+    def get_report(self) -> Dict[str, Any]:
+        """Get usage totals and their breakdown by schema type, platform, model and client."""
+        return {
+            "since": self.started_at,
+            "totals": self._rounded(self.totals),
+            **{
+                f"by_{dimension}": {
+                    key: self._rounded(bucket)
+                    for key, bucket in sorted(buckets.items(), key=lambda item: -item[1]["cost_usd"])
+                }
+                for dimension, buckets in self.breakdown.items()
+            },
+            "unpriced_models": sorted(self.unpriced_models)
+        }
+    
+    def _client_key(self, client_id: str) -> str:
+        """The client's own bucket, or the shared one once usage_max_clients ids are tracked (X-Client-Id is unauthenticated)."""
+        clients = self.breakdown["client"]
+        if client_id in clients or len(clients) < settings.usage_max_clients:
+            return client_id
+        return OTHER_CLIENTS
+    
+    def _empty_totals(self) -> Dict[str, Any]:
+        return {
+            "calls": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "completion_tokens": 0,
+            "cost_usd": 0.0,
+            "cache_savings_usd": 0.0
+        }
+    
+    def _rounded(self, bucket: Dict[str, Any]) -> Dict[str, Any]:
+        return {**bucket, "cost_usd": round(bucket["cost_usd"], 6), "cache_savings_usd": round(bucket["cache_savings_usd"], 6)}
+
+
+usage_tracker = UsageTracker()
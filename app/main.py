@@ -1,12 +1,16 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
-from app.api.routes import router
+from app.api.routes import router, job_queue, vector_store
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, EventLoopLagMonitor
+from app.core.usage import ClientIdMiddleware
+from app.services.llm_providers import close_http_client
 from loguru import logger
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 import sys
 import os
 
@@ -36,6 +40,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Attribute LLM usage to the calling client (X-Client-Id header)
+app.add_middleware(ClientIdMiddleware)
+
+# Record request latency and in-flight requests for /metrics
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+loop_lag_monitor = EventLoopLagMonitor()
+
 # Mount static files (frontend)
 static_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
 if os.path.exists(static_dir):
@@ -51,7 +64,8 @@ async def http_exception_handler(request, exc):
             "error": exc.detail,
             "status_code": exc.status_code,
             "timestamp": "2024-01-01T00:00:00Z"  # In real app, use datetime.utcnow().isoformat()
-        }
+        },
+        headers=getattr(exc, "headers", None)
     )
 
 
@@ -77,18 +91,37 @@ async def startup_event():
     logger.info(f"AI Provider: {settings.ai_provider}")
     logger.info(f"Vector DB: {settings.chroma_persist_directory}")
     logger.info(f"Debug mode: {settings.debug}")
+    
+    if job_queue is not None:
+        await job_queue.start()
+    if settings.metrics_enabled:
+        await loop_lag_monitor.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Shutdown event handler."""
     logger.info("Shutting down Schema Validator Service...")
+    if job_queue is not None:
+        await job_queue.stop()
+    await loop_lag_monitor.stop()
+    await close_http_client()
+    vector_store.shutdown()
 
 
 # Include API routes
 app.include_router(router, prefix="/api/v1", tags=["schema-validation"])
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Expose service metrics in the Prometheus text format."""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    # Passed as a header: media_type would get a second charset appended
+    return Response(content=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
 @app.get("/")
 async def root():
     """Serve the frontend application."""
@@ -117,7 +150,8 @@ async def root():
                 "POST /api/v1/best-practices - Add best practice",
                 "GET /api/v1/examples - Example schemas",
                 "GET /api/v1/health - Health check",
-                "GET /api/v1/stats - Service statistics"
+                "GET /api/v1/stats - Service statistics",
+                "GET /metrics - Prometheus metrics"
             ]
         }
 
@@ -30,12 +30,22 @@ class Platform(str, Enum):
     SNOWFLAKE = "snowflake"
 
 
+class AnalysisMode(str, Enum):
+    FAST = "fast"  # local rules only, no AI call
+    HYBRID = "hybrid"  # local rules, AI model for everything they do not settle
+    FULL = "full"  # AI model only
+
+
 class SchemaValidationRequest(BaseModel):
     schema_content: str = Field(..., description="The schema content to validate")
     schema_type: SchemaType = Field(..., description="Type of schema")
     context: Optional[str] = Field(None, description="Additional context about the schema usage")
     include_best_practices: bool = Field(True, description="Include best practices in the analysis")
     platform: Optional[Platform] = Field(None, description="Target data platform for platform-specific recommendations")
+    chunking: Optional[bool] = Field(None, description="Analyze the schema in parallel entity-level parts (default: automatic for large schemas)")
+    analysis_mode: Optional[AnalysisMode] = Field(None, description="fast (local rules only), hybrid (local rules plus AI) or full (AI only); defaults to the configured mode")
+    previous_schema_id: Optional[str] = Field(None, description="schema_id of a previously validated version; only changed entities are re-analyzed")
+    previous_schema_content: Optional[str] = Field(None, description="Content of the previous schema version (alternative to previous_schema_id)")
 
 
 class Recommendation(BaseModel):
@@ -46,6 +56,24 @@ class Recommendation(BaseModel):
     impact: str = Field(..., description="Expected impact of implementing the change")
 
 
+class SchemaAnalysis(BaseModel):
+    overall_score: int = Field(..., ge=1, le=10, description="Overall schema quality score (1-10)")
+    recommendations: List[Recommendation] = Field(..., description="List of recommendations")
+    best_practices_applied: List[str] = Field(..., description="Best practices already applied in the schema")
+    missing_best_practices: List[str] = Field(..., description="Best practices missing from the schema")
+    summary: str = Field(..., description="Overall summary of schema quality")
+
+
+class ChangeSummary(BaseModel):
+    incremental: bool = Field(..., description="Whether only changed entities were re-analyzed")
+    reason: Optional[str] = Field(None, description="Why a full analysis was run instead")
+    added: List[str] = Field(default=[], description="Entities added since the previous version")
+    removed: List[str] = Field(default=[], description="Entities removed since the previous version")
+    modified: List[str] = Field(default=[], description="Entities changed since the previous version")
+    unchanged: List[str] = Field(default=[], description="Entities identical to the previous version")
+    reused_recommendations: int = Field(0, description="Recommendations carried over from the previous analysis")
+
+
 class SchemaValidationResponse(BaseModel):
     schema_id: Optional[str] = Field(None, description="Unique identifier for this validation")
     overall_score: int = Field(..., ge=1, le=10, description="Overall schema quality score (1-10)")
@@ -54,6 +82,49 @@ class SchemaValidationResponse(BaseModel):
     missing_best_practices: List[str] = Field(..., description="Best practices missing from the schema")
     summary: str = Field(..., description="Overall summary of schema quality")
     processing_time: Optional[float] = Field(None, description="Time taken to process the request")
+    prompt_tokens: Optional[int] = Field(None, description="Prompt tokens sent to the AI provider (estimated if not reported)")
+    cached_prompt_tokens: Optional[int] = Field(None, description="Prompt tokens served from the provider's prompt cache")
+    completion_tokens: Optional[int] = Field(None, description="Completion tokens generated by the AI provider")
+    timings: Optional[Dict[str, float]] = Field(None, description="Milliseconds spent in each processing stage (cache lookup, embedding, vector query, practice scan, prompt build, LLM call, parsing)")
+    metadata: Optional[Dict[str, Any]] = Field(None, description="Analysis details such as the provider, model and routing tier used")
+    change_summary: Optional[ChangeSummary] = Field(None, description="Entity-level changes against the previous schema version, if one was given")
+
+
+class BatchValidationRequest(BaseModel):
+    items: List[SchemaValidationRequest] = Field(..., min_length=1, description="Schemas to validate")
+    concurrency: Optional[int] = Field(None, ge=1, description="Maximum number of schemas analyzed concurrently")
+
+
+class BatchItemResult(BaseModel):
+    index: int = Field(..., description="Position of the item in the batch request")
+    status: str = Field(..., description="Item status (success or error)")
+    result: Optional[SchemaValidationResponse] = Field(None, description="Validation result if the item succeeded")
+    error: Optional[str] = Field(None, description="Error message if the item failed")
+
+
+class BatchValidationResponse(BaseModel):
+    total: int = Field(..., description="Number of items in the batch")
+    succeeded: int = Field(..., description="Number of items validated successfully")
+    failed: int = Field(..., description="Number of items that failed")
+    results: List[BatchItemResult] = Field(..., description="Per-item results in request order")
+    processing_time: Optional[float] = Field(None, description="Time taken to process the batch")
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ValidationJob(BaseModel):
+    job_id: str = Field(..., description="Unique identifier of the validation job")
+    status: JobStatus = Field(..., description="Current job status")
+    created_at: float = Field(..., description="Submission time (unix seconds)")
+    started_at: Optional[float] = Field(None, description="Time the job started running (unix seconds)")
+    completed_at: Optional[float] = Field(None, description="Time the job finished (unix seconds)")
+    result: Optional[SchemaValidationResponse] = Field(None, description="Validation result once completed")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
 
 
 class BestPractice(BaseModel):
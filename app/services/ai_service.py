@@ -1,179 +1,648 @@
-import openai
-import anthropic
-import json
-from typing import Dict, Any, List
-from app.core.config import settings, SCHEMA_ANALYSIS_PROMPT
-from app.models.schema import SchemaValidationRequest, SchemaValidationResponse, Recommendation, SchemaType, Platform
+import asyncio
+from typing import Dict, Any, List, Optional, AsyncIterator, Container, Tuple
+from app.core.config import settings, SCHEMA_CHANGE_NOTE
+from app.core.metrics import ANALYSIS_ERRORS, STAGE_LATENCY
+from app.core.usage import set_usage_labels
+from app.core.stats import LatencyStats, StageTimings, start_timings, stop_timings, stage
+from app.models.schema import SchemaValidationRequest, SchemaValidationResponse, Recommendation, SchemaType, Platform, BatchItemResult, AnalysisMode, ChangeSummary
 from app.services.vector_store import VectorStoreService
+from app.services.llm_providers import create_provider, LLMProvider, LLMResult, estimate_tokens
+from app.services.cache import ValidationCache, SchemaVersionStore, generate_schema_id, schema_content_hash
+from app.services.coalescer import SingleFlight
+from app.services.stream_parser import RecommendationStreamParser
+from app.services.prompt_builder import PromptBuilder, BuiltPrompt
+from app.services.schema_chunker import SchemaChunk, SchemaChunker, merge_chunk_analyses
+from app.services.rule_engine import RuleEngine, RuleReport, merge_rule_findings
+from app.services.schema_diff import diff_schemas, carry_over_analysis
+from app.services.model_router import ModelRouter, RoutingDecision, FAST_TIER, STRONG_TIER
+from app.services.resilience import LLMStream, ResilientCaller
+from app.services.circuit_breaker import ProviderUnavailableError
+from app.services.structured_output import AnalysisOutputParser, analysis_json_schema
 from loguru import logger
 import time
 
 
 class AIService:
-    def __init__(self):
-        self.vector_store = VectorStoreService()
-        
-        # Get decrypted API keys
-        openai_key = settings.get_decrypted_openai_key()
-        anthropic_key = settings.get_decrypted_anthropic_key()
-        
-        if settings.ai_provider == "openai" and openai_key:
-            self.openai_client = openai.OpenAI(api_key=openai_key)
-            self.provider = "openai"
-        elif settings.ai_provider == "anthropic" and anthropic_key:
-            self.anthropic_client = anthropic.Anthropic(api_key=anthropic_key)
-            self.provider = "anthropic"
-        else:
+    def __init__(self, vector_store: Optional[VectorStoreService] = None):
+        self.vector_store = vector_store or VectorStoreService()
+        self.prompt_builder = PromptBuilder(self.vector_store)
+        self.cache = ValidationCache()
+        self.versions = SchemaVersionStore()
+        self.single_flight = SingleFlight()
+        self.router = ModelRouter()
+        self.resilient_caller = ResilientCaller()
+        self.output_parser = AnalysisOutputParser()
+        self.chunker = SchemaChunker()
+        self.rule_engine = RuleEngine()
+        if self.vector_store.catalog.loaded:
+            self.rule_engine.check_corpus(self.vector_store.catalog)
+        self.stage_latency: Dict[str, LatencyStats] = {}
+        
+        # Async provider clients backed by the shared HTTP connection pool; the
+        # configured provider is primary, any other one is used for hedging and failover.
+        # The fake provider runs alone so load tests never reach a real API.
+        self.providers: Dict[str, LLMProvider] = {}
+        for name in ("fake",) if settings.ai_provider == "fake" else ("openai", "anthropic"):
+            provider = create_provider(name)
+            if provider is not None:
+                self.providers[name] = provider
+        
+        self.llm = self.providers.get(settings.ai_provider)
+        if self.llm is None:
             raise ValueError("No valid AI provider configuration found")
+        self.provider = self.llm.name
+        self.router.check_tiers(self.provider)
     
-    async def analyze_schema(self, request: SchemaValidationRequest) -> SchemaValidationResponse:
-        """Analyze a schema and provide recommendations."""
+    async def analyze_schema(self, request: SchemaValidationRequest, raise_on_error: bool = False) -> SchemaValidationResponse:
+        """
+        Analyze a schema and provide recommendations.
+        
+        Failures are returned as an error response unless raise_on_error is set;
+        ProviderUnavailableError is always raised so callers can fail fast.
+        """
         start_time = time.time()
+        timings = start_timings()
+        set_usage_labels(request.schema_type.value, request.platform.value if request.platform else None)
         
         try:
-            # Get relevant best practices from vector store
-            best_practices_context = ""
-            if request.include_best_practices:
-                best_practices_context = self._get_best_practices_context(
-                    request.schema_content, 
-                    request.schema_type,
-                    request.platform
-                )
-            
-            # Prepare the prompt
-            analysis_prompt = SCHEMA_ANALYSIS_PROMPT.format(
-                schema_type=request.schema_type.value,
-                schema_content=request.schema_content,
-                best_practices_context=best_practices_context
-            )
+            # Local rules answer in microseconds; there is nothing to cache or coalesce
+            if self._analysis_mode(request) == AnalysisMode.FAST:
+                return self._record_timings(self._run_rule_analysis(request, start_time), timings)
             
-            # Get AI analysis
-            ai_response = await self._get_ai_analysis(analysis_prompt)
+            route = self.router.route(request, self.llm)
+            with stage("cache_lookup"):
+                cache_key = self.cache.make_key(request, route.model, self.vector_store.corpus_version)
+                cached_response = await self.cache.get(cache_key)
+            if cached_response is not None:
+                cached_response.processing_time = time.time() - start_time
+                logger.info(f"Schema analysis served from cache with score {cached_response.overall_score}")
+                await self.versions.set(generate_schema_id(request), request.schema_content)
+                return self._record_timings(cached_response, timings)
             
-            # Parse the response
-            analysis_result = self._parse_ai_response(ai_response)
-            
-            # Create response
-            processing_time = time.time() - start_time
-            
-            response = SchemaValidationResponse(
-                overall_score=analysis_result.get("overall_score", 5),
-                recommendations=[
-                    Recommendation(**rec) for rec in analysis_result.get("recommendations", [])
-                ],
-                best_practices_applied=analysis_result.get("best_practices_applied", []),
-                missing_best_practices=analysis_result.get("missing_best_practices", []),
-                summary=analysis_result.get("summary", "Schema analysis completed"),
-                processing_time=processing_time
+            # Identical concurrent requests share one upstream analysis (and report its timings)
+            response = await self.single_flight.do(
+                self._single_flight_key(request, cache_key),
+                lambda: self._run_and_cache_analysis(request, route, cache_key, start_time, timings)
             )
-            
-            logger.info(f"Schema analysis completed in {processing_time:.2f}s with score {response.overall_score}")
+            response = response.model_copy(deep=True)
+            response.processing_time = time.time() - start_time
             return response
             
         except Exception as e:
             logger.error(f"Error analyzing schema: {e}")
-            # Return a basic response with error info
-            return SchemaValidationResponse(
-                overall_score=1,
-                recommendations=[
-                    Recommendation(
-                        category="error",
-                        severity="high",
-                        description=f"Failed to analyze schema: {str(e)}",
-                        suggestion="Please check the schema format and try again",
-                        impact="Cannot provide recommendations due to analysis failure"
-                    )
-                ],
-                best_practices_applied=[],
-                missing_best_practices=[],
-                summary="Analysis failed due to error",
-                processing_time=time.time() - start_time
-            )
+            ANALYSIS_ERRORS.inc()
+            if raise_on_error or isinstance(e, ProviderUnavailableError):
+                raise
+            return self._create_error_response(e, start_time)
     
-    def _get_best_practices_context(self, schema_content: str, schema_type: SchemaType, platform=None) -> str:
-        """Get relevant best practices context from vector store."""
+    async def analyze_batch(self, requests: List[SchemaValidationRequest], concurrency: int) -> AsyncIterator[BatchItemResult]:
+        """
+        Analyze many schemas with bounded concurrency, yielding results as they complete.
+        
+        Provider rate limits still apply to every call; a failing item is
+        reported as an error result and never aborts the rest of the batch.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run_item(index: int, request: SchemaValidationRequest) -> BatchItemResult:
+            if not request.schema_content.strip():
+                return BatchItemResult(index=index, status="error", error="Schema content cannot be empty")
+            async with semaphore:
+                try:
+                    result = await self.analyze_schema(request, raise_on_error=True)
+                    return BatchItemResult(index=index, status="success", result=result)
+                except Exception as e:
+                    return BatchItemResult(index=index, status="error", error=str(e))
+        
+        tasks = [asyncio.ensure_future(run_item(i, request)) for i, request in enumerate(requests)]
         try:
-            # Search for practices relevant to the schema content
-            relevant_practices = self.vector_store.search_relevant_practices(
-                query=schema_content[:500],  # Limit query length
-                schema_type=schema_type,
-                platform=platform,
-                limit=5
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _run_and_cache_analysis(self, request: SchemaValidationRequest, route: RoutingDecision,
+                                      cache_key: str, start_time: float,
+                                      timings: StageTimings) -> SchemaValidationResponse:
+        """Run the analysis and store its result in the cache (unless it is partial)."""
+        response = await self._run_analysis(request, route, start_time)
+        self._record_timings(response, timings)
+        if self._is_partial(response):
+            logger.warning("Not caching partial schema analysis so a re-run analyzes it again")
+            return response
+        # The change summary and timings describe this request, not the schema itself
+        await self.cache.set(cache_key, response.model_copy(update={"change_summary": None, "timings": None}))
+        await self.versions.set(generate_schema_id(request), request.schema_content)
+        return response
+    
+    async def _run_analysis(self, request: SchemaValidationRequest, route: RoutingDecision,
+                            start_time: float) -> SchemaValidationResponse:
+        """Run the full (uncached) analysis pipeline for a request."""
+        rule_report = None
+        if self._analysis_mode(request) == AnalysisMode.HYBRID:
+            with stage("rule_engine"):
+                rule_report = self.rule_engine.evaluate(request, self._practice_ids())
+        
+        change_summary = None
+        if self._is_incremental(request):
+            response, change_summary = await self._run_incremental_analysis(request, route, start_time, rule_report)
+            if response is not None:
+                return response
+            logger.info(f"Running full analysis instead of incremental: {change_summary.reason}")
+        
+        chunks = self._plan_chunks(request)
+        if chunks:
+            response = await self._run_chunked_analysis(request, route, chunks, start_time, rule_report)
+        else:
+            with stage("prompt_build"):
+                prompt = await self.prompt_builder.build(request, rule_report)
+            
+            # Get AI analysis from the model picked by the router
+            logger.info(f"Routing analysis to {route.model} ({route.tier} tier, complexity {route.complexity_score})")
+            llm_start = time.time()
+            analysis_result, llm_result = await self._analyze_prompt(prompt, route)
+            self.router.record_latency(route.tier, time.time() - llm_start)
+            
+            if rule_report is not None:
+                analysis_result = merge_rule_findings(analysis_result, rule_report)
+            
+            response = self._build_response(analysis_result, start_time)
+            self._apply_token_usage(response, prompt, llm_result)
+            response.metadata = self._analysis_metadata(route, llm_result, rule_report)
+            self._mark_partial(response, analysis_result)
+        
+        response.change_summary = change_summary
+        return response
+    
+    def _is_incremental(self, request: SchemaValidationRequest) -> bool:
+        return bool(request.previous_schema_id or request.previous_schema_content)
+    
+    def _single_flight_key(self, request: SchemaValidationRequest, cache_key: str) -> str:
+        """Coalescing key; re-validations against different previous versions get their own change summary."""
+        if not self._is_incremental(request):
+            return cache_key
+        if request.previous_schema_content is not None:
+            return f"{cache_key}:content:{schema_content_hash(request.previous_schema_content)}"
+        return f"{cache_key}:id:{request.previous_schema_id}"
+    
+    async def _run_incremental_analysis(self, request: SchemaValidationRequest, route: RoutingDecision,
+                                        start_time: float, rule_report: Optional[RuleReport] = None
+                                        ) -> Tuple[Optional[SchemaValidationResponse], ChangeSummary]:
+        """
+        Re-analyze only the entities that changed since a previous version.
+        
+        Recommendations for unchanged entities are carried over from the cached
+        analysis of the previous version. Returns (None, summary with the reason)
+        if a full analysis is needed instead.
+        """
+        previous_content = request.previous_schema_content
+        if previous_content is None:
+            previous_content = await self.versions.get(request.previous_schema_id)
+            if previous_content is None:
+                return None, ChangeSummary(incremental=False, reason=f"previous schema {request.previous_schema_id} not found")
+        
+        with stage("schema_diff"):
+            diff, reason = diff_schemas(previous_content, request.schema_content, request.schema_type, self.chunker)
+        if diff is None:
+            return None, ChangeSummary(incremental=False, reason=reason)
+        
+        summary = ChangeSummary(
+            incremental=False,
+            added=diff.added,
+            removed=diff.removed,
+            modified=diff.modified,
+            unchanged=diff.unchanged
+        )
+        if not diff.unchanged:
+            summary.reason = "no entities are unchanged"
+            return None, summary
+        
+        previous_request = request.model_copy(update={
+            "schema_content": previous_content,
+            "previous_schema_id": None,
+            "previous_schema_content": None
+        })
+        previous_route = self.router.route(previous_request, self.llm)
+        with stage("cache_lookup"):
+            previous = await self.cache.get(
+                self.cache.make_key(previous_request, previous_route.model, self.vector_store.corpus_version)
             )
+        if previous is None:
+            summary.reason = "no cached analysis of the previous version"
+            return None, summary
+        
+        # Local rule findings are re-evaluated on the new version, so the old ones are dropped
+        stale = set()
+        if rule_report is not None:
+            with stage("rule_engine"):
+                previous_report = self.rule_engine.evaluate(previous_request, self._practice_ids())
+                stale = {rec.description for rec in previous_report.findings}
+        carried = carry_over_analysis(previous, diff, stale)
+        
+        results = [(diff.unchanged_chunk, carried)]
+        failed, usage = [], []
+        if diff.changed_units:
+            chunks = self.chunker.pack(diff.header, diff.changed_units, settings.chunk_max_chars)
+            with stage("prompt_build"):
+                prompts = await self.prompt_builder.build_chunks(request, chunks, rule_report, note=SCHEMA_CHANGE_NOTE)
+            changed_results, failed, usage = await self._analyze_chunks(chunks, prompts, route)
+            results += changed_results
+        
+        analysis_result = merge_chunk_analyses(results, failed)
+        if rule_report is not None:
+            analysis_result = merge_rule_findings(analysis_result, rule_report)
+        
+        response = self._build_response(analysis_result, start_time)
+        self._apply_chunk_token_usage(response, usage)
+        if usage:
+            response.metadata = self._analysis_metadata(route, usage[0][1], rule_report)
+        else:
+            response.metadata = {"analysis_mode": self._analysis_mode(request).value}
+        self._mark_partial(response, analysis_result)
+        
+        summary.incremental = True
+        summary.reused_recommendations = len(carried["recommendations"])
+        response.change_summary = summary
+        logger.info(
+            f"Incremental analysis: {len(diff.added)} added, {len(diff.modified)} modified, "
+            f"{len(diff.removed)} removed, {len(diff.unchanged)} unchanged entities "
+            f"({summary.reused_recommendations} recommendations reused)"
+        )
+        return response, summary
+    
+    def _analysis_mode(self, request: SchemaValidationRequest) -> AnalysisMode:
+        return request.analysis_mode or AnalysisMode(settings.analysis_mode)
+    
+    def _run_rule_analysis(self, request: SchemaValidationRequest, start_time: float) -> SchemaValidationResponse:
+        """Answer a request from local rules alone (fast mode)."""
+        with stage("rule_engine"):
+            report = self.rule_engine.evaluate(request, self._practice_ids())
+        response = self._build_response(self.rule_engine.analysis(report), start_time)
+        response.metadata = {
+            "analysis_mode": AnalysisMode.FAST.value,
+            "rules_evaluated": len(report.results),
+            "rule_engine_ms": report.elapsed_ms
+        }
+        return response
+    
+    def _plan_chunks(self, request: SchemaValidationRequest) -> List[SchemaChunk]:
+        """Split a request into entity-level chunks if chunked analysis applies, else return []."""
+        if not settings.chunking_enabled or request.chunking is False:
+            return []
+        if request.chunking is None and len(request.schema_content) <= settings.chunking_threshold_chars:
+            return []
+        
+        chunks = self.chunker.chunk(request.schema_content, request.schema_type, settings.chunk_max_chars)
+        return chunks if len(chunks) > 1 else []
+    
+    async def _run_chunked_analysis(self, request: SchemaValidationRequest, route: RoutingDecision,
+                                    chunks: List[SchemaChunk], start_time: float,
+                                    rule_report: Optional[RuleReport] = None) -> SchemaValidationResponse:
+        """
+        Analyze schema chunks concurrently and merge them into one response.
+        
+        Chunks that fail are reported in the merged recommendations; the
+        analysis only fails if every chunk does.
+        """
+        with stage("prompt_build"):
+            prompts = await self.prompt_builder.build_chunks(request, chunks, rule_report)
+        results, failed, usage = await self._analyze_chunks(chunks, prompts, route)
+        
+        analysis_result = merge_chunk_analyses(results, failed)
+        if rule_report is not None:
+            analysis_result = merge_rule_findings(analysis_result, rule_report)
+        
+        response = self._build_response(analysis_result, start_time)
+        self._apply_chunk_token_usage(response, usage)
+        response.metadata = {
+            **self._analysis_metadata(route, usage[0][1], rule_report),
+            "chunks": len(chunks),
+            "failed_chunks": len(failed)
+        }
+        self._mark_partial(response, analysis_result)
+        return response
+    
+    async def _analyze_chunks(self, chunks: List[SchemaChunk], prompts: List[BuiltPrompt], route: RoutingDecision
+                              ) -> Tuple[List[Tuple[SchemaChunk, Dict[str, Any]]], List[SchemaChunk],
+                                         List[Tuple[BuiltPrompt, LLMResult]]]:
+        """
+        Run chunk prompts concurrently, returning (results, failed chunks, token usage).
+        
+        Raises the first error if every chunk failed. The concurrent calls are
+        timed together as the "llm" stage (including parsing).
+        """
+        semaphore = asyncio.Semaphore(settings.chunk_concurrency)
+        
+        async def run_chunk(prompt: BuiltPrompt) -> Tuple[Dict[str, Any], LLMResult]:
+            stop_timings()  # only affects this chunk's task
+            async with semaphore:
+                return await self._analyze_prompt(prompt, route)
+        
+        logger.info(
+            f"Analyzing {sum(len(c.entities) for c in chunks)} entities in {len(chunks)} chunks "
+            f"on {route.model} ({route.tier} tier)"
+        )
+        llm_start = time.time()
+        with stage("llm"):
+            outcomes = await asyncio.gather(*(run_chunk(prompt) for prompt in prompts), return_exceptions=True)
+        self.router.record_latency(route.tier, time.time() - llm_start)
+        
+        results, failed, usage = [], [], []
+        for chunk, prompt, outcome in zip(chunks, prompts, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error(f"Chunk {chunk.index + 1} ({chunk.name}) analysis failed: {outcome}")
+                failed.append(chunk)
+            else:
+                analysis_result, llm_result = outcome
+                results.append((chunk, analysis_result))
+                usage.append((prompt, llm_result))
+        if not results:
+            raise next(outcome for outcome in outcomes if isinstance(outcome, BaseException))
+        return results, failed, usage
+    
+    async def _analyze_prompt(self, prompt: BuiltPrompt, route: RoutingDecision) -> Tuple[Dict[str, Any], LLMResult]:
+        """Get and parse the analysis for one prompt, re-asking if the response is unusable."""
+        json_schema = analysis_json_schema() if settings.structured_output_enabled else None
+        with stage("llm"):
+            llm_result = await self._get_ai_analysis(prompt.text, system=prompt.system, route=route, json_schema=json_schema)
+        
+        # Parse and validate the response, re-asking once if it is unusable
+        with stage("parse"):
+            analysis_result = self.output_parser.parse(llm_result.text)
+        for _ in range(settings.llm_parse_retries):
+            if analysis_result is not None:
+                break
+            logger.warning("AI response did not match the analysis schema, retrying")
+            self.output_parser.record_retry()
+            with stage("llm"):
+                llm_result = await self._get_ai_analysis(prompt.text, system=prompt.system, route=route, json_schema=json_schema)
+            with stage("parse"):
+                analysis_result = self.output_parser.parse(llm_result.text)
+        
+        if analysis_result is None:
+            with stage("parse"):
+                analysis_result = self._fallback_analysis(llm_result.text)
+        return analysis_result, llm_result
+    
+    async def analyze_schema_stream(self, request: SchemaValidationRequest) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Analyze a schema, yielding (event, data) pairs as the analysis streams in.
+        
+        Each recommendation is emitted as soon as its JSON object is complete;
+        the final "result" event carries the full response including the score
+        and summary.
+        """
+        start_time = time.time()
+        timings = start_timings()
+        set_usage_labels(request.schema_type.value, request.platform.value if request.platform else None)
+        
+        try:
+            mode = self._analysis_mode(request)
+            if mode == AnalysisMode.FAST:
+                response = self._record_timings(self._run_rule_analysis(request, start_time), timings)
+                for recommendation in response.recommendations:
+                    yield "recommendation", recommendation.model_dump(mode="json")
+                yield "result", response.model_dump(mode="json")
+                return
             
-            # Also get all practices for this schema type
-            type_practices = self.vector_store.get_all_practices_for_schema_type(schema_type)
-            
-            # Combine and deduplicate
-            all_practices = {p["id"]: p for p in relevant_practices + type_practices}
-            
-            # Format as context
-            context_parts = []
-            for practice in all_practices.values():
-                metadata = practice["metadata"]
-                examples = json.loads(metadata.get("examples", "[]"))
-                
-                context_part = f"""
-**{metadata.get('category', 'general').title()} Best Practice:**
-{practice['content']}
-Examples: {'; '.join(examples) if examples else 'None'}
-Severity if missing: {metadata.get('severity', 'medium')}
-"""
-                context_parts.append(context_part)
+            route = self.router.route(request, self.llm)
+            with stage("cache_lookup"):
+                cache_key = self.cache.make_key(request, route.model, self.vector_store.corpus_version)
+                cached_response = await self.cache.get(cache_key)
+            if cached_response is not None:
+                cached_response.processing_time = time.time() - start_time
+                self._record_timings(cached_response, timings)
+                for recommendation in cached_response.recommendations:
+                    yield "recommendation", recommendation.model_dump(mode="json")
+                yield "result", cached_response.model_dump(mode="json")
+                return
+            
+            # Large schemas (analyzed in parallel parts) and incremental re-validations
+            # are replayed once merged
+            if self._plan_chunks(request) or self._is_incremental(request):
+                response = await self.analyze_schema(request, raise_on_error=True)
+                for recommendation in response.recommendations:
+                    yield "recommendation", recommendation.model_dump(mode="json")
+                yield "result", response.model_dump(mode="json")
+                return
+            
+            # Rule findings are known up front and sent before the model starts answering
+            rule_report = None
+            if mode == AnalysisMode.HYBRID:
+                with stage("rule_engine"):
+                    rule_report = self.rule_engine.evaluate(request, self._practice_ids())
+                for recommendation in rule_report.findings:
+                    yield "recommendation", recommendation.model_dump(mode="json")
+            
+            with stage("prompt_build"):
+                prompt = await self.prompt_builder.build(request, rule_report)
             
-            return "\n".join(context_parts)
+            parser = RecommendationStreamParser()
+            llm_start = time.time()
+            stream = await self._open_ai_stream(prompt.text, system=prompt.system, route=route)
+            try:
+                async for text in stream:
+                    for recommendation in parser.feed(text):
+                        yield "recommendation", recommendation.model_dump(mode="json")
+            finally:
+                await stream.aclose()
+            llm_result = stream.result
+            
+            # Measured by hand: a stage cannot stay open across the yields above
+            timings.add("llm", time.time() - llm_start)
+            self.router.record_latency(route.tier, time.time() - llm_start)
+            
+            with stage("parse"):
+                analysis_result = self._parse_ai_response(llm_result.text)
+            if rule_report is not None:
+                analysis_result = merge_rule_findings(analysis_result, rule_report)
+            response = self._build_response(analysis_result, start_time)
+            self._apply_token_usage(response, prompt, llm_result)
+            response.metadata = self._analysis_metadata(route, llm_result, rule_report)
+            self._mark_partial(response, analysis_result)
+            self._record_timings(response, timings)
+            if self._is_partial(response):
+                logger.warning("Not caching partial streamed schema analysis so a re-run analyzes it again")
+            else:
+                await self.cache.set(cache_key, response.model_copy(update={"timings": None}))
+                await self.versions.set(generate_schema_id(request), request.schema_content)
+            
+            logger.info(f"Streamed schema analysis completed in {response.processing_time:.2f}s")
+            yield "result", response.model_dump(mode="json")
             
         except Exception as e:
-            logger.error(f"Error getting best practices context: {e}")
-            return "Best practices context unavailable"
+            logger.error(f"Error streaming schema analysis: {e}")
+            ANALYSIS_ERRORS.inc()
+            yield "error", {"detail": f"Failed to analyze schema: {str(e)}"}
     
-    async def _get_ai_analysis(self, prompt: str) -> str:
-        """Get analysis from the configured AI provider."""
-        try:
-            if self.provider == "openai":
-                response = self.openai_client.chat.completions.create(
-                    model=settings.gpt_model,
-                    messages=[
-                        {"role": "system", "content": "You are an expert database schema architect."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.1,
-                    max_tokens=2000
-                )
-                return response.choices[0].message.content
-                
-            elif self.provider == "anthropic":
-                response = self.anthropic_client.messages.create(
-                    model="claude-3-sonnet-20240229",
-                    max_tokens=2000,
-                    temperature=0.1,
-                    messages=[
-                        {"role": "user", "content": prompt}
-                    ]
+    def _build_response(self, analysis_result: Dict[str, Any], start_time: float) -> SchemaValidationResponse:
+        """Build a validation response from a parsed analysis result."""
+        processing_time = time.time() - start_time
+        
+        response = SchemaValidationResponse(
+            overall_score=analysis_result.get("overall_score", 5),
+            recommendations=[
+                Recommendation(**rec) for rec in analysis_result.get("recommendations", [])
+            ],
+            best_practices_applied=analysis_result.get("best_practices_applied", []),
+            missing_best_practices=analysis_result.get("missing_best_practices", []),
+            summary=analysis_result.get("summary", "Schema analysis completed"),
+            processing_time=processing_time
+        )
+        
+        logger.info(f"Schema analysis completed in {processing_time:.2f}s with score {response.overall_score}")
+        return response
+    
+    def _create_error_response(self, error: Exception, start_time: float) -> SchemaValidationResponse:
+        """Create a basic response carrying the analysis error."""
+        return SchemaValidationResponse(
+            overall_score=1,
+            recommendations=[
+                Recommendation(
+                    category="error",
+                    severity="high",
+                    description=f"Failed to analyze schema: {str(error)}",
+                    suggestion="Please check the schema format and try again",
+                    impact="Cannot provide recommendations due to analysis failure"
                 )
-                return response.content[0].text
-                
+            ],
+            best_practices_applied=[],
+            missing_best_practices=[],
+            summary="Analysis failed due to error",
+            processing_time=time.time() - start_time
+        )
+    
+    def _apply_token_usage(self, response: SchemaValidationResponse, prompt: BuiltPrompt, llm_result: LLMResult):
+        """Report provider token usage (or the prompt estimate) on the response."""
+        response.prompt_tokens = llm_result.prompt_tokens or prompt.prompt_tokens
+        response.cached_prompt_tokens = llm_result.cached_tokens
+        response.completion_tokens = llm_result.completion_tokens or estimate_tokens(llm_result.text)
+        if llm_result.cached_tokens:
+            logger.info(f"Prompt cache hit: {llm_result.cached_tokens}/{response.prompt_tokens} prompt tokens cached")
+    
+    def _apply_chunk_token_usage(self, response: SchemaValidationResponse,
+                                 usage: List[Tuple[BuiltPrompt, LLMResult]]):
+        """Report the token usage summed over several prompts on the response."""
+        response.prompt_tokens = sum(llm_result.prompt_tokens or prompt.prompt_tokens for prompt, llm_result in usage)
+        response.cached_prompt_tokens = sum(llm_result.cached_tokens or 0 for _, llm_result in usage)
+        response.completion_tokens = sum(
+            llm_result.completion_tokens or estimate_tokens(llm_result.text) for _, llm_result in usage
+        )
+    
+    def _record_timings(self, response: SchemaValidationResponse, timings: StageTimings) -> SchemaValidationResponse:
+        """Attach a request's stage timings to its response, log them and add them to the stage latency stats."""
+        response.timings = timings.as_dict()
+        for name, seconds in timings.stages.items():
+            self.stage_latency.setdefault(name, LatencyStats()).record(seconds)
+            STAGE_LATENCY.labels(name).observe(seconds)
+        
+        message = "Stage timings: " + ", ".join(f"{name}={ms:.1f}ms" for name, ms in response.timings.items())
+        if response.prompt_tokens is not None:
+            message += f" ({response.prompt_tokens} prompt, {response.completion_tokens} completion tokens)"
+        logger.info(message)
+        return response
+    
+    def get_stage_stats(self) -> Dict[str, Any]:
+        """Get latency percentiles (seconds) per processing stage."""
+        return {name: stats.get_stats() for name, stats in self.stage_latency.items()}
+    
+    def _analysis_metadata(self, route: RoutingDecision, llm_result: LLMResult,
+                           rule_report: Optional[RuleReport] = None) -> Dict[str, Any]:
+        """Describe which provider, model and routing tier produced an analysis."""
+        metadata = {
+            "analysis_mode": AnalysisMode.HYBRID.value if rule_report is not None else AnalysisMode.FULL.value,
+            "provider": llm_result.provider,
+            "model": llm_result.model,
+            "tier": route.tier,
+            "complexity_score": route.complexity_score,
+            "path": llm_result.path,
+            "attempts": llm_result.attempts
+        }
+        if rule_report is not None:
+            metadata["rules_settled"] = len(rule_report.results)
+        return metadata
+    
+    def _mark_partial(self, response: SchemaValidationResponse, analysis_result: Dict[str, Any]):
+        """Flag a response whose analysis is incomplete (failed chunks or an unparseable answer)."""
+        if analysis_result.get("partial"):
+            response.metadata = {**(response.metadata or {}), "partial": True}
+    
+    def _is_partial(self, response: SchemaValidationResponse) -> bool:
+        return bool(response.metadata and response.metadata.get("partial"))
+    
+    def _practice_ids(self) -> Optional[Container[str]]:
+        """Practice ids the local rules are checked against (None, i.e. unchecked, while the catalog is not loaded)."""
+        return self.vector_store.catalog if self.vector_store.catalog.loaded else None
+    
+    def _alternate_provider(self) -> Optional[LLMProvider]:
+        """Get a configured provider other than the primary, if any."""
+        return next((p for name, p in self.providers.items() if name != self.llm.name), None)
+    
+    async def _get_ai_analysis(self, prompt: str, max_tokens: int = 2000, system: Optional[str] = None,
+                               route: Optional[RoutingDecision] = None,
+                               json_schema: Optional[Dict[str, Any]] = None) -> LLMResult:
+        """
+        Get analysis from the configured AI provider.
+        
+        Calls are retried on transient errors and may be hedged or failed over
+        to the alternate provider, using the same model tier there. While the
+        primary is unavailable, calls degrade to the alternate's fast model.
+        """
+        async def call(provider: LLMProvider, model: str) -> LLMResult:
+            return await provider.complete(prompt, max_tokens=max_tokens, system=system, model=model,
+                                           json_schema=json_schema)
+        
+        tier = route.tier if route else STRONG_TIER
+        alternate = self._alternate_provider()
+        try:
+            return await self.resilient_caller.call(
+                call,
+                (self.llm, route.model if route else self.llm.model),
+                (alternate, self.router.model_for_tier(alternate, tier)) if alternate else None,
+                (alternate, self.router.model_for_tier(alternate, FAST_TIER)) if alternate else None
+            )
         except Exception as e:
             logger.error(f"Error getting AI analysis: {e}")
             raise
     
+    async def _open_ai_stream(self, prompt: str, system: Optional[str], route: RoutingDecision) -> LLMStream:
+        """
+        Open a streamed analysis on the configured AI provider.
+        
+        Until the first chunk arrives, failures are retried and failed over
+        (or degraded) to the alternate provider as in _get_ai_analysis;
+        streams are never hedged.
+        """
+        json_schema = analysis_json_schema() if settings.structured_output_enabled else None
+        
+        def stream(provider: LLMProvider, model: str, result: LLMResult) -> AsyncIterator[str]:
+            return provider.stream(prompt, system=system, result=result, model=model, json_schema=json_schema)
+        
+        alternate = self._alternate_provider()
+        try:
+            return await self.resilient_caller.open_stream(
+                stream,
+                (self.llm, route.model),
+                (alternate, self.router.model_for_tier(alternate, route.tier)) if alternate else None,
+                (alternate, self.router.model_for_tier(alternate, FAST_TIER)) if alternate else None
+            )
+        except Exception as e:
+            logger.error(f"Error starting AI analysis stream: {e}")
+            raise
+    
     def _parse_ai_response(self, response: str) -> Dict[str, Any]:
         """Parse the AI response into structured format."""
-        try:
-            # Try to extract JSON from the response
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-            
-            if start_idx != -1 and end_idx != -1:
-                json_str = response[start_idx:end_idx]
-                return json.loads(json_str)
-            else:
-                # Fallback: create a basic structure
-                return self._create_fallback_response(response)
-                
-        except json.JSONDecodeError:
-            logger.warning("Failed to parse AI response as JSON, using fallback")
-            return self._create_fallback_response(response)
+        analysis_result = self.output_parser.parse(response)
+        if analysis_result is None:
+            return self._fallback_analysis(response)
+        return analysis_result
+    
+    def _fallback_analysis(self, response: str) -> Dict[str, Any]:
+        """Record and build the fallback analysis for an unparseable response."""
+        logger.warning("Failed to parse AI response against the analysis schema, using fallback")
+        self.output_parser.record_fallback()
+        return self._create_fallback_response(response)
     
     def _create_fallback_response(self, response: str) -> Dict[str, Any]:
         """Create a fallback response when JSON parsing fails."""
@@ -190,12 +659,30 @@ Severity if missing: {metadata.get('severity', 'medium')}
             ],
             "best_practices_applied": [],
             "missing_best_practices": ["Unable to determine from response"],
-            "summary": "Analysis completed with parsing issues"
+            "summary": "Analysis completed with parsing issues",
+            "partial": True
         }
     
-    async def get_schema_recommendations_only(self, schema_content: str, schema_type: SchemaType) -> List[str]:
-        """Get a simple list of recommendations without full analysis."""
+    async def get_schema_recommendations_only(self, schema_content: str, schema_type: SchemaType,
+                                              analysis_mode: AnalysisMode = AnalysisMode.FULL) -> List[str]:
+        """
+        Get a simple list of recommendations without full analysis.
+        
+        In fast mode only local rule findings are returned, without any AI call;
+        in hybrid mode they are listed ahead of the AI recommendations.
+        """
+        set_usage_labels(schema_type.value)
         try:
+            rule_recommendations = []
+            if analysis_mode != AnalysisMode.FULL:
+                report = self.rule_engine.evaluate(
+                    SchemaValidationRequest(schema_content=schema_content, schema_type=schema_type),
+                    self._practice_ids()
+                )
+                rule_recommendations = [f"{rec.description}. {rec.suggestion}" for rec in report.findings]
+                if analysis_mode == AnalysisMode.FAST:
+                    return rule_recommendations
+            
             simple_prompt = f"""
 Analyze this {schema_type.value} schema and provide 3-5 key improvement recommendations:
 
@@ -204,18 +691,7 @@ Analyze this {schema_type.value} schema and provide 3-5 key improvement recommen
 Provide only a numbered list of specific, actionable recommendations.
 """
             
-            if self.provider == "openai":
-                response = self.openai_client.chat.completions.create(
-                    model=settings.gpt_model,
-                    messages=[
-                        {"role": "system", "content": "You are an expert database schema architect."},
-                        {"role": "user", "content": simple_prompt}
-                    ],
-                    temperature=0.1,
-                    max_tokens=1000
-                ).choices[0].message.content
-            else:
-                response = await self._get_ai_analysis(simple_prompt)
+            response = (await self._get_ai_analysis(simple_prompt, max_tokens=1000)).text
             
             # Parse simple recommendations
             recommendations = []
@@ -227,7 +703,7 @@ Provide only a numbered list of specific, actionable recommendations.
                     if clean_line:
                         recommendations.append(clean_line)
             
-            return recommendations[:5]  # Limit to 5 recommendations
+            return rule_recommendations + recommendations[:5]  # Limit to 5 AI recommendations
             
         except Exception as e:
             logger.error(f"Error getting simple recommendations: {e}")
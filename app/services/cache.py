@@ -0,0 +1,233 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.core.metrics import CACHE_HIT_RATIO, CACHE_LOOKUPS
+from app.models.schema import SchemaValidationRequest, SchemaValidationResponse
+from loguru import logger
+
+
+CACHE_KEY_PREFIX = "schema_validation:"
+SCHEMA_VERSION_KEY_PREFIX = "schema_version:"
+
+
+def schema_content_hash(schema_content: str) -> str:
+    """Hash of the raw schema content (same fingerprint used for schema IDs)."""
+    return hashlib.md5(schema_content.encode()).hexdigest()
+
+
+def generate_schema_id(request: SchemaValidationRequest) -> str:
+    """Generate the tracking ID returned as `schema_id` for a schema."""
+    return f"{request.schema_type.value}_{schema_content_hash(request.schema_content)[:8]}"
+
+
+class LRUCache:
+    """Bounded in-process LRU cache with per-entry TTL."""
+    
+    def __init__(self, max_entries: int, ttl: Optional[int] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+    
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.time():
+            del self._entries[key]
+            return None
+        
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: Any):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self) -> int:
+        count = len(self._entries)
+        self._entries.clear()
+        return count
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCache:
+    """Optional shared cache tier backed by Redis."""
+    
+    def __init__(self, url: str, ttl: int):
+        import redis.asyncio as aioredis
+        
+        self.ttl = ttl
+        self.client = aioredis.from_url(url, decode_responses=True)
+    
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(key)
+    
+    async def set(self, key: str, value: str):
+        await self.client.set(key, value, ex=self.ttl)
+    
+    async def clear(self) -> int:
+        count = 0
+        async for key in self.client.scan_iter(match=f"{CACHE_KEY_PREFIX}*"):
+            count += await self.client.delete(key)
+        return count
+
+
+class ValidationCache:
+    """Two-tier cache (in-process LRU + optional Redis) for validation results."""
+    
+    def __init__(self):
+        self.enabled = settings.cache_enabled
+        self.memory = LRUCache(settings.cache_max_entries, settings.cache_ttl)
+        self.redis: Optional[RedisCache] = None
+        
+        if self.enabled and settings.redis_cache_enabled:
+            try:
+                self.redis = RedisCache(settings.redis_url, settings.cache_ttl)
+                logger.info(f"Validation cache using Redis tier at {settings.redis_url}")
+            except Exception as e:
+                logger.warning(f"Redis cache tier unavailable, using in-process cache only: {e}")
+        
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.redis_errors = 0
+        CACHE_HIT_RATIO.set_function(lambda: self.get_stats()["hit_ratio"])
+    
+    def make_key(self, request: SchemaValidationRequest, model: str, corpus_version: str) -> str:
+        """Build the cache key for a validation request."""
+        fingerprint = json.dumps([
+            schema_content_hash(request.schema_content),
+            request.schema_type.value,
+            request.platform.value if request.platform else None,
+            request.include_best_practices,
+            request.chunking,
+            request.analysis_mode.value if request.analysis_mode else None,
+            model,
+            corpus_version
+        ])
+        return CACHE_KEY_PREFIX + hashlib.sha256(fingerprint.encode()).hexdigest()
+    
+    async def get(self, key: str) -> Optional[SchemaValidationResponse]:
+        """Look up a cached response, checking the in-process tier first."""
+        if not self.enabled:
+            return None
+        
+        response = self.memory.get(key)
+        if response is not None:
+            self.memory_hits += 1
+            CACHE_LOOKUPS.labels("memory_hit").inc()
+            return response.model_copy(deep=True)
+        
+        if self.redis is not None:
+            try:
+                payload = await self.redis.get(key)
+                if payload is not None:
+                    response = SchemaValidationResponse.model_validate_json(payload)
+                    self.memory.set(key, response)
+                    self.redis_hits += 1
+                    CACHE_LOOKUPS.labels("redis_hit").inc()
+                    return response.model_copy(deep=True)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Redis cache lookup failed: {e}")
+        
+        self.misses += 1
+        CACHE_LOOKUPS.labels("miss").inc()
+        return None
+    
+    async def set(self, key: str, response: SchemaValidationResponse):
+        """Store a response in every enabled tier."""
+        if not self.enabled:
+            return
+        
+        response = response.model_copy(deep=True)
+        self.memory.set(key, response)
+        
+        if self.redis is not None:
+            try:
+                await self.redis.set(key, response.model_dump_json())
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Redis cache store failed: {e}")
+    
+    async def clear(self) -> Dict[str, int]:
+        """Purge all cached validation results."""
+        removed = {"memory": self.memory.clear(), "redis": 0}
+        if self.redis is not None:
+            try:
+                removed["redis"] = await self.redis.clear()
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Redis cache purge failed: {e}")
+        logger.info(f"Validation cache purged: {removed}")
+        return removed
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for the cache."""
+        hits = self.memory_hits + self.redis_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "redis_enabled": self.redis is not None,
+            "entries": len(self.memory),
+            "max_entries": self.memory.max_entries,
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "redis_errors": self.redis_errors
+        }
+
+
+
+class SchemaVersionStore:
+    """
+    Content of recently validated schemas by schema_id.
+    
+    Lets clients re-validate against a previous version by its schema_id
+    without sending the old content again. Uses the same tiers as the
+    validation cache.
+    """
+    
+    def __init__(self):
+        self.memory = LRUCache(settings.schema_versions_max_entries, settings.cache_ttl)
+        self.redis: Optional[RedisCache] = None
+        
+        if settings.redis_cache_enabled:
+            try:
+                self.redis = RedisCache(settings.redis_url, settings.cache_ttl)
+            except Exception as e:
+                logger.warning(f"Redis unavailable for schema versions, using in-process store only: {e}")
+    
+    async def get(self, schema_id: str) -> Optional[str]:
+        """Look up the content of a previously validated schema."""
+        content = self.memory.get(schema_id)
+        if content is None and self.redis is not None:
+            try:
+                content = await self.redis.get(SCHEMA_VERSION_KEY_PREFIX + schema_id)
+                if content is not None:
+                    self.memory.set(schema_id, content)
+            except Exception as e:
+                logger.warning(f"Redis schema version lookup failed: {e}")
+        return content
+    
+    async def set(self, schema_id: str, schema_content: str):
+        """Remember the content validated under a schema_id."""
+        if self.memory.get(schema_id) is not None:
+            return
+        self.memory.set(schema_id, schema_content)
+        if self.redis is not None:
+            try:
+                await self.redis.set(SCHEMA_VERSION_KEY_PREFIX + schema_id, schema_content)
+            except Exception as e:
+                logger.warning(f"Redis schema version store failed: {e}")
@@ -0,0 +1,189 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+import anthropic
+import httpx
+import openai
+from app.core.config import settings
+from loguru import logger
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether an LLM call error is transient (timeouts, connection errors, 429s and 5xx)."""
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(error, (openai.APIConnectionError, anthropic.APIConnectionError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return status_code is not None and (status_code == 429 or status_code >= 500)
+
+
+class ProviderUnavailableError(Exception):
+    """A provider call was rejected without being sent (breaker open or concurrency limit reached)."""
+    
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(ProviderUnavailableError):
+    pass
+
+
+class ConcurrencyLimitError(ProviderUnavailableError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker for one provider.
+    
+    Calls that fail with a transient error or take longer than the slow-call
+    threshold count as failures. Once the failure rate over the recent window
+    crosses the threshold the breaker opens and calls fail fast; after the
+    cooldown a single probe call is let through to decide whether to close.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.state = self.CLOSED
+        self.outcomes: Deque[bool] = deque(maxlen=settings.breaker_window)  # True = failed
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+    
+    def before_call(self):
+        """Raise CircuitOpenError if a call may not be sent right now."""
+        if self.state == self.OPEN:
+            remaining = settings.breaker_cooldown - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} circuit breaker is open", retry_after=remaining)
+            self.state = self.HALF_OPEN
+            logger.info(f"{self.name} circuit breaker half-open, sending probe call")
+        
+        if self.state == self.HALF_OPEN:
+            if self.probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} circuit breaker is half-open", retry_after=settings.breaker_cooldown)
+            self.probe_in_flight = True
+    
+    def record_success(self, latency: float):
+        self._record(latency > settings.breaker_slow_call_seconds)
+    
+    def record_failure(self):
+        self._record(True)
+    
+    def record_cancelled(self):
+        """Release the probe slot of a call that was abandoned before finishing."""
+        if self.state == self.HALF_OPEN:
+            self.probe_in_flight = False
+    
+    def error_rate(self) -> float:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+    
+    def _record(self, failed: bool):
+        if self.state == self.HALF_OPEN:
+            self.probe_in_flight = False
+            if failed:
+                self._open()
+            else:
+                self.state = self.CLOSED
+                self.outcomes.clear()
+                logger.info(f"{self.name} circuit breaker closed")
+            return
+        if self.state == self.OPEN:
+            return  # late result of a call sent before the breaker opened
+        
+        self.outcomes.append(failed)
+        if len(self.outcomes) >= settings.breaker_min_calls and self.error_rate() >= settings.breaker_error_rate:
+            self._open()
+    
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        logger.warning(f"{self.name} circuit breaker opened (error rate {self.error_rate():.0%})")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker state and counters."""
+        return {
+            "state": self.state,
+            "error_rate": round(self.error_rate(), 4),
+            "window_calls": len(self.outcomes),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on outstanding calls to one provider.
+    
+    The limit grows by one per limit's worth of fast, successful calls and is
+    cut multiplicatively on transient errors or calls slower than the latency
+    target. Callers wait in FIFO order for a free slot and fail fast once the
+    queue timeout is exceeded.
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.limit = float(settings.llm_concurrency_initial)
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.rejected = 0
+    
+    async def acquire(self):
+        """Wait for a free call slot."""
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout=settings.llm_concurrency_queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as we gave up on it
+                self._release_slot()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected += 1
+                raise ConcurrencyLimitError(
+                    f"{self.name} concurrency limit ({int(self.limit)}) reached",
+                    retry_after=settings.llm_concurrency_queue_timeout
+                ) from None
+            raise
+    
+    def release(self, latency: Optional[float] = None, overloaded: bool = False):
+        """Free a slot and adapt the limit to the call's outcome (None latency leaves it unchanged)."""
+        if overloaded or (latency is not None and latency > settings.llm_concurrency_latency_target):
+            self.limit = max(1.0, self.limit * settings.llm_concurrency_backoff)
+        elif latency is not None:
+            self.limit = min(float(settings.llm_concurrency_max), self.limit + 1.0 / self.limit)
+        self._release_slot()
+    
+    def _release_slot(self):
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.in_flight += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the current limit and queue counters."""
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "rejected": self.rejected
+        }
@@ -0,0 +1,35 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one upstream call."""
+    
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() for key, or wait for the identical call already in flight."""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        
+        # Shield so one caller disconnecting does not cancel the shared call
+        return await asyncio.shield(task)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing counters."""
+        total = self.executed + self.coalesced
+        return {
+            "in_flight": len(self._in_flight),
+            "upstream_calls": self.executed,
+            "coalesced_calls": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0
+        }
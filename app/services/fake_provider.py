@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+from typing import Any, AsyncIterator, Dict, Optional
+from app.core.config import settings
+from app.models.schema import SchemaType, SchemaValidationRequest
+from app.services.llm_providers import LLMProvider, LLMResult, estimate_tokens
+from app.services.rule_engine import RuleEngine
+from loguru import logger
+
+
+FAKE_MODEL = "fake-schema-analyzer"
+
+# Completion text is streamed in pieces of about this many tokens
+STREAM_PIECE_TOKENS = 8
+
+_ANALYSIS_PROMPT = re.compile(r"Schema Type: (\w+)\nSchema Content:\n(.*)\n\nAnalyze this schema", re.DOTALL)
+_SIMPLE_PROMPT = re.compile(r"Analyze this (\w+) schema and provide .*?:\n\n(.*)\n\nProvide only a numbered list", re.DOTALL)
+
+
+class FakeProviderError(Exception):
+    """Injected provider failure; looks like a 503 so it is retried like a real one."""
+    
+    status_code = 503
+
+
+class FakeProvider(LLMProvider):
+    """
+    Local provider for load testing without API keys.
+    
+    Answers are schema-aware and valid against the analysis schema: the schema
+    is extracted from the prompt and run through the local rule engine. Time
+    to first token follows the configured latency distribution, the rest of
+    the completion arrives at the configured token throughput, and a share of
+    calls can fail with a transient error or hang until the request timeout.
+    Prompt prefixes seen before are reported as cached.
+    """
+    
+    name = "fake"
+    
+    def __init__(self):
+        super().__init__()
+        self.random = random.Random(settings.fake_seed)
+        self.rule_engine = RuleEngine()
+        self._seen_prefixes = set()
+        self.injected_errors = 0
+        self.injected_timeouts = 0
+    
+    @property
+    def model(self) -> str:
+        return FAKE_MODEL
+    
+    async def _complete(self, system: str, prompt: str, max_tokens: int, timeout: Optional[float],
+                        model: str, json_schema: Optional[Dict[str, Any]]) -> LLMResult:
+        result = LLMResult(provider=self.name, model=model)
+        text = self._respond(prompt)
+        await self._wait_first_token(timeout)
+        if settings.fake_tokens_per_second > 0:
+            await asyncio.sleep(estimate_tokens(text) / settings.fake_tokens_per_second)
+        result.text = text
+        self._apply_usage(result, system, prompt)
+        return result
+    
+    async def _stream(self, system: str, prompt: str, max_tokens: int, timeout: Optional[float],
+                      result: LLMResult, json_schema: Optional[Dict[str, Any]]) -> AsyncIterator[str]:
+        text = self._respond(prompt)
+        await self._wait_first_token(timeout)
+        piece_chars = STREAM_PIECE_TOKENS * 4
+        for i in range(0, len(text), piece_chars):
+            if i and settings.fake_tokens_per_second > 0:
+                await asyncio.sleep(STREAM_PIECE_TOKENS / settings.fake_tokens_per_second)
+            yield text[i:i + piece_chars]
+        self._apply_usage(result, system, prompt)
+    
+    def sample_latency(self) -> float:
+        """Draw a time to first token from the configured distribution."""
+        base = settings.fake_latency_seconds
+        distribution = settings.fake_latency_distribution
+        if distribution == "fixed":
+            return base
+        if distribution == "uniform":
+            return self.random.uniform(0, 2 * base)
+        if distribution == "exponential":
+            return self.random.expovariate(1 / base) if base > 0 else 0.0
+        return self.random.lognormvariate(0, settings.fake_latency_sigma) * base
+    
+    def get_health(self) -> Dict[str, Any]:
+        return {**super().get_health(), "simulation": self.get_stats()}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the simulation settings and injected failure counters."""
+        return {
+            "latency_distribution": settings.fake_latency_distribution,
+            "latency_seconds": settings.fake_latency_seconds,
+            "tokens_per_second": settings.fake_tokens_per_second,
+            "error_rate": settings.fake_error_rate,
+            "timeout_rate": settings.fake_timeout_rate,
+            "injected_errors": self.injected_errors,
+            "injected_timeouts": self.injected_timeouts
+        }
+    
+    async def _wait_first_token(self, timeout: Optional[float]):
+        roll = self.random.random()
+        if roll < settings.fake_timeout_rate:
+            self.injected_timeouts += 1
+            await asyncio.sleep(timeout or settings.llm_request_timeout)
+            raise asyncio.TimeoutError("Injected fake provider timeout")
+        
+        await asyncio.sleep(self.sample_latency())
+        if roll < settings.fake_timeout_rate + settings.fake_error_rate:
+            self.injected_errors += 1
+            raise FakeProviderError("Injected fake provider error (503)")
+    
+    def _apply_usage(self, result: LLMResult, system: str, prompt: str):
+        prefix_key = hashlib.md5(system.encode()).hexdigest()
+        cached = estimate_tokens(system) if prefix_key in self._seen_prefixes else 0
+        self._seen_prefixes.add(prefix_key)
+        
+        result.prompt_tokens = estimate_tokens(system) + estimate_tokens(prompt)
+        result.completion_tokens = estimate_tokens(result.text)
+        result.cached_tokens = cached
+    
+    def _respond(self, prompt: str) -> str:
+        """Build a response in the format the prompt asks for."""
+        simple = _SIMPLE_PROMPT.search(prompt)
+        if simple:
+            analysis = self._analyze(simple.group(2), simple.group(1))
+            return "\n".join(
+                f"{i}. {rec['category'].title()}: {rec['description']}. {rec['suggestion']}"
+                for i, rec in enumerate(analysis["recommendations"], start=1)
+            )
+        
+        match = _ANALYSIS_PROMPT.search(prompt)
+        if match is None:
+            logger.warning("Fake provider could not find a schema in the prompt")
+            return json.dumps(self._analyze("", None))
+        return json.dumps(self._analyze(match.group(2), match.group(1)))
+    
+    def _analyze(self, schema_content: str, schema_type: Optional[str]) -> Dict[str, Any]:
+        try:
+            request = SchemaValidationRequest(schema_content=schema_content, schema_type=SchemaType(schema_type))
+        except ValueError:
+            request = None
+        
+        report = self.rule_engine.evaluate(request) if request is not None else None
+        analysis = self.rule_engine.analysis(report) if report is not None and report.results else {
+            "overall_score": 5,
+            "recommendations": [],
+            "best_practices_applied": [],
+            "missing_best_practices": []
+        }
+        
+        entities = report.entities if report is not None else 0
+        analysis["recommendations"].append({
+            "category": "data_types",
+            "severity": "low",
+            "description": f"Review the data types chosen across {max(entities, 1)} entities",
+            "suggestion": "Use the most specific type for each field (e.g. DECIMAL for currency, TIMESTAMP for dates)",
+            "impact": "Improves data integrity and storage efficiency"
+        })
+        analysis["summary"] = (
+            f"Simulated analysis of {report.fields if report is not None else 0} fields "
+            f"in {entities} entities by the fake provider."
+        )
+        return analysis
@@ -0,0 +1,300 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from sqlalchemy import Column, Float, MetaData, String, Table, Text, create_engine, delete, func, select
+from app.core.config import settings
+from app.core.stats import LatencyStats
+from app.models.schema import JobStatus, SchemaValidationRequest, SchemaValidationResponse, ValidationJob
+from app.services.cache import generate_schema_id
+from app.services.circuit_breaker import ProviderUnavailableError
+from loguru import logger
+
+
+metadata = MetaData()
+
+jobs_table = Table(
+    "validation_jobs",
+    metadata,
+    Column("id", String(36), primary_key=True),
+    Column("status", String(16), nullable=False, index=True),
+    Column("request", Text, nullable=False),
+    Column("result", Text),
+    Column("error", Text),
+    Column("created_at", Float, nullable=False),
+    Column("started_at", Float),
+    Column("completed_at", Float)
+)
+
+
+class JobStore:
+    """Persistent store for validation jobs (SQLite by default, via DATABASE_URL)."""
+    
+    def __init__(self, database_url: Optional[str] = None):
+        database_url = database_url or settings.database_url
+        connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+        self.engine = create_engine(database_url, connect_args=connect_args)
+        metadata.create_all(self.engine)
+        logger.info(f"Job store ready at {database_url}")
+    
+    def create(self, request: SchemaValidationRequest) -> ValidationJob:
+        job = ValidationJob(job_id=str(uuid.uuid4()), status=JobStatus.PENDING, created_at=time.time())
+        with self.engine.begin() as conn:
+            conn.execute(jobs_table.insert().values(
+                id=job.job_id,
+                status=job.status.value,
+                request=request.model_dump_json(),
+                created_at=job.created_at
+            ))
+        return job
+    
+    def get(self, job_id: str) -> Optional[ValidationJob]:
+        with self.engine.connect() as conn:
+            row = conn.execute(select(jobs_table).where(jobs_table.c.id == job_id)).mappings().first()
+        return self._to_job(row) if row else None
+    
+    def get_request(self, job_id: str) -> SchemaValidationRequest:
+        with self.engine.connect() as conn:
+            payload = conn.execute(select(jobs_table.c.request).where(jobs_table.c.id == job_id)).scalar_one()
+        return SchemaValidationRequest.model_validate_json(payload)
+    
+    def get_unfinished_ids(self) -> List[str]:
+        """Get pending and interrupted jobs, oldest first."""
+        query = (
+            select(jobs_table.c.id)
+            .where(jobs_table.c.status.in_([JobStatus.PENDING.value, JobStatus.RUNNING.value]))
+            .order_by(jobs_table.c.created_at)
+        )
+        with self.engine.connect() as conn:
+            return list(conn.execute(query).scalars())
+    
+    def mark_running(self, job_id: str) -> float:
+        started_at = time.time()
+        self._update(job_id, status=JobStatus.RUNNING.value, started_at=started_at)
+        return started_at
+    
+    def mark_pending(self, job_id: str, error: str):
+        """Put a job back to pending (to be retried), noting why its last run did not finish."""
+        self._update(job_id, status=JobStatus.PENDING.value, error=error)
+    
+    def mark_completed(self, job_id: str, result: SchemaValidationResponse):
+        self._update(job_id, status=JobStatus.COMPLETED.value, result=result.model_dump_json(), error=None,
+                     completed_at=time.time())
+    
+    def mark_failed(self, job_id: str, error: str):
+        self._update(job_id, status=JobStatus.FAILED.value, error=error, completed_at=time.time())
+    
+    def delete_finished_before(self, cutoff: float) -> int:
+        """Delete completed and failed jobs that finished before `cutoff`; returns the number deleted."""
+        query = delete(jobs_table).where(
+            jobs_table.c.status.in_([JobStatus.COMPLETED.value, JobStatus.FAILED.value]),
+            jobs_table.c.completed_at < cutoff
+        )
+        with self.engine.begin() as conn:
+            return conn.execute(query).rowcount
+    
+    def count_by_status(self) -> Dict[str, int]:
+        query = select(jobs_table.c.status, func.count()).group_by(jobs_table.c.status)
+        with self.engine.connect() as conn:
+            counts = {status: count for status, count in conn.execute(query)}
+        return {status.value: counts.get(status.value, 0) for status in JobStatus}
+    
+    def _update(self, job_id: str, **values):
+        with self.engine.begin() as conn:
+            conn.execute(jobs_table.update().where(jobs_table.c.id == job_id).values(**values))
+    
+    def _to_job(self, row) -> ValidationJob:
+        return ValidationJob(
+            job_id=row["id"],
+            status=JobStatus(row["status"]),
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            completed_at=row["completed_at"],
+            result=SchemaValidationResponse.model_validate_json(row["result"]) if row["result"] else None,
+            error=row["error"]
+        )
+
+
+class JobQueue:
+    """
+    In-process worker pool that runs validation jobs from the job store.
+    
+    Jobs are executed by background workers independent of the submitting
+    request, and unfinished jobs are re-queued when the service restarts.
+    A job whose provider is unavailable (breaker open, degraded) goes back to
+    pending and is re-queued with backoff, failing only after
+    job_max_attempts runs. Finished jobs are deleted once older than
+    job_retention_seconds.
+    """
+    
+    def __init__(self, ai_service, store: JobStore):
+        self.ai_service = ai_service
+        self.store = store
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.workers: List[asyncio.Task] = []
+        self.pruner: Optional[asyncio.Task] = None
+        self.running = 0
+        self.retries = 0
+        self.pruned = 0
+        self._attempts: Dict[str, int] = {}  # runs of jobs that hit an unavailable provider
+        self._retry_timers: Dict[str, asyncio.TimerHandle] = {}
+        self._waiters: Dict[str, asyncio.Event] = {}
+        self._waiter_counts: Dict[str, int] = {}
+        self.queue_wait = LatencyStats()
+        self.run_time = LatencyStats()
+        self.total_latency = LatencyStats()
+    
+    async def start(self):
+        """Start the worker pool and resume jobs left unfinished by a previous run."""
+        unfinished = await asyncio.to_thread(self.store.get_unfinished_ids)
+        for job_id in unfinished:
+            self.queue.put_nowait(job_id)
+        if unfinished:
+            logger.info(f"Resuming {len(unfinished)} unfinished validation jobs")
+        
+        self.workers = [asyncio.create_task(self._worker(i)) for i in range(settings.job_workers)]
+        if settings.job_retention_seconds > 0:
+            self.pruner = asyncio.create_task(self._prune_periodically())
+        logger.info(f"Started {settings.job_workers} validation job workers")
+    
+    async def stop(self):
+        """Stop the worker pool; in-progress and retrying jobs are resumed on the next start."""
+        for timer in self._retry_timers.values():
+            timer.cancel()
+        self._retry_timers.clear()
+        tasks = self.workers + ([self.pruner] if self.pruner else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers = []
+        self.pruner = None
+    
+    async def submit(self, request: SchemaValidationRequest) -> ValidationJob:
+        """Persist a new job and queue it for execution."""
+        job = await asyncio.to_thread(self.store.create, request)
+        await self.queue.put(job.job_id)
+        logger.info(f"Queued validation job {job.job_id}")
+        return job
+    
+    async def get(self, job_id: str, wait: float = 0) -> Optional[ValidationJob]:
+        """Get a job, optionally long-polling up to `wait` seconds for it to finish."""
+        if wait <= 0:
+            return await asyncio.to_thread(self.store.get, job_id)
+        
+        # Registered before the first read, so a job finishing during the read still wakes us
+        event = self._waiters.setdefault(job_id, asyncio.Event())
+        self._waiter_counts[job_id] = self._waiter_counts.get(job_id, 0) + 1
+        try:
+            job = await asyncio.to_thread(self.store.get, job_id)
+            if job is None or job.status in (JobStatus.COMPLETED, JobStatus.FAILED):
+                return job
+            try:
+                await asyncio.wait_for(event.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            return await asyncio.to_thread(self.store.get, job_id)
+        finally:
+            self._waiter_counts[job_id] -= 1
+            if not self._waiter_counts[job_id]:
+                del self._waiter_counts[job_id]
+                del self._waiters[job_id]
+    
+    async def _worker(self, worker_id: int):
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self._run_job(job_id)
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} failed on job {job_id}: {e}")
+            finally:
+                self.queue.task_done()
+    
+    async def _run_job(self, job_id: str):
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or job.status in (JobStatus.COMPLETED, JobStatus.FAILED):
+            return
+        
+        request = await asyncio.to_thread(self.store.get_request, job_id)
+        started_at = await asyncio.to_thread(self.store.mark_running, job_id)
+        self.queue_wait.record(started_at - job.created_at)
+        self.running += 1
+        finished = True
+        try:
+            result = await self.ai_service.analyze_schema(request, raise_on_error=True)
+            result.schema_id = generate_schema_id(request)
+            await asyncio.to_thread(self.store.mark_completed, job_id, result)
+            logger.info(f"Validation job {job_id} completed")
+        except ProviderUnavailableError as e:
+            finished = not await self._schedule_retry(job_id, e)
+        except Exception as e:
+            await asyncio.to_thread(self.store.mark_failed, job_id, str(e))
+            logger.error(f"Validation job {job_id} failed: {e}")
+        finally:
+            self.running -= 1
+            finished_at = time.time()
+            self.run_time.record(finished_at - started_at)
+            if finished:
+                self._attempts.pop(job_id, None)
+                self.total_latency.record(finished_at - job.created_at)
+                event = self._waiters.get(job_id)  # removed by the last waiter
+                if event is not None:
+                    event.set()
+    
+    async def _schedule_retry(self, job_id: str, error: ProviderUnavailableError) -> bool:
+        """Re-queue a job after backoff while attempts remain (else mark it failed); returns whether it was."""
+        attempt = self._attempts.get(job_id, 0) + 1
+        if attempt >= settings.job_max_attempts:
+            self._attempts.pop(job_id, None)
+            await asyncio.to_thread(self.store.mark_failed, job_id, f"{error} (gave up after {attempt} attempts)")
+            logger.error(f"Validation job {job_id} failed after {attempt} attempts: {error}")
+            return False
+        
+        self._attempts[job_id] = attempt
+        delay = min(
+            max(settings.job_retry_base_delay * 2 ** (attempt - 1), error.retry_after),
+            settings.job_retry_max_delay
+        )
+        await asyncio.to_thread(
+            self.store.mark_pending, job_id, f"{error} (attempt {attempt} of {settings.job_max_attempts})"
+        )
+        self._retry_timers[job_id] = asyncio.get_running_loop().call_later(delay, self._requeue, job_id)
+        self.retries += 1
+        logger.warning(f"Validation job {job_id} provider unavailable, retrying in {delay:.1f}s: {error}")
+        return True
+    
+    def _requeue(self, job_id: str):
+        self._retry_timers.pop(job_id, None)
+        self.queue.put_nowait(job_id)
+    
+    async def prune(self) -> int:
+        """Delete completed and failed jobs older than the retention period; returns the number deleted."""
+        deleted = await asyncio.to_thread(
+            self.store.delete_finished_before, time.time() - settings.job_retention_seconds
+        )
+        if deleted:
+            self.pruned += deleted
+            logger.info(f"Deleted {deleted} validation jobs past the retention period")
+        return deleted
+    
+    async def _prune_periodically(self):
+        while True:
+            try:
+                await self.prune()
+            except Exception as e:
+                logger.error(f"Error pruning validation jobs: {e}")
+            await asyncio.sleep(settings.job_prune_interval)
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth, job counts and latency statistics."""
+        return {
+            "queue_depth": self.queue.qsize(),
+            "running": self.running,
+            "workers": len(self.workers),
+            "retrying": len(self._retry_timers),
+            "retries": self.retries,
+            "pruned": self.pruned,
+            "jobs_by_status": await asyncio.to_thread(self.store.count_by_status),
+            "queue_wait_seconds": self.queue_wait.get_stats(),
+            "run_time_seconds": self.run_time.get_stats(),
+            "total_latency_seconds": self.total_latency.get_stats()
+        }
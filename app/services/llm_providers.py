@@ -0,0 +1,430 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+import openai
+import anthropic
+import httpx
+from typing import Any, AsyncIterator, Dict, Optional
+from pydantic import BaseModel
+from app.core.config import settings
+from app.core.metrics import LLM_ERRORS, LLM_IN_FLIGHT, LLM_LATENCY, LLM_TOKENS
+from app.core.stats import LatencyStats
+from app.core.usage import usage_tracker
+from app.services.rate_limiter import ProviderRateLimiter
+from app.services.circuit_breaker import AdaptiveConcurrencyLimiter, CircuitBreaker, is_transient_error
+from loguru import logger
+
+
+SYSTEM_PROMPT = "You are an expert database schema architect."
+
+# Name of the response schema (OpenAI) / forced tool (Anthropic) in structured-output mode
+STRUCTURED_OUTPUT_NAME = "record_response"
+
+class LLMResult(BaseModel):
+    """Completion text plus the provider-reported token usage."""
+    provider: str
+    model: str
+    text: str = ""
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None  # prompt tokens served from the provider's prompt cache
+    path: str = "primary"  # primary, hedge or failover request that produced the answer
+    attempts: int = 1
+
+
+# Shared HTTP connection pool used by every provider client in this worker
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared, pooled HTTP client for LLM provider calls."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_keepalive_connections,
+                keepalive_expiry=settings.llm_keepalive_expiry
+            ),
+            timeout=httpx.Timeout(
+                settings.llm_request_timeout,
+                connect=settings.llm_connect_timeout
+            )
+        )
+        logger.info(
+            f"Created LLM HTTP pool (max_connections={settings.llm_max_connections}, "
+            f"keepalive={settings.llm_max_keepalive_connections})"
+        )
+    return _http_client
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate for rate limiting (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+async def _first_chunk(chunks: AsyncIterator[str]) -> Optional[str]:
+    """Wait for the first chunk of a stream (None if it is empty), leaving the stream open."""
+    async for text in chunks:
+        return text
+    return None
+
+
+async def close_http_client():
+    """Close the shared HTTP client (called on application shutdown)."""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
+
+class LLMProvider:
+    """Base class for async LLM provider clients."""
+    
+    name = "base"
+    
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.rate_limiter = ProviderRateLimiter(requests_per_minute, tokens_per_minute)
+        self.breaker = CircuitBreaker(self.name)
+        self.concurrency = AdaptiveConcurrencyLimiter(self.name)
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.latency = LatencyStats()  # successful call latency, used to time hedged requests
+    
+    @property
+    def model(self) -> str:
+        raise NotImplementedError
+    
+    async def complete(self, prompt: str, max_tokens: int = 2000, timeout: Optional[float] = None,
+                       system: Optional[str] = None, model: Optional[str] = None,
+                       json_schema: Optional[Dict[str, Any]] = None) -> LLMResult:
+        """
+        Send a single-turn prompt and return the completion with its usage.
+        
+        With `json_schema` the provider's structured-output mode constrains
+        the completion to a JSON document matching the schema. The timeout
+        (LLM_REQUEST_TIMEOUT by default) starts once the rate and concurrency
+        limiters have admitted the call.
+        """
+        system = system or SYSTEM_PROMPT
+        async with self._guarded_call(estimate_tokens(system) + estimate_tokens(prompt) + max_tokens):
+            result = await asyncio.wait_for(
+                self._complete(system, prompt, max_tokens, timeout, model or self.model, json_schema),
+                timeout=timeout or settings.llm_request_timeout
+            )
+        self._record_usage(result)
+        return result
+    
+    async def stream(self, prompt: str, max_tokens: int = 2000, timeout: Optional[float] = None,
+                     system: Optional[str] = None, result: Optional[LLMResult] = None,
+                     model: Optional[str] = None, json_schema: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Send a single-turn prompt and yield completion text as it arrives.
+        
+        If `result` is given it is filled with the full text and usage once
+        the stream completes. `model` overrides the provider's default model
+        and `json_schema` enables structured output as for complete(). The
+        timeout bounds the wait for the first chunk once the call has been
+        admitted; later chunks are bounded by the HTTP read timeout.
+        """
+        system = system or SYSTEM_PROMPT
+        result = result or LLMResult(provider=self.name, model=model or self.model)
+        result.model = model or result.model
+        async with self._guarded_call(estimate_tokens(system) + estimate_tokens(prompt) + max_tokens):
+            chunks = self._stream(system, prompt, max_tokens, timeout, result, json_schema)
+            try:
+                text = await asyncio.wait_for(_first_chunk(chunks), timeout=timeout or settings.llm_request_timeout)
+                if text is not None:
+                    result.text += text
+                    yield text
+                    async for text in chunks:
+                        result.text += text
+                        yield text
+            finally:
+                await chunks.aclose()
+        self._record_usage(result)
+    
+    @asynccontextmanager
+    async def _guarded_call(self, estimated_tokens: int):
+        """
+        Admit one call through the breaker, rate limiter and concurrency limiter.
+        
+        The call's outcome and latency are fed back to the breaker and the
+        adaptive concurrency limit.
+        """
+        self.breaker.before_call()
+        try:
+            await self.rate_limiter.acquire(estimated_tokens)
+            await self.concurrency.acquire()
+        except BaseException:
+            self.breaker.record_cancelled()
+            raise
+        
+        start_time = time.time()
+        LLM_IN_FLIGHT.labels(self.name).inc()
+        try:
+            yield
+        except Exception as e:
+            LLM_ERRORS.labels(self.name, type(e).__name__).inc()
+            if is_transient_error(e):
+                self.breaker.record_failure()
+                self.concurrency.release(overloaded=True)
+            else:
+                # The provider answered; the request itself was rejected
+                self.breaker.record_success(time.time() - start_time)
+                self.concurrency.release()
+            raise
+        except BaseException:
+            # Timed out or abandoned (e.g. a losing hedge); only a slow abandoned call says anything
+            elapsed = time.time() - start_time
+            if elapsed > settings.breaker_slow_call_seconds:
+                self.breaker.record_success(elapsed)
+            else:
+                self.breaker.record_cancelled()
+            self.concurrency.release(elapsed if elapsed > settings.llm_concurrency_latency_target else None)
+            raise
+        finally:
+            LLM_IN_FLIGHT.labels(self.name).dec()
+        
+        latency = time.time() - start_time
+        LLM_LATENCY.labels(self.name).observe(latency)
+        self.latency.record(latency)
+        self.breaker.record_success(latency)
+        self.concurrency.release(latency)
+    
+    def get_health(self) -> Dict[str, Any]:
+        """Get circuit breaker and adaptive concurrency state."""
+        return {
+            "circuit_breaker": self.breaker.get_stats(),
+            "concurrency": self.concurrency.get_stats()
+        }
+    
+    def get_prompt_cache_stats(self) -> Dict[str, Any]:
+        """Get the share of prompt tokens served from the provider prompt cache."""
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cached_ratio": round(self.cached_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0
+        }
+    
+    def _record_usage(self, result: LLMResult):
+        self.calls += 1
+        self.prompt_tokens += result.prompt_tokens or 0
+        self.cached_tokens += result.cached_tokens or 0
+        LLM_TOKENS.labels(self.name, result.model, "prompt").inc(result.prompt_tokens or 0)
+        LLM_TOKENS.labels(self.name, result.model, "completion").inc(result.completion_tokens or 0)
+        LLM_TOKENS.labels(self.name, result.model, "cached_prompt").inc(result.cached_tokens or 0)
+        usage_tracker.record(
+            self.name,
+            result.model,
+            result.prompt_tokens or 0,
+            result.cached_tokens or 0,
+            result.completion_tokens or estimate_tokens(result.text)
+        )
+    
+    async def _complete(self, system: str, prompt: str, max_tokens: int, timeout: Optional[float],
+                        model: str, json_schema: Optional[Dict[str, Any]]) -> LLMResult:
+        raise NotImplementedError
+    
+    def _stream(self, system: str, prompt: str, max_tokens: int, timeout: Optional[float],
+                result: LLMResult, json_schema: Optional[Dict[str, Any]]) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+
+class OpenAIProvider(LLMProvider):
+    """
+    OpenAI chat completions client.
+    
+    OpenAI caches prompt prefixes automatically, so the stable system prefix
+    is sent first and cache hits are read from the reported usage.
+    """
+    
+    name = "openai"
+    
+    def __init__(self, api_key: str):
+        super().__init__(settings.openai_rpm, settings.openai_tpm)
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key,
+            http_client=get_http_client(),
+            max_retries=0  # retries are handled by ResilientCaller
+        )
+    
+    @property
+    def model(self) -> str:
+        return settings.gpt_model
+    
+    async def _complete(self, system: str, prompt: str, max_tokens: int, timeout: Optional[float],
+                        model: str, json_schema: Optional[Dict[str, Any]]) -> LLMResult:
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.1,
+            max_tokens=max_tokens,
+            response_format=self._response_format(model, json_schema),
+            timeout=timeout or settings.llm_request_timeout
+        )
+        result = LLMResult(provider=self.name, model=model, text=response.choices[0].message.content or "")
+        self._apply_usage(result, response.usage)
+        return result
+    
+    async def _stream(self, system: str, prompt: str, max_tokens: int, timeout: Optional[float],
+                      result: LLMResult, json_schema: Optional[Dict[str, Any]]) -> AsyncIterator[str]:
+        stream = await self.client.chat.completions.create(
+            model=result.model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.1,
+            max_tokens=max_tokens,
+            response_format=self._response_format(result.model, json_schema),
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=timeout or settings.llm_request_timeout
+        )
+        async for chunk in stream:
+            if chunk.usage is not None:
+                self._apply_usage(result, chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def _response_format(self, model: str, json_schema: Optional[Dict[str, Any]]):
+        """Strict JSON schema output on models that support it, plain JSON mode on older ones."""
+        if json_schema is None:
+            return openai.NOT_GIVEN
+        if model.startswith("gpt-4o"):
+            return {
+                "type": "json_schema",
+                "json_schema": {"name": STRUCTURED_OUTPUT_NAME, "strict": True, "schema": json_schema}
+            }
+        if model.startswith(("gpt-4-turbo", "gpt-3.5-turbo")):
+            return {"type": "json_object"}
+        return openai.NOT_GIVEN
+    
+    def _apply_usage(self, result: LLMResult, usage):
+        if usage is None:
+            return
+        result.prompt_tokens = usage.prompt_tokens
+        result.completion_tokens = usage.completion_tokens
+        details = getattr(usage, "prompt_tokens_details", None)
+        result.cached_tokens = (details.cached_tokens or 0) if details else 0
+
+
+class AnthropicProvider(LLMProvider):
+    """
+    Anthropic messages client.
+    
+    The system prefix is marked with an ephemeral cache breakpoint so repeated
+    prompts with the same prefix are served from Anthropic's prompt cache.
+    """
+    
+    name = "anthropic"
+    
+    def __init__(self, api_key: str):
+        super().__init__(settings.anthropic_rpm, settings.anthropic_tpm)
+        self.client = anthropic.AsyncAnthropic(
+            api_key=api_key,
+            http_client=get_http_client(),
+            max_retries=0  # retries are handled by ResilientCaller
+        )
+    
+    @property
+    def model(self) -> str:
+        return settings.claude_model
+    
+    async def _complete(self, system: str, prompt: str, max_tokens: int, timeout: Optional[float],
+                        model: str, json_schema: Optional[Dict[str, Any]]) -> LLMResult:
+        response = await self.client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=0.1,
+            system=self._system_blocks(system),
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            timeout=timeout or settings.llm_request_timeout,
+            **self._tool_options(json_schema)
+        )
+        result = LLMResult(provider=self.name, model=model, text=self._response_text(response.content))
+        self._apply_usage(result, response.usage)
+        return result
+    
+    async def _stream(self, system: str, prompt: str, max_tokens: int, timeout: Optional[float],
+                      result: LLMResult, json_schema: Optional[Dict[str, Any]]) -> AsyncIterator[str]:
+        async with self.client.messages.stream(
+            model=result.model,
+            max_tokens=max_tokens,
+            temperature=0.1,
+            system=self._system_blocks(system),
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            timeout=timeout or settings.llm_request_timeout,
+            **self._tool_options(json_schema)
+        ) as stream:
+            async for event in stream:
+                if event.type != "content_block_delta":
+                    continue
+                # Forced tool calls stream their JSON input as partial_json deltas
+                if event.delta.type == "text_delta":
+                    yield event.delta.text
+                elif event.delta.type == "input_json_delta":
+                    yield event.delta.partial_json
+            final_message = await stream.get_final_message()
+            self._apply_usage(result, final_message.usage)
+    
+    def _tool_options(self, json_schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Structured output via a forced tool call whose input schema is the response schema."""
+        if json_schema is None:
+            return {}
+        return {
+            "tools": [{
+                "name": STRUCTURED_OUTPUT_NAME,
+                "description": "Record the response in the required structure.",
+                "input_schema": json_schema
+            }],
+            "tool_choice": {"type": "tool", "name": STRUCTURED_OUTPUT_NAME}
+        }
+    
+    def _response_text(self, content) -> str:
+        """Get the completion text, or the forced tool call's input as JSON."""
+        for block in content:
+            if block.type == "tool_use":
+                return json.dumps(block.input)
+        return "".join(block.text for block in content if block.type == "text")
+    
+    def _system_blocks(self, system: str):
+        if not settings.prompt_caching_enabled:
+            return system
+        return [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+    
+    def _apply_usage(self, result: LLMResult, usage):
+        if usage is None:
+            return
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+        # input_tokens excludes tokens read from or written to the cache
+        result.prompt_tokens = usage.input_tokens + cache_read + cache_write
+        result.completion_tokens = usage.output_tokens
+        result.cached_tokens = cache_read
+
+
+def create_provider(provider_name: str) -> Optional[LLMProvider]:
+    """Create a provider client for the given name, or None if it has no API key."""
+    if provider_name == "fake":
+        from app.services.fake_provider import FakeProvider
+        
+        return FakeProvider()
+    if provider_name == "openai":
+        api_key = settings.get_decrypted_openai_key()
+        return OpenAIProvider(api_key) if api_key else None
+    if provider_name == "anthropic":
+        api_key = settings.get_decrypted_anthropic_key()
+        return AnthropicProvider(api_key) if api_key else None
+    return None
@@ -0,0 +1,132 @@
+import re
+from typing import Any, Dict, Optional
+from pydantic import BaseModel
+from app.core.config import settings
+from app.core.stats import LatencyStats
+from app.models.schema import SchemaType, SchemaValidationRequest
+from loguru import logger
+
+
+FAST_TIER = "fast"
+STRONG_TIER = "strong"
+
+# Patterns counting top-level entities (tables, records, messages) per schema type
+_SQL_TABLE = re.compile(r"\bCREATE\s+(?:OR\s+REPLACE\s+)?(?:\w+\s+)*?TABLE\b", re.IGNORECASE)
+_ENTITY_PATTERNS = {
+    SchemaType.SQL_DDL: _SQL_TABLE,
+    SchemaType.BIGQUERY: _SQL_TABLE,
+    SchemaType.SNOWFLAKE: _SQL_TABLE,
+    SchemaType.REDSHIFT: _SQL_TABLE,
+    SchemaType.PROTOBUF: re.compile(r"^\s*(?:message|enum)\s+\w+", re.MULTILINE),
+    SchemaType.AVRO: re.compile(r'"type"\s*:\s*"record"'),
+    SchemaType.JSON_SCHEMA: re.compile(r'"type"\s*:\s*"object"'),
+}
+
+# Relational DDL carries constraints/indexing/normalization concerns on top of naming and types
+_SCHEMA_TYPE_WEIGHTS = {
+    SchemaType.SQL_DDL: 1.25,
+    SchemaType.BIGQUERY: 1.25,
+    SchemaType.SNOWFLAKE: 1.25,
+    SchemaType.REDSHIFT: 1.25,
+    SchemaType.PROTOBUF: 1.0,
+    SchemaType.AVRO: 1.0,
+    SchemaType.JSON_SCHEMA: 1.0,
+}
+
+CHARS_PER_POINT = 1000
+
+
+class RoutingDecision(BaseModel):
+    tier: str
+    model: str
+    complexity_score: float
+
+
+class ModelRouter:
+    """
+    Route analyses to a fast or a strong model based on schema complexity.
+    
+    Complexity combines schema size, entity count and a schema type weight;
+    requests scoring at or above the configured threshold use the strong model.
+    On the OpenAI path both tiers default to gpt-4o-mini (the GPT_MODEL
+    default), so routing only changes the model once GPT_MODEL is set to a
+    stronger one; check_tiers warns while the tiers are identical.
+    """
+    
+    def __init__(self):
+        self.latency = {FAST_TIER: LatencyStats(), STRONG_TIER: LatencyStats()}
+    
+    def count_entities(self, schema_content: str, schema_type: SchemaType) -> int:
+        """Count top-level entities (tables, records, messages) in a schema."""
+        pattern = _ENTITY_PATTERNS.get(schema_type)
+        return max(1, len(pattern.findall(schema_content))) if pattern else 1
+    
+    def score(self, request: SchemaValidationRequest) -> float:
+        """Score the complexity of a validation request."""
+        entities = self.count_entities(request.schema_content, request.schema_type)
+        size_points = len(request.schema_content) / CHARS_PER_POINT
+        return round((size_points + entities) * _SCHEMA_TYPE_WEIGHTS.get(request.schema_type, 1.0), 2)
+    
+    def route(self, request: SchemaValidationRequest, provider) -> RoutingDecision:
+        """Pick the model tier for a request on the given provider."""
+        score = self.score(request)
+        tier = FAST_TIER if settings.router_enabled and score < settings.router_score_threshold else STRONG_TIER
+        return RoutingDecision(tier=tier, model=self.model_for_tier(provider, tier), complexity_score=score)
+    
+    def model_for_tier(self, provider, tier: str) -> str:
+        """Get a provider's model for the given tier."""
+        if tier == FAST_TIER:
+            return self.fast_model(provider.name) or provider.model
+        return provider.model
+    
+    def strong_model(self, provider_name: str) -> Optional[str]:
+        """Get the strong tier model for a provider."""
+        if provider_name == "openai":
+            return settings.gpt_model
+        if provider_name == "anthropic":
+            return settings.claude_model
+        return None
+    
+    def tiers_identical(self, provider_name: str) -> bool:
+        """Whether both tiers use the same model on a provider, i.e. routing has no effect there."""
+        fast_model = self.fast_model(provider_name)
+        return fast_model is not None and fast_model == self.strong_model(provider_name)
+    
+    def check_tiers(self, provider_name: str) -> bool:
+        """Warn if routing is enabled but has no effect on a provider; returns whether the tiers differ."""
+        if not self.tiers_identical(provider_name):
+            return True
+        if settings.router_enabled:
+            logger.warning(
+                f"Model routing has no effect on {provider_name}: fast and strong tiers both use "
+                f"{self.fast_model(provider_name)}"
+            )
+        return False
+    
+    def fast_model(self, provider_name: str) -> Optional[str]:
+        """Get the fast tier model for a provider."""
+        if provider_name == "openai":
+            return settings.router_fast_model
+        if provider_name == "anthropic":
+            return settings.claude_fast_model
+        return None
+    
+    def record_latency(self, tier: str, seconds: float):
+        """Record the LLM call latency of one analysis on the given tier."""
+        self.latency[tier].record(seconds)
+    
+    def get_config(self) -> Dict[str, Any]:
+        """Get the current routing configuration."""
+        return {
+            "enabled": settings.router_enabled,
+            "score_threshold": settings.router_score_threshold,
+            "fast_model": settings.router_fast_model,
+            "strong_model": settings.gpt_model,
+            "claude_fast_model": settings.claude_fast_model,
+            "claude_strong_model": settings.claude_model,
+            "tiers_identical": {name: self.tiers_identical(name) for name in ("openai", "anthropic")}
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-tier LLM latency for tuning the thresholds."""
+        return {tier: stats.get_stats() for tier, stats in self.latency.items()}
@@ -0,0 +1,143 @@
+import json
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+from app.models.schema import Platform, SchemaType
+from loguru import logger
+
+
+class PracticeCatalog:
+    """
+    Decoded in-memory copy of the best practices corpus.
+    
+    Loaded once from the vector store and kept current write-through by the
+    store's add/update/delete methods, so listing practices never goes back to
+    Chroma. Entries have the shape the API returns ({"id", "content",
+    "metadata"}) and must be treated as read-only; they are indexed by schema
+    type, platform (practices without platforms apply to all of them) and
+    category. Safe to use from the vector store's executor threads.
+    
+    `loaded` stays False until a full load succeeds; until then the vector
+    store answers listings from Chroma instead.
+    """
+    
+    def __init__(self):
+        self._practices: Dict[str, Dict[str, Any]] = {}
+        self._by_schema_type: Dict[str, Set[str]] = {}
+        self._by_platform: Dict[str, Set[str]] = {}
+        self._by_category: Dict[str, Set[str]] = {}
+        self._all_platforms: Set[str] = set()
+        self._lock = threading.RLock()
+        self.loaded = False
+    
+    def __len__(self) -> int:
+        return len(self._practices)
+    
+    def __contains__(self, practice_id: str) -> bool:
+        return practice_id in self._practices
+    
+    def load(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Replace the catalog with the given practices; on failure it is left empty and not loaded."""
+        with self._lock:
+            self.loaded = False
+            self._clear()
+            try:
+                for practice_id, document, metadata in zip(ids, documents, metadatas, strict=True):
+                    self.put(practice_id, document, metadata)
+            except BaseException:
+                self._clear()
+                raise
+            self.loaded = True
+        logger.info(f"Loaded {len(self)} best practices into the catalog")
+    
+    def put(self, practice_id: str, content: str, metadata: Dict[str, Any]):
+        """Add a practice, or replace it in place if it is already present."""
+        if not isinstance(metadata, dict):
+            logger.warning(f"Best practice {practice_id} has no metadata mapping ({type(metadata).__name__})")
+            metadata = {}
+        applicability = self._applicability(practice_id, metadata)
+        
+        with self._lock:
+            self._unindex(practice_id)
+            self._practices[practice_id] = {"id": practice_id, "content": content, "metadata": metadata}
+            if applicability is None:
+                return
+            
+            schema_types, platforms = applicability
+            for schema_type in schema_types:
+                self._by_schema_type.setdefault(schema_type, set()).add(practice_id)
+            for platform in platforms:
+                self._by_platform.setdefault(platform, set()).add(practice_id)
+            if not platforms:
+                self._all_platforms.add(practice_id)
+            self._by_category.setdefault(str(metadata.get("category", "general")), set()).add(practice_id)
+    
+    def remove(self, practice_id: str) -> bool:
+        """Remove a practice; returns False if it was not in the catalog."""
+        with self._lock:
+            if practice_id not in self._practices:
+                return False
+            self._unindex(practice_id)
+            del self._practices[practice_id]
+            return True
+    
+    def get(self, practice_id: str) -> Optional[Dict[str, Any]]:
+        return self._practices.get(practice_id)
+    
+    def practices(self, schema_type: Optional[SchemaType] = None, platform: Optional[Platform] = None,
+                  category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get the practices matching every given filter, in insertion order."""
+        with self._lock:
+            matches = None
+            if schema_type is not None:
+                matches = self._by_schema_type.get(schema_type.value, set())
+            if platform is not None:
+                platform_matches = self._by_platform.get(platform.value, set()) | self._all_platforms
+                matches = platform_matches if matches is None else matches & platform_matches
+            if category is not None:
+                category_matches = self._by_category.get(category, set())
+                matches = category_matches if matches is None else matches & category_matches
+            
+            if matches is None:
+                return list(self._practices.values())
+            return [practice for practice_id, practice in self._practices.items() if practice_id in matches]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the number of practices per schema type, platform and category."""
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "practices": len(self),
+                "all_platforms": len(self._all_platforms),
+                "by_schema_type": {key: len(ids) for key, ids in sorted(self._by_schema_type.items())},
+                "by_platform": {key: len(ids) for key, ids in sorted(self._by_platform.items())},
+                "by_category": {key: len(ids) for key, ids in sorted(self._by_category.items())}
+            }
+    
+    def _applicability(self, practice_id: str, metadata: Dict[str, Any]) -> Optional[Tuple[List[str], List[str]]]:
+        """Decode a practice's schema types and platforms; None (listed, but never matched) if malformed."""
+        try:
+            schema_types = json.loads(metadata.get("schema_types", "[]"))
+            platforms = json.loads(metadata.get("platforms", "[]"))
+        except (TypeError, json.JSONDecodeError):
+            schema_types, platforms = None, None
+        
+        if not all(isinstance(values, list) and all(isinstance(value, str) for value in values)
+                   for values in (schema_types, platforms)):
+            logger.warning(f"Malformed applicability metadata for best practice {practice_id}")
+            return None
+        return schema_types, platforms
+    
+    def _clear(self):
+        self._practices.clear()
+        self._by_schema_type.clear()
+        self._by_platform.clear()
+        self._by_category.clear()
+        self._all_platforms.clear()
+    
+    def _unindex(self, practice_id: str):
+        for index in (self._by_schema_type, self._by_platform, self._by_category):
+            for key in [key for key, ids in index.items() if practice_id in ids]:
+                index[key].discard(practice_id)
+                if not index[key]:
+                    del index[key]
+        self._all_platforms.discard(practice_id)
@@ -0,0 +1,332 @@
+import json
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+from pydantic import BaseModel
+from app.core.config import (
+    settings,
+    SCHEMA_ANALYSIS_SYSTEM_PROMPT,
+    SCHEMA_ANALYSIS_PRACTICES_BLOCK,
+    SCHEMA_ANALYSIS_USER_PROMPT,
+    SCHEMA_CHUNK_NOTE,
+    SCHEMA_SETTLED_RULES_NOTE
+)
+from app.models.schema import SchemaValidationRequest
+from app.services.cache import LRUCache
+from app.services.llm_providers import estimate_tokens
+from app.services.rule_engine import RuleReport
+from app.services.schema_chunker import SchemaChunk
+from app.services.vector_store import VectorStoreService
+from loguru import logger
+
+
+SEVERITY_RANK = {"high": 0, "medium": 1, "low": 2}
+
+# Below this many remaining tokens no further practice snippet can fit
+MIN_SNIPPET_TOKENS = 40
+
+
+class BuiltPrompt(BaseModel):
+    system: str  # stable, cacheable prefix
+    text: str  # variable suffix carrying the schema
+    prompt_tokens: int
+    prefix_tokens: int = 0
+    context_tokens: int = 0
+    practices_included: List[str] = []
+    practices_dropped: int = 0
+
+
+class PromptContext(BaseModel):
+    system: str
+    additional_context: str = ""
+    context_tokens: int = 0
+    practices_included: List[str] = []
+    practices_dropped: int = 0
+
+
+class RenderedPractice(BaseModel):
+    snippet: str
+    tokens: int
+    platforms: List[str] = []  # empty = all platforms
+    severity: str = "medium"
+
+
+class StaticContext(BaseModel):
+    system: str  # system prompt with the per-type practice block
+    context: str = ""
+    included: List[str] = []
+    candidates: int = 0  # practices considered for the block
+
+
+class PromptBuilder:
+    """
+    Assemble analysis prompts with best practice context under a token budget.
+    
+    The prompt is laid out as a stable prefix (system instructions, output
+    contract and the practice block for the schema type and platform) and a
+    variable suffix (extra semantic hits and the schema), so repeated
+    validations of the same schema type share a cacheable prefix.
+    
+    Practices are ranked by relevance (semantic hits by distance, then
+    platform-specific and higher-severity practices) and added greedily until
+    each block's token budget is spent.
+    
+    Rendered practice snippets and the static block per (schema type,
+    platform, settled rules) are cached until the corpus version changes, so
+    a request only renders and ranks its semantic hits. Static blocks are kept
+    in a bounded LRU cache, as every combination of settled rules adds one.
+    """
+    
+    def __init__(self, vector_store: VectorStoreService):
+        self.vector_store = vector_store
+        self._corpus_version: Optional[str] = None
+        self._rendered: Dict[str, RenderedPractice] = {}
+        self._static = LRUCache(settings.prompt_static_cache_max_entries)
+        self.static_hits = 0
+        self.static_misses = 0
+    
+    async def build(self, request: SchemaValidationRequest, rule_report: Optional[RuleReport] = None) -> BuiltPrompt:
+        """Build the analysis prompt for a request, leaving out practices settled by local rules."""
+        context = await self._build_context(request, rule_report)
+        built = self._assemble(request, context, context.additional_context, request.schema_content)
+        logger.info(
+            f"Built analysis prompt: ~{built.prompt_tokens} tokens, ~{built.prefix_tokens} in cacheable prefix "
+            f"({len(built.practices_included)} practices in context, {built.practices_dropped} dropped by budget)"
+        )
+        return built
+    
+    async def build_chunks(self, request: SchemaValidationRequest, chunks: List[SchemaChunk],
+                           rule_report: Optional[RuleReport] = None, note: str = SCHEMA_CHUNK_NOTE) -> List[BuiltPrompt]:
+        """
+        Build one prompt per schema chunk, all sharing the request's best practice context.
+        
+        Practices are looked up once for the whole schema, so every chunk
+        prompt has the same cacheable prefix. `note` tells the model which
+        part of the schema it is looking at.
+        """
+        context = await self._build_context(request, rule_report)
+        prompts = [
+            self._assemble(
+                request,
+                context,
+                note.format(
+                    index=chunk.index + 1,
+                    total=len(chunks),
+                    schema_type=request.schema_type.value,
+                    entities=chunk.name
+                ) + context.additional_context,
+                chunk.content
+            )
+            for chunk in chunks
+        ]
+        logger.info(
+            f"Built {len(prompts)} chunk prompts: ~{sum(p.prompt_tokens for p in prompts)} tokens, "
+            f"~{prompts[0].prefix_tokens if prompts else 0} in shared prefix "
+            f"({len(context.practices_included)} practices in context)"
+        )
+        return prompts
+    
+    async def _build_context(self, request: SchemaValidationRequest,
+                             rule_report: Optional[RuleReport] = None) -> PromptContext:
+        """Select the best practice context for a request and render the system prefix."""
+        settled = frozenset(rule_report.settled) if rule_report else frozenset()
+        static = StaticContext(system=SCHEMA_ANALYSIS_SYSTEM_PROMPT)
+        dynamic_context = ""
+        included: List[str] = []
+        dropped = 0
+        
+        if request.include_best_practices:
+            try:
+                static = await self._static_context(request, settled)
+                included = list(static.included)
+                
+                # Semantic hits only add what the per-type block did not already cover
+                semantic_practices = [
+                    p for p in self._rank_practices(await self._search_practices(request), request)
+                    if p["id"] not in included and p["id"] not in settled
+                ]
+                dynamic_context, dynamic_ids = self._fill_budget(
+                    semantic_practices, settings.prompt_dynamic_context_budget
+                )
+                dropped = static.candidates + len(semantic_practices) - len(included) - len(dynamic_ids)
+                included += dynamic_ids
+            except Exception as e:
+                logger.error(f"Error getting best practices context: {e}")
+                static = self._render_static(request, "Best practices context unavailable", [], 0)
+        
+        additional_context = f"Additional Relevant Best Practices:\n{dynamic_context}\n\n" if dynamic_context else ""
+        if rule_report and rule_report.results:
+            additional_context = SCHEMA_SETTLED_RULES_NOTE.format(
+                rules="\n".join(f"- {result.title}" for result in rule_report.results)
+            ) + additional_context
+        
+        return PromptContext(
+            system=static.system,
+            additional_context=additional_context,
+            context_tokens=estimate_tokens(static.context + dynamic_context),
+            practices_included=included,
+            practices_dropped=dropped
+        )
+    
+    async def _static_context(self, request: SchemaValidationRequest, settled: FrozenSet[str]) -> StaticContext:
+        """Get the cached per-type practice block for a request, building it on first use."""
+        self._check_corpus_version()
+        key = json.dumps([
+            request.schema_type.value,
+            request.platform.value if request.platform else None,
+            sorted(settled),
+            settings.prompt_context_token_budget
+        ])
+        static = self._static.get(key)
+        if static is not None:
+            self.static_hits += 1
+            return static
+        
+        self.static_misses += 1
+        # Served from the catalog, but from Chroma while it is not loaded
+        practices = await self.vector_store.run_in_executor(
+            self.vector_store.get_all_practices_for_schema_type, request.schema_type
+        )
+        type_practices = [p for p in self._rank_practices(practices, request) if p["id"] not in settled]
+        context, included = self._fill_budget(type_practices, settings.prompt_context_token_budget)
+        static = self._render_static(request, context, included, len(type_practices))
+        self._static.set(key, static)
+        return static
+    
+    def _render_static(self, request: SchemaValidationRequest, context: str, included: List[str],
+                       candidates: int) -> StaticContext:
+        system = SCHEMA_ANALYSIS_SYSTEM_PROMPT
+        if context:
+            system += SCHEMA_ANALYSIS_PRACTICES_BLOCK.format(
+                schema_type=request.schema_type.value,
+                best_practices_context=context
+            )
+        return StaticContext(system=system, context=context, included=included, candidates=candidates)
+    
+    def _check_corpus_version(self):
+        """Drop every cached rendering once the best practices corpus has changed."""
+        corpus_version = self.vector_store.corpus_version
+        if corpus_version != self._corpus_version:
+            if self._corpus_version is not None:
+                logger.info(f"Best practices corpus changed ({self._corpus_version} -> {corpus_version}), "
+                            f"dropping {len(self._static)} cached context blocks")
+            self._rendered.clear()
+            self._static.clear()
+            self._corpus_version = corpus_version
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the prompt context cache statistics."""
+        lookups = self.static_hits + self.static_misses
+        return {
+            "corpus_version": self._corpus_version,
+            "rendered_practices": len(self._rendered),
+            "static_blocks": len(self._static),
+            "static_max_blocks": self._static.max_entries,
+            "static_hits": self.static_hits,
+            "static_misses": self.static_misses,
+            "static_hit_rate": round(self.static_hits / lookups, 4) if lookups else 0.0
+        }
+    
+    def _assemble(self, request: SchemaValidationRequest, context: PromptContext, additional_context: str,
+                  schema_content: str) -> BuiltPrompt:
+        text = SCHEMA_ANALYSIS_USER_PROMPT.format(
+            additional_context=additional_context,
+            schema_type=request.schema_type.value,
+            schema_content=schema_content
+        )
+        
+        prefix_tokens = estimate_tokens(context.system)
+        return BuiltPrompt(
+            system=context.system,
+            text=text,
+            prompt_tokens=prefix_tokens + estimate_tokens(text),
+            prefix_tokens=prefix_tokens,
+            context_tokens=context.context_tokens,
+            practices_included=context.practices_included,
+            practices_dropped=context.practices_dropped
+        )
+    
+    async def _search_practices(self, request: SchemaValidationRequest) -> List[Dict[str, Any]]:
+        """Find practices semantically relevant to the schema content (on the vector store's thread pool)."""
+        return await self.vector_store.search_relevant_practices_async(
+            query=request.schema_content[:500],  # Limit query length
+            schema_type=request.schema_type,
+            platform=request.platform,
+            limit=settings.prompt_semantic_candidates
+        )
+    
+    def _rank_practices(self, practices: List[Dict[str, Any]], request: SchemaValidationRequest) -> List[Dict[str, Any]]:
+        """
+        Order practices from most to least relevant.
+        
+        With a platform, other platforms' practices are dropped and its own
+        rank ahead of general ones; without one, every practice is kept and
+        general practices rank ahead of platform-specific ones.
+        """
+        platform = request.platform.value if request.platform else None
+        
+        ranked = []
+        for practice in practices:
+            rendered = self._rendered_practice(practice)
+            if platform is not None and rendered.platforms and platform not in rendered.platforms:
+                continue
+            
+            distance = practice.get("distance")
+            ranked.append((
+                0 if distance is not None else 1,
+                distance or 0.0,
+                0 if bool(rendered.platforms) == (platform is not None) else 1,
+                SEVERITY_RANK.get(rendered.severity, 1),
+                practice["id"],
+                practice
+            ))
+        
+        ranked.sort(key=lambda entry: entry[:5])
+        return [entry[-1] for entry in ranked]
+    
+    def _fill_budget(self, practices: List[Dict[str, Any]], budget: int) -> Tuple[str, List[str]]:
+        """Greedily add rendered practices that fit the remaining token budget."""
+        parts = []
+        included = []
+        remaining = budget
+        
+        for practice in practices:
+            if remaining < MIN_SNIPPET_TOKENS:
+                break
+            rendered = self._rendered_practice(practice)
+            if rendered.tokens <= remaining:
+                parts.append(rendered.snippet)
+                included.append(practice["id"])
+                remaining -= rendered.tokens
+        
+        return "\n".join(parts), included
+    
+    def _rendered_practice(self, practice: Dict[str, Any]) -> RenderedPractice:
+        """Get the rendered snippet and decoded metadata of a practice, rendering it on first use."""
+        self._check_corpus_version()
+        rendered = self._rendered.get(practice["id"])
+        if rendered is None:
+            metadata = practice["metadata"]
+            try:
+                platforms = json.loads(metadata.get("platforms", "[]"))
+            except json.JSONDecodeError:
+                platforms = []
+            snippet = self._render_practice(practice)
+            rendered = RenderedPractice(
+                snippet=snippet,
+                tokens=estimate_tokens(snippet),
+                platforms=platforms,
+                severity=metadata.get("severity", "medium")
+            )
+            self._rendered[practice["id"]] = rendered
+        return rendered
+    
+    def _render_practice(self, practice: Dict[str, Any]) -> str:
+        """Render one practice as a prompt context snippet."""
+        metadata = practice["metadata"]
+        examples = json.loads(metadata.get("examples", "[]"))
+        
+        return f"""
+**{metadata.get('category', 'general').title()} Best Practice:**
+{practice['content']}
+Examples: {'; '.join(examples) if examples else 'None'}
+Severity if missing: {metadata.get('severity', 'medium')}
+"""
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at a per-minute rate."""
+    
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+    
+    def time_until_available(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate_per_second
+    
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class ProviderRateLimiter:
+    """
+    Request- and token-per-minute limiter for one AI provider.
+    
+    Callers acquire before each LLM call; waiters are served in FIFO order so a
+    large batch cannot starve interactive requests that arrived earlier.
+    """
+    
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._lock = asyncio.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait_time = 0.0
+    
+    async def acquire(self, estimated_tokens: int = 0):
+        """Wait until one request of `estimated_tokens` tokens fits within the limits."""
+        if self.requests is None and self.tokens is None:
+            self.acquired += 1
+            return
+        
+        async with self._lock:
+            waited = 0.0
+            while True:
+                delay = max(
+                    self.requests.time_until_available(1) if self.requests else 0.0,
+                    self.tokens.time_until_available(estimated_tokens) if self.tokens else 0.0
+                )
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+                waited += delay
+            
+            if self.requests:
+                self.requests.consume(1)
+            if self.tokens:
+                self.tokens.consume(estimated_tokens)
+        
+        self.acquired += 1
+        if waited > 0:
+            self.throttled += 1
+            self.total_wait_time += waited
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter counters."""
+        return {
+            "requests_per_minute": round(self.requests.rate_per_second * 60) if self.requests else None,
+            "tokens_per_minute": round(self.tokens.rate_per_second * 60) if self.tokens else None,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "total_wait_time": round(self.total_wait_time, 3)
+        }
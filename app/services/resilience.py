@@ -0,0 +1,210 @@
+import asyncio
+import random
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.circuit_breaker import ProviderUnavailableError, is_transient_error
+from app.services.llm_providers import LLMProvider, LLMResult
+from loguru import logger
+
+
+PRIMARY_PATH = "primary"
+HEDGE_PATH = "hedge"
+FAILOVER_PATH = "failover"
+DEGRADED_PATH = "degraded"
+
+# (provider, model) pair a call can be sent to
+Target = Tuple[LLMProvider, str]
+CallFn = Callable[[LLMProvider, str], Awaitable[LLMResult]]
+# Opens a provider stream that fills the given result once it completes
+StreamFn = Callable[[LLMProvider, str, LLMResult], AsyncIterator[str]]
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (1-based)."""
+    ceiling = min(settings.llm_retry_max_delay, settings.llm_retry_base_delay * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+
+class LLMStream:
+    """A provider stream whose first chunk has already arrived; `result` is filled once it is consumed."""
+    
+    def __init__(self, chunks: AsyncIterator[str], first: Optional[str], result: LLMResult):
+        self.chunks = chunks
+        self.first = first
+        self.result = result
+        self.path = PRIMARY_PATH
+        self.attempts = 1
+    
+    async def __aiter__(self):
+        if self.first is None:
+            return
+        yield self.first
+        async for text in self.chunks:
+            yield text
+    
+    async def aclose(self):
+        await self.chunks.aclose()
+
+
+class ResilientCaller:
+    """
+    Run LLM calls with jittered retries, hedging and failover.
+    
+    When hedging is enabled and the primary has not answered within its
+    recent latency percentile, a second request is sent (to the alternate
+    provider if one is configured) and the first successful answer wins.
+    If the primary fails outright the call fails over to the alternate, and
+    if the primary is unavailable (breaker open or at its concurrency limit)
+    it degrades to the cheaper degraded target instead, or fails fast.
+    
+    Each attempt is bounded by the provider's request timeout, which starts
+    once the provider's rate and concurrency limiters have admitted the call.
+    """
+    
+    def __init__(self):
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self.degraded = 0
+        self.failures = 0
+    
+    async def call(self, call_fn: CallFn, primary: Target, alternate: Optional[Target] = None,
+                   degraded: Optional[Target] = None) -> LLMResult:
+        """Call `call_fn(provider, model)` on the primary target, hedging or failing over as configured."""
+        return await self._call(call_fn, primary, alternate, degraded, hedged=True)
+    
+    async def open_stream(self, stream_fn: StreamFn, primary: Target, alternate: Optional[Target] = None,
+                          degraded: Optional[Target] = None) -> LLMStream:
+        """
+        Open `stream_fn(provider, model, result)` on the primary target, retrying or failing over as for call().
+        
+        Attempts are made until the first chunk arrives; after that the
+        stream is committed to its target and later errors reach the caller.
+        Streams are not hedged.
+        """
+        async def open_attempt(provider: LLMProvider, model: str) -> LLMStream:
+            result = LLMResult(provider=provider.name, model=model)
+            chunks = stream_fn(provider, model, result)
+            try:
+                first = await anext(chunks, None)
+            except BaseException:
+                await chunks.aclose()
+                raise
+            return LLMStream(chunks, first, result)
+        
+        stream = await self._call(open_attempt, primary, alternate, degraded, hedged=False)
+        stream.result.path = stream.path
+        stream.result.attempts = stream.attempts
+        return stream
+    
+    async def _call(self, call_fn: Callable[[LLMProvider, str], Awaitable[Any]], primary: Target,
+                    alternate: Optional[Target], degraded: Optional[Target], hedged: bool) -> Any:
+        self.calls += 1
+        hedge_target = primary
+        if alternate is not None and settings.hedge_cross_provider:
+            hedge_target = alternate
+        
+        tried: List[Target] = []
+        try:
+            if not hedged:
+                tried.append(primary)
+                return await self._with_retries(call_fn, primary, PRIMARY_PATH)
+            return await self._hedged(call_fn, primary, hedge_target, tried)
+        except ProviderUnavailableError as e:
+            if degraded is None or not settings.failover_enabled:
+                self.failures += 1
+                raise
+            logger.warning(f"{e}, degrading to {degraded[1]} on {degraded[0].name}")
+            self.degraded += 1
+            target, path = degraded, DEGRADED_PATH
+        except Exception as e:
+            if alternate is None or not settings.failover_enabled or alternate in tried:
+                self.failures += 1
+                raise
+            logger.warning(f"{primary[0].name} call failed ({e}), failing over to {alternate[0].name}")
+            self.failovers += 1
+            target, path = alternate, FAILOVER_PATH
+        
+        try:
+            return await self._with_retries(call_fn, target, path)
+        except Exception:
+            self.failures += 1
+            raise
+    
+    def hedge_delay(self, provider: LLMProvider) -> Optional[float]:
+        """Seconds to wait on the primary before hedging, or None if hedging does not apply yet."""
+        if not settings.hedge_enabled or len(provider.latency.samples) < settings.hedge_min_samples:
+            return None
+        return max(settings.hedge_min_delay, provider.latency.percentile(settings.hedge_percentile))
+    
+    async def _hedged(self, call_fn: CallFn, primary: Target, hedge_target: Target,
+                      tried: List[Target]) -> LLMResult:
+        tried.append(primary)
+        primary_task = asyncio.ensure_future(self._with_retries(call_fn, primary, PRIMARY_PATH))
+        hedge_task = None
+        try:
+            delay = self.hedge_delay(primary[0])
+            if delay is None:
+                return await primary_task
+            
+            done, _ = await asyncio.wait({primary_task}, timeout=delay)
+            if done:
+                return primary_task.result()
+            
+            logger.info(f"No answer from {primary[0].name} after {delay:.2f}s, hedging to {hedge_target[0].name}")
+            self.hedges += 1
+            tried.append(hedge_target)
+            hedge_task = asyncio.ensure_future(self._with_retries(call_fn, hedge_target, HEDGE_PATH))
+            pending = {primary_task, hedge_task}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge_task:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Abandon the losing request (or both, if the caller was cancelled)
+            for task in (primary_task, hedge_task):
+                if task is not None and not task.done():
+                    task.cancel()
+    
+    async def _with_retries(self, call_fn: Callable[[LLMProvider, str], Awaitable[Any]], target: Target,
+                            path: str) -> Any:
+        provider, model = target
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = await call_fn(provider, model)
+                result.path = path
+                result.attempts = attempt
+                return result
+            except Exception as e:
+                if attempt > settings.llm_max_retries or not is_transient_error(e):
+                    raise
+                delay = backoff_delay(attempt)
+                self.retries += 1
+                logger.warning(
+                    f"{provider.name} call failed ({type(e).__name__}: {e}), "
+                    f"retrying in {delay:.2f}s (attempt {attempt + 1})"
+                )
+                await asyncio.sleep(delay)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get retry, hedging and failover counters."""
+        return {
+            "hedge_enabled": settings.hedge_enabled,
+            "calls": self.calls,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "degraded": self.degraded,
+            "failures": self.failures
+        }
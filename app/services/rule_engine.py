@@ -0,0 +1,535 @@
+import json
+import re
+import time
+from typing import Any, Callable, Container, Dict, List, Optional, Set, Tuple
+from pydantic import BaseModel
+from loguru import logger
+from app.models.schema import Platform, Recommendation, SchemaType, SchemaValidationRequest, SeverityLevel
+
+
+SEVERITY_PENALTY = {SeverityLevel.HIGH: 2.0, SeverityLevel.MEDIUM: 1.0, SeverityLevel.LOW: 0.5}
+
+# At most this many offending fields are named in a finding
+MAX_LISTED_FIELDS = 5
+
+_SQL_TYPES = [SchemaType.SQL_DDL, SchemaType.BIGQUERY, SchemaType.SNOWFLAKE, SchemaType.REDSHIFT]
+_SQL_CREATE_TABLE = re.compile(
+    r"CREATE\s+(?:OR\s+REPLACE\s+)?(?:\w+\s+)*?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([`\"\[\]\w.]+)\s*\(",
+    re.IGNORECASE
+)
+_SQL_TABLE_CONSTRAINT = re.compile(
+    r"^(?:PRIMARY|FOREIGN|UNIQUE|CONSTRAINT|KEY|INDEX|CHECK|CLUSTER|PARTITION|DISTKEY|SORTKEY)\b",
+    re.IGNORECASE
+)
+_SQL_COLUMN = re.compile(r"(`[^`]+`|\"[^\"]+\"|\[[^\]]+\]|[\w.]+)(?:\s+(\w+(?:\s*\([^)]*\)|\s*<.*>)?))?", re.DOTALL)
+_SQL_COLUMN_DOC = re.compile(r"\bCOMMENT\s*=?\s*'|\bDESCRIPTION\s*=", re.IGNORECASE)
+_SQL_GENERIC_TYPE = re.compile(r"\b(?:STRUCT|ARRAY|MAP)\s*$", re.IGNORECASE)
+_SQL_QUOTES = "'\"`"
+_SQL_PRIMARY_KEY_COLUMNS = re.compile(r"PRIMARY\s+KEY\s*\(([^)]*)\)", re.IGNORECASE)
+_PROTO_FIELD = re.compile(r"^\s*(?:repeated\s+|optional\s+|required\s+)?(map<[^>]+>|[\w.]+)\s+(\w+)\s*=\s*\d+")
+_PROTO_BLOCK = re.compile(r"^\s*(message|enum|oneof|service)\s+(\w+)")
+_PROTO_NON_FIELD_TYPES = {"option", "reserved", "extensions", "rpc"}
+
+# Names that carry no meaning on their own (single letters and two-letter
+# abbreviations are flagged separately)
+_VAGUE_NAMES = {"tmp", "temp", "foo", "bar", "baz", "misc", "stuff", "thing", "val", "var", "obj", "str", "num"}
+_ALLOWED_SHORT_NAMES = {"id", "ip", "os", "tz", "ts", "dt", "pk", "fk", "db", "ui", "io", "ok", "x", "y", "z"}
+
+
+class SchemaField(BaseModel):
+    entity: str
+    name: str
+    type: str = ""
+    nullable: Optional[bool] = None  # None where the schema type has no notion of nullability
+    documented: bool = False
+    has_default: Optional[bool] = None
+    
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.entity}.{self.name}" if self.entity else self.name
+
+
+class RuleSpec(BaseModel):
+    """
+    A local check standing in for one best practice of the corpus.
+    
+    Rules are tied to the seeded practice ids (see VectorStoreService's
+    initial best practices), not to their editable content: a rule settles
+    its practice only while that id exists in the corpus, and the finding
+    text below must be kept in line with the practice by hand.
+    """
+    
+    practice_id: str  # id of the best practice in the seeded corpus this rule settles
+    title: str
+    category: str
+    severity: SeverityLevel
+    schema_types: List[SchemaType]
+    platforms: List[Platform] = []  # empty = all platforms
+    description: str  # formatted with {count} and {fields}
+    suggestion: str
+    impact: str
+
+
+class RuleResult(BaseModel):
+    practice_id: str
+    title: str
+    passed: bool
+    recommendation: Optional[Recommendation] = None
+
+
+class RuleReport(BaseModel):
+    results: List[RuleResult] = []
+    entities: int = 0
+    fields: int = 0
+    elapsed_ms: float = 0.0
+    
+    @property
+    def settled(self) -> List[str]:
+        """Ids of the practices decided by the rules, whether they passed or not."""
+        return [result.practice_id for result in self.results]
+    
+    @property
+    def findings(self) -> List[Recommendation]:
+        return [result.recommendation for result in self.results if result.recommendation is not None]
+
+
+RULES = [
+    RuleSpec(
+        practice_id="naming_001",
+        title="Use Clear and Descriptive Field Names",
+        category="naming",
+        severity=SeverityLevel.MEDIUM,
+        schema_types=list(SchemaType),
+        description="{count} field name(s) are abbreviated or not descriptive: {fields}",
+        suggestion="Rename these fields to self-documenting names, e.g. customer_email instead of ce",
+        impact="Makes the schema understandable without external documentation"
+    ),
+    RuleSpec(
+        practice_id="naming_002",
+        title="Use Consistent Naming Convention",
+        category="naming",
+        severity=SeverityLevel.LOW,
+        schema_types=list(SchemaType),
+        description="Field names mix {count} naming conventions: {fields}",
+        suggestion="Use one naming convention (snake_case, camelCase or PascalCase) for all fields",
+        impact="Consistent names are easier to query and less error-prone to map in client code"
+    ),
+    RuleSpec(
+        practice_id="constraints_001",
+        title="Define NOT NULL Constraints",
+        category="constraints",
+        severity=SeverityLevel.MEDIUM,
+        schema_types=_SQL_TYPES,
+        description="{count} column(s) or table(s) lack NOT NULL constraints where values are required: {fields}",
+        suggestion="Add NOT NULL to identifier columns and to every column that must always be populated",
+        impact="Prevents incomplete rows from being written and documents which values are required"
+    ),
+    RuleSpec(
+        practice_id="documentation_001",
+        title="Add Field Descriptions",
+        category="documentation",
+        severity=SeverityLevel.LOW,
+        schema_types=list(SchemaType),
+        description="{count} field(s) have no description or comment: {fields}",
+        suggestion="Document each field (SQL COMMENT, Avro doc, JSON Schema description, protobuf comments)",
+        impact="Makes the schema self-documenting for producers and consumers"
+    ),
+    RuleSpec(
+        practice_id="venice_001",
+        title="Use Avro Schema Evolution",
+        category="schema_evolution",
+        severity=SeverityLevel.HIGH,
+        schema_types=[SchemaType.AVRO],
+        platforms=[Platform.VENICE],
+        description="{count} field(s) have no default value, which breaks backward compatible evolution: {fields}",
+        suggestion="Give every field a default value (null first in the union for optional fields)",
+        impact="Lets Venice readers and writers on different schema versions stay compatible"
+    ),
+]
+
+
+def _naming_convention(name: str) -> Optional[str]:
+    if "_" in name.strip("_"):
+        if name.isupper():
+            return "UPPER_SNAKE"
+        return "snake_case" if name.islower() else "mixed"
+    if name[:1].isupper() and not name.isupper():
+        return "PascalCase"
+    if any(char.isupper() for char in name[1:]):
+        return "camelCase"
+    return None  # single lowercase word, valid in any convention
+
+
+class RuleEngine:
+    """
+    Deterministic checks for mechanical best practices.
+    
+    The schema is parsed into fields once and every rule applicable to the
+    schema type and platform is evaluated locally, without a model call. The
+    practices these rules settle can be dropped from the LLM prompt (hybrid
+    mode) or make up the whole analysis (fast mode).
+    """
+    
+    def __init__(self):
+        self.checks: Dict[str, Callable[[List[SchemaField]], List[str]]] = {
+            "naming_001": self._check_descriptive_names,
+            "naming_002": self._check_naming_consistency,
+            "constraints_001": self._check_not_null,
+            "documentation_001": self._check_documentation,
+            "venice_001": self._check_avro_defaults,
+        }
+        self.evaluations = 0
+        self.findings = 0
+        self.total_ms = 0.0
+        self._missing_practices: Set[str] = set()
+    
+    def check_corpus(self, practice_ids: Container[str]) -> List[str]:
+        """Log an error for every rule whose practice is not in the corpus; returns their ids."""
+        missing = [rule.practice_id for rule in RULES if rule.practice_id not in practice_ids]
+        for practice_id in missing:
+            self._report_missing(practice_id)
+        return missing
+    
+    def evaluate(self, request: SchemaValidationRequest, practice_ids: Optional[Container[str]] = None) -> RuleReport:
+        """
+        Evaluate all applicable rules; nothing is settled if the schema cannot be parsed.
+        
+        With practice_ids (the corpus, e.g. the practice catalog), rules whose
+        practice has been removed from it are skipped, so they never settle a
+        practice the corpus no longer has.
+        """
+        start = time.perf_counter()
+        entities, fields = self.parse(request.schema_content, request.schema_type)
+        
+        results = []
+        if fields:
+            for rule in RULES:
+                if request.schema_type not in rule.schema_types:
+                    continue
+                if rule.platforms and request.platform not in rule.platforms:
+                    continue
+                if practice_ids is not None and rule.practice_id not in practice_ids:
+                    self._report_missing(rule.practice_id)
+                    continue
+                offenders = self.checks[rule.practice_id](fields)
+                results.append(self._result(rule, offenders))
+        
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.evaluations += 1
+        self.findings += sum(1 for result in results if not result.passed)
+        self.total_ms += elapsed_ms
+        return RuleReport(results=results, entities=len(entities), fields=len(fields), elapsed_ms=round(elapsed_ms, 3))
+    
+    def parse(self, schema_content: str, schema_type: SchemaType) -> Tuple[List[str], List[SchemaField]]:
+        """Parse a schema into (entity names, fields); both are empty if it cannot be parsed."""
+        if schema_type in _SQL_TYPES:
+            fields = self._parse_sql(schema_content)
+        elif schema_type == SchemaType.PROTOBUF:
+            fields = self._parse_protobuf(schema_content)
+        else:
+            try:
+                schema = json.loads(schema_content)
+            except json.JSONDecodeError:
+                return [], []
+            fields = []
+            if schema_type == SchemaType.AVRO:
+                self._parse_avro(schema, fields)
+            else:
+                self._parse_json_schema(schema, schema.get("title", "root") if isinstance(schema, dict) else "root", fields)
+        
+        return list(dict.fromkeys(field.entity for field in fields)), fields
+    
+    def score(self, report: RuleReport) -> int:
+        """Score a schema from its failed rules alone (used in fast mode)."""
+        penalty = sum(SEVERITY_PENALTY[rec.severity] for rec in report.findings)
+        return min(10, max(1, int(10 - penalty)))
+    
+    def analysis(self, report: RuleReport) -> Dict[str, Any]:
+        """Build an analysis result from a rule report alone."""
+        passed = [result.title for result in report.results if result.passed]
+        failed = [result.title for result in report.results if not result.passed]
+        if report.results:
+            summary = (
+                f"Local rule check: {len(passed)} of {len(report.results)} rules passed across "
+                f"{report.fields} fields in {report.entities} entities. Data types, indexing, "
+                f"normalization and security are only covered by a hybrid or full analysis."
+            )
+        else:
+            summary = "The schema could not be parsed for local rule checks; run a hybrid or full analysis instead."
+        return {
+            "overall_score": self.score(report) if report.results else 5,
+            "recommendations": [rec.model_dump(mode="json") for rec in report.findings],
+            "best_practices_applied": passed,
+            "missing_best_practices": failed,
+            "summary": summary
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get evaluation counters and average evaluation time."""
+        return {
+            "rules": len(RULES),
+            "rules_disabled": sorted(self._missing_practices),
+            "evaluations": self.evaluations,
+            "findings": self.findings,
+            "avg_ms": round(self.total_ms / self.evaluations, 3) if self.evaluations else 0.0
+        }
+    
+    def _report_missing(self, practice_id: str):
+        if practice_id not in self._missing_practices:
+            self._missing_practices.add(practice_id)
+            logger.error(f"Rule for best practice {practice_id} is disabled: the practice is not in the corpus")
+    
+    def _result(self, rule: RuleSpec, offenders: List[str]) -> RuleResult:
+        if not offenders:
+            return RuleResult(practice_id=rule.practice_id, title=rule.title, passed=True)
+        
+        listed = ", ".join(offenders[:MAX_LISTED_FIELDS])
+        if len(offenders) > MAX_LISTED_FIELDS:
+            listed += f" and {len(offenders) - MAX_LISTED_FIELDS} more"
+        return RuleResult(
+            practice_id=rule.practice_id,
+            title=rule.title,
+            passed=False,
+            recommendation=Recommendation(
+                category=rule.category,
+                severity=rule.severity,
+                description=rule.description.format(count=len(offenders), fields=listed),
+                suggestion=rule.suggestion,
+                impact=rule.impact
+            )
+        )
+    
+    # Rules
+    
+    def _check_descriptive_names(self, fields: List[SchemaField]) -> List[str]:
+        offenders = []
+        for field in fields:
+            name = field.name.lower().strip("_")
+            if name in _VAGUE_NAMES or (len(name) <= 2 and name not in _ALLOWED_SHORT_NAMES):
+                offenders.append(field.qualified_name)
+        return offenders
+    
+    def _check_naming_consistency(self, fields: List[SchemaField]) -> List[str]:
+        conventions: Dict[str, List[str]] = {}
+        for field in fields:
+            convention = _naming_convention(field.name)
+            if convention is not None:
+                conventions.setdefault(convention, []).append(field.name)
+        if len(conventions) < 2:
+            return []
+        return [f"{convention} ({', '.join(names[:2])})" for convention, names in conventions.items()]
+    
+    def _check_not_null(self, fields: List[SchemaField]) -> List[str]:
+        offenders = [
+            field.qualified_name for field in fields
+            if field.nullable and (field.name.lower() == "id" or field.name.lower().endswith("_id"))
+        ]
+        tables: Dict[str, bool] = {}
+        for field in fields:
+            tables[field.entity] = tables.get(field.entity, False) or field.nullable is False
+        offenders += [f"{table} (no required columns)" for table, has_required in tables.items() if not has_required]
+        return offenders
+    
+    def _check_documentation(self, fields: List[SchemaField]) -> List[str]:
+        return [field.qualified_name for field in fields if not field.documented]
+    
+    def _check_avro_defaults(self, fields: List[SchemaField]) -> List[str]:
+        return [field.qualified_name for field in fields if field.has_default is False]
+    
+    # Parsers
+    
+    def _parse_sql(self, schema_content: str) -> List[SchemaField]:
+        fields = []
+        for match in _SQL_CREATE_TABLE.finditer(schema_content):
+            table = match.group(1).strip('`"[]')
+            body = self._sql_table_body(schema_content, match.end())
+            items = self._split_top_level(body)
+            
+            primary_key_columns = set()
+            for item in items:
+                key_match = _SQL_PRIMARY_KEY_COLUMNS.search(item)
+                if key_match and _SQL_TABLE_CONSTRAINT.match(self._strip_sql_comments(item).strip()):
+                    primary_key_columns.update(col.strip().strip('`"[]').lower() for col in key_match.group(1).split(","))
+            
+            for i, item in enumerate(items):
+                definition = self._strip_sql_comments(item).strip()
+                if not definition or _SQL_TABLE_CONSTRAINT.match(definition):
+                    continue
+                column = _SQL_COLUMN.match(definition)
+                if not column:
+                    continue
+                name = column.group(1).strip('`"[]')
+                upper = definition.upper()
+                # A "-- comment" right after the comma documents the previous column
+                trailing = items[i + 1].partition("\n")[0] if i + 1 < len(items) else ""
+                own_lines = item.partition("\n")[2] if i > 0 else item
+                
+                fields.append(SchemaField(
+                    entity=table,
+                    name=name,
+                    type=column.group(2) or "",
+                    nullable=not ("NOT NULL" in upper or "PRIMARY KEY" in upper or name.lower() in primary_key_columns),
+                    documented=bool(_SQL_COLUMN_DOC.search(definition)) or "--" in trailing or "--" in own_lines
+                ))
+        return fields
+    
+    def _sql_table_body(self, text: str, position: int) -> str:
+        """Text between the opening parenthesis just before position and its closing one."""
+        depth = 1
+        i = position
+        while i < len(text):
+            char = text[i]
+            if text.startswith("--", i):
+                i = text.find("\n", i)
+                if i == -1:
+                    break
+            elif char in _SQL_QUOTES:
+                i = self._skip_literal(text, i)
+                continue
+            elif char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+                if depth == 0:
+                    return text[position:i]
+            i += 1
+        return text[position:]
+    
+    def _split_top_level(self, body: str) -> List[str]:
+        """
+        Split on commas outside parentheses, generic type brackets, quoted literals and comments.
+        
+        DECIMAL(10, 2), STRUCT<a INT64, b STRING> and COMMENT 'x, y' stay in
+        one item. Angle brackets only nest after STRUCT, ARRAY or MAP, so
+        comparisons such as CHECK (a > 0) do not affect the depth.
+        """
+        items, depth, angle_depth, start, i = [], 0, 0, 0, 0
+        while i < len(body):
+            char = body[i]
+            if body.startswith("--", i):
+                i = body.find("\n", i)
+                if i == -1:
+                    break
+            elif char in _SQL_QUOTES:
+                i = self._skip_literal(body, i)
+                continue
+            elif char == "(":
+                depth += 1
+            elif char == ")":
+                depth = max(0, depth - 1)
+            elif char == "<" and _SQL_GENERIC_TYPE.search(body, max(0, i - 16), i):
+                angle_depth += 1
+            elif char == ">" and angle_depth:
+                angle_depth -= 1
+            elif char == "," and depth == 0 and angle_depth == 0:
+                items.append(body[start:i])
+                start = i + 1
+            i += 1
+        items.append(body[start:])
+        return items
+    
+    def _skip_literal(self, text: str, position: int) -> int:
+        """Index just past the quoted literal or identifier starting at position (unterminated runs to the end)."""
+        quote = text[position]
+        i = position + 1
+        while i < len(text):
+            if text[i] == "\\" and quote != "`":
+                i += 2
+                continue
+            if text[i] == quote:
+                return i + 1
+            i += 1
+        return len(text)
+    
+    def _strip_sql_comments(self, text: str) -> str:
+        return re.sub(r"--[^\n]*", "", text)
+    
+    def _parse_protobuf(self, schema_content: str) -> List[SchemaField]:
+        fields = []
+        blocks: List[Tuple[str, str, int]] = []  # (kind, name, brace depth inside the block)
+        depth = 0
+        previous_line = ""
+        for line in schema_content.splitlines():
+            code = line.split("//")[0]
+            block = _PROTO_BLOCK.match(code)
+            if block:
+                blocks.append((block.group(1), block.group(2), depth + 1))
+            else:
+                field = _PROTO_FIELD.match(code)
+                in_message = blocks and blocks[-1][0] in ("message", "oneof")
+                if field and in_message and field.group(1) not in _PROTO_NON_FIELD_TYPES:
+                    fields.append(SchemaField(
+                        entity=next((name for kind, name, _ in reversed(blocks) if kind == "message"), ""),
+                        name=field.group(2),
+                        type=field.group(1),
+                        documented="//" in line or previous_line.strip().startswith("//")
+                    ))
+            
+            depth += code.count("{") - code.count("}")
+            while blocks and depth < blocks[-1][2]:
+                blocks.pop()
+            previous_line = line
+        return fields
+    
+    def _parse_avro(self, schema: Any, fields: List[SchemaField]):
+        if isinstance(schema, list):
+            for member in schema:
+                self._parse_avro(member, fields)
+            return
+        if not isinstance(schema, dict):
+            return
+        
+        if schema.get("type") == "record" and isinstance(schema.get("fields"), list):
+            for field in schema["fields"]:
+                if not isinstance(field, dict) or "name" not in field:
+                    continue
+                field_type = field.get("type")
+                fields.append(SchemaField(
+                    entity=schema.get("name", ""),
+                    name=field["name"],
+                    type=json.dumps(field_type) if not isinstance(field_type, str) else field_type,
+                    nullable=isinstance(field_type, list) and "null" in field_type,
+                    documented=bool(field.get("doc")),
+                    has_default="default" in field
+                ))
+                self._parse_avro(field_type, fields)
+        elif schema.get("type") == "array":
+            self._parse_avro(schema.get("items"), fields)
+        elif schema.get("type") == "map":
+            self._parse_avro(schema.get("values"), fields)
+    
+    def _parse_json_schema(self, schema: Any, entity: str, fields: List[SchemaField]):
+        if not isinstance(schema, dict):
+            return
+        
+        properties = schema.get("properties")
+        if isinstance(properties, dict):
+            for name, prop in properties.items():
+                if not isinstance(prop, dict):
+                    continue
+                fields.append(SchemaField(
+                    entity=entity,
+                    name=name,
+                    type=str(prop.get("type", prop.get("$ref", ""))),
+                    documented=bool(prop.get("description"))
+                ))
+                self._parse_json_schema(prop, prop.get("title", name), fields)
+        
+        if isinstance(schema.get("items"), dict):
+            self._parse_json_schema(schema["items"], entity, fields)
+        for defs_key in ("$defs", "definitions"):
+            if isinstance(schema.get(defs_key), dict):
+                for name, definition in schema[defs_key].items():
+                    self._parse_json_schema(definition, name, fields)
+
+
+def merge_rule_findings(analysis: Dict[str, Any], report: RuleReport) -> Dict[str, Any]:
+    """Add the findings and passed checks of a rule report to an LLM analysis (hybrid mode)."""
+    passed = [result.title for result in report.results if result.passed]
+    failed = [result.title for result in report.results if not result.passed]
+    return {
+        **analysis,
+        "recommendations": [rec.model_dump(mode="json") for rec in report.findings] + analysis.get("recommendations", []),
+        "best_practices_applied": list(dict.fromkeys(passed + analysis.get("best_practices_applied", []))),
+        "missing_best_practices": list(dict.fromkeys(failed + analysis.get("missing_best_practices", [])))
+    }
@@ -0,0 +1,244 @@
+import difflib
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from app.models.schema import SchemaType
+
+
+SEVERITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+# Recommendations in the same category whose descriptions are at least this similar are merged
+DUPLICATE_SIMILARITY = 0.85
+
+_SQL_TYPES = (SchemaType.SQL_DDL, SchemaType.BIGQUERY, SchemaType.SNOWFLAKE, SchemaType.REDSHIFT)
+_SQL_STATEMENT_START = re.compile(r"^[ \t]*CREATE\b", re.IGNORECASE | re.MULTILINE)
+_SQL_OBJECT_NAME = re.compile(
+    r"CREATE\s+(?:OR\s+REPLACE\s+)?(?:\w+\s+)*?(?:TABLE|VIEW|INDEX|TYPE|SEQUENCE)\s+(?:IF\s+NOT\s+EXISTS\s+)?([`\"\[\]\w.]+)",
+    re.IGNORECASE
+)
+_PROTO_BLOCK_START = re.compile(r"^[ \t]*(message|enum|service)\s+(\w+)", re.MULTILINE)
+_PROTO_HEADER_LINE = re.compile(r"^[ \t]*(?:syntax|package|import|option)\b.*$", re.MULTILINE)
+_PROTO_LEADING_COMMENTS = re.compile(r"(?:^[ \t]*//[^\n]*\n)+\Z", re.MULTILINE)
+
+
+class SchemaUnit(BaseModel):
+    name: str
+    content: str
+
+
+class SchemaChunk(BaseModel):
+    index: int
+    entities: List[str]
+    content: str  # shared header (if any) followed by the chunk's entity definitions
+    
+    @property
+    def size(self) -> int:
+        return len(self.content)
+    
+    @property
+    def name(self) -> str:
+        if len(self.entities) <= 3:
+            return ", ".join(self.entities)
+        return f"{', '.join(self.entities[:3])} and {len(self.entities) - 3} more"
+
+
+class SchemaChunker:
+    """
+    Split large schemas into entity-level chunks for parallel analysis.
+    
+    Schemas are split into units (SQL CREATE statements, protobuf top-level
+    messages/enums/services, Avro union members, JSON Schema definitions),
+    which are packed greedily into chunks of at most `max_chars` characters.
+    Declarations every unit depends on (protobuf syntax/package/imports) are
+    repeated at the top of each chunk.
+    """
+    
+    def split(self, schema_content: str, schema_type: SchemaType) -> Tuple[str, List[SchemaUnit]]:
+        """Split a schema into (shared header, entity units); a single unit means it cannot be split."""
+        if schema_type in _SQL_TYPES:
+            return "", self._split_sql(schema_content)
+        if schema_type == SchemaType.PROTOBUF:
+            return self._split_protobuf(schema_content)
+        if schema_type == SchemaType.AVRO:
+            return "", self._split_avro(schema_content)
+        if schema_type == SchemaType.JSON_SCHEMA:
+            return "", self._split_json_schema(schema_content)
+        return "", [SchemaUnit(name="schema", content=schema_content)]
+    
+    def chunk(self, schema_content: str, schema_type: SchemaType, max_chars: int) -> List[SchemaChunk]:
+        """Pack a schema's units into chunks of at most max_chars (a unit larger than that stays whole)."""
+        header, units = self.split(schema_content, schema_type)
+        return self.pack(header, units, max_chars)
+    
+    def pack(self, header: str, units: List[SchemaUnit], max_chars: int) -> List[SchemaChunk]:
+        """Greedily pack units, in order, into chunks that each repeat the shared header."""
+        chunks: List[SchemaChunk] = []
+        current: List[SchemaUnit] = []
+        current_size = len(header)
+        
+        for unit in units:
+            if current and current_size + len(unit.content) > max_chars:
+                chunks.append(self._make_chunk(len(chunks), header, current))
+                current, current_size = [], len(header)
+            current.append(unit)
+            current_size += len(unit.content)
+        
+        if current:
+            chunks.append(self._make_chunk(len(chunks), header, current))
+        return chunks
+    
+    def _make_chunk(self, index: int, header: str, units: List[SchemaUnit]) -> SchemaChunk:
+        body = "\n\n".join(unit.content.strip() for unit in units)
+        return SchemaChunk(
+            index=index,
+            entities=[unit.name for unit in units],
+            content=f"{header.strip()}\n\n{body}" if header.strip() else body
+        )
+    
+    def _split_sql(self, schema_content: str) -> List[SchemaUnit]:
+        starts = [match.start() for match in _SQL_STATEMENT_START.finditer(schema_content)]
+        if len(starts) < 2:
+            return [SchemaUnit(name="schema", content=schema_content)]
+        
+        # Anything before the first CREATE (comments, SET statements) stays with the first unit
+        starts[0] = 0
+        units = []
+        for i, start in enumerate(starts):
+            content = schema_content[start:starts[i + 1] if i + 1 < len(starts) else len(schema_content)]
+            match = _SQL_OBJECT_NAME.search(content)
+            units.append(SchemaUnit(name=match.group(1) if match else f"statement_{i + 1}", content=content))
+        return units
+    
+    def _split_protobuf(self, schema_content: str) -> Tuple[str, List[SchemaUnit]]:
+        header_lines = [
+            match.group(0).strip() for match in _PROTO_HEADER_LINE.finditer(schema_content)
+            if self._brace_depth(schema_content, match.start()) == 0
+        ]
+        units = []
+        for match in _PROTO_BLOCK_START.finditer(schema_content):
+            if self._brace_depth(schema_content, match.start()) != 0:
+                continue  # nested message or enum, analyzed with its parent
+            end = self._block_end(schema_content, match.end())
+            # Keep the comment lines documenting the block with it
+            comments = _PROTO_LEADING_COMMENTS.search(schema_content, 0, match.start())
+            start = comments.start() if comments else match.start()
+            units.append(SchemaUnit(name=match.group(2), content=schema_content[start:end]))
+        
+        if len(units) < 2:
+            return "", [SchemaUnit(name="schema", content=schema_content)]
+        return "\n".join(header_lines), units
+    
+    def _split_avro(self, schema_content: str) -> List[SchemaUnit]:
+        try:
+            schema = json.loads(schema_content)
+        except json.JSONDecodeError:
+            return [SchemaUnit(name="schema", content=schema_content)]
+        if not isinstance(schema, list) or len(schema) < 2:
+            return [SchemaUnit(name="schema", content=schema_content)]
+        
+        return [
+            SchemaUnit(
+                name=item.get("name", f"schema_{i + 1}") if isinstance(item, dict) else f"schema_{i + 1}",
+                content=json.dumps(item, indent=2)
+            )
+            for i, item in enumerate(schema)
+        ]
+    
+    def _split_json_schema(self, schema_content: str) -> List[SchemaUnit]:
+        try:
+            schema = json.loads(schema_content)
+        except json.JSONDecodeError:
+            return [SchemaUnit(name="schema", content=schema_content)]
+        if not isinstance(schema, dict):
+            return [SchemaUnit(name="schema", content=schema_content)]
+        
+        defs_key = "$defs" if isinstance(schema.get("$defs"), dict) else "definitions"
+        definitions = schema.get(defs_key)
+        if not isinstance(definitions, dict) or not definitions:
+            return [SchemaUnit(name="schema", content=schema_content)]
+        
+        root = {key: value for key, value in schema.items() if key != defs_key}
+        units = [SchemaUnit(name=schema.get("title", "root"), content=json.dumps(root, indent=2))]
+        for name, definition in definitions.items():
+            units.append(SchemaUnit(name=name, content=json.dumps({defs_key: {name: definition}}, indent=2)))
+        return units
+    
+    def _brace_depth(self, text: str, position: int) -> int:
+        return text.count("{", 0, position) - text.count("}", 0, position)
+    
+    def _block_end(self, text: str, position: int) -> int:
+        """Index just past the brace block that opens at or after position."""
+        depth = 0
+        for i in range(position, len(text)):
+            if text[i] == "{":
+                depth += 1
+            elif text[i] == "}":
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+        return len(text)
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^a-z0-9 ]", "", re.sub(r"\s+", " ", text.lower())).strip()
+
+
+def _merge_lists(lists: List[List[str]]) -> List[str]:
+    merged = {}
+    for items in lists:
+        for item in items:
+            merged.setdefault(_normalize(item), item)
+    return list(merged.values())
+
+
+def merge_chunk_analyses(results: List[Tuple[SchemaChunk, Dict[str, Any]]],
+                         failed_chunks: Optional[List[SchemaChunk]] = None) -> Dict[str, Any]:
+    """
+    Merge per-chunk analyses into one analysis.
+    
+    The overall score is the chunk scores weighted by chunk size; duplicate
+    recommendations across chunks are merged, keeping the highest severity.
+    The merged analysis is partial if a chunk failed or its own analysis was.
+    """
+    failed_chunks = failed_chunks or []
+    total_size = sum(chunk.size for chunk, _ in results)
+    weighted = sum(analysis.get("overall_score", 5) * chunk.size for chunk, analysis in results)
+    overall_score = min(10, max(1, round(weighted / total_size))) if total_size else 5
+    
+    recommendations: List[Dict[str, Any]] = []
+    for _, analysis in results:
+        for rec in analysis.get("recommendations", []):
+            duplicate = next((
+                existing for existing in recommendations
+                if existing["category"].lower() == rec["category"].lower()
+                and difflib.SequenceMatcher(
+                    None, _normalize(existing["description"]), _normalize(rec["description"])
+                ).ratio() >= DUPLICATE_SIMILARITY
+            ), None)
+            if duplicate is None:
+                recommendations.append(dict(rec))
+            elif SEVERITY_ORDER.get(rec["severity"], 1) < SEVERITY_ORDER.get(duplicate["severity"], 1):
+                duplicate["severity"] = rec["severity"]
+    
+    if failed_chunks:
+        recommendations.append({
+            "category": "error",
+            "severity": "high",
+            "description": f"{len(failed_chunks)} of {len(results) + len(failed_chunks)} schema parts could not be analyzed: "
+                           f"{'; '.join(chunk.name for chunk in failed_chunks)}",
+            "suggestion": "Re-run the validation for the listed entities",
+            "impact": "Recommendations for these entities are missing"
+        })
+    recommendations.sort(key=lambda rec: SEVERITY_ORDER.get(rec["severity"], 1))
+    
+    entity_count = sum(len(chunk.entities) for chunk, _ in results)
+    part_summaries = "\n".join(f"[{chunk.name}] {analysis.get('summary', '')}" for chunk, analysis in results)
+    return {
+        "overall_score": overall_score,
+        "recommendations": recommendations,
+        "best_practices_applied": _merge_lists([a.get("best_practices_applied", []) for _, a in results]),
+        "missing_best_practices": _merge_lists([a.get("missing_best_practices", []) for _, a in results]),
+        "summary": f"Analyzed {entity_count} entities in {len(results)} parts.\n{part_summaries}",
+        "partial": bool(failed_chunks) or any(analysis.get("partial", False) for _, analysis in results)
+    }
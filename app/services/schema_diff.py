@@ -0,0 +1,96 @@
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+from pydantic import BaseModel
+from app.models.schema import SchemaType, SchemaValidationResponse
+from app.services.schema_chunker import SchemaChunk, SchemaChunker, SchemaUnit
+
+
+class SchemaDiff(BaseModel):
+    header: str  # shared header of the current version
+    added: List[str] = []
+    removed: List[str] = []
+    modified: List[str] = []
+    unchanged: List[str] = []
+    changed_units: List[SchemaUnit] = []  # added and modified entities, in schema order
+    unchanged_units: List[SchemaUnit] = []
+    
+    @property
+    def unchanged_chunk(self) -> SchemaChunk:
+        """The unchanged entities as one chunk, for merging with the re-analyzed ones."""
+        return SchemaChunk(
+            index=0,
+            entities=self.unchanged,
+            content="\n\n".join(unit.content.strip() for unit in self.unchanged_units)
+        )
+
+
+def _normalize(content: str) -> str:
+    return " ".join(content.split())
+
+
+def diff_schemas(previous_content: str, current_content: str, schema_type: SchemaType,
+                 chunker: SchemaChunker) -> Tuple[Optional[SchemaDiff], Optional[str]]:
+    """
+    Diff two schema versions entity by entity.
+    
+    Returns (diff, None), or (None, reason) if the versions cannot be compared
+    entity by entity (unsplittable schema, changed shared header, duplicate
+    entity names).
+    """
+    previous_header, previous_units = chunker.split(previous_content, schema_type)
+    header, units = chunker.split(current_content, schema_type)
+    
+    if len(units) < 2 or len(previous_units) < 2:
+        return None, "schema cannot be split into entities"
+    if _normalize(previous_header) != _normalize(header):
+        return None, "shared declarations changed"
+    
+    previous = {unit.name: _normalize(unit.content) for unit in previous_units}
+    if len(previous) != len(previous_units) or len({unit.name for unit in units}) != len(units):
+        return None, "entity names are not unique"
+    
+    diff = SchemaDiff(header=header)
+    for unit in units:
+        if unit.name not in previous:
+            diff.added.append(unit.name)
+            diff.changed_units.append(unit)
+        elif previous[unit.name] != _normalize(unit.content):
+            diff.modified.append(unit.name)
+            diff.changed_units.append(unit)
+        else:
+            diff.unchanged.append(unit.name)
+            diff.unchanged_units.append(unit)
+    
+    current_names = {unit.name for unit in units}
+    diff.removed = [name for name in previous if name not in current_names]
+    return diff, None
+
+
+def _mentions(text: str, names: List[str]) -> bool:
+    return any(re.search(rf"(?<![\w]){re.escape(name)}(?![\w])", text, re.IGNORECASE) for name in names)
+
+
+def carry_over_analysis(previous: SchemaValidationResponse, diff: SchemaDiff,
+                        stale_descriptions: Set[str]) -> Dict[str, Any]:
+    """
+    Restrict a previous analysis to the entities that did not change.
+    
+    Recommendations naming a modified or removed entity are dropped (modified
+    entities are re-analyzed), as are those listed in stale_descriptions (e.g.
+    previous local rule findings, which are re-evaluated on the new version).
+    Recommendations about unchanged entities or the schema as a whole are kept.
+    """
+    changed = diff.modified + diff.removed
+    recommendations = [
+        rec.model_dump(mode="json") for rec in previous.recommendations
+        if rec.description not in stale_descriptions
+        and rec.category != "error"
+        and not _mentions(f"{rec.description} {rec.suggestion}", changed)
+    ]
+    return {
+        "overall_score": previous.overall_score,
+        "recommendations": recommendations,
+        "best_practices_applied": previous.best_practices_applied,
+        "missing_best_practices": previous.missing_best_practices,
+        "summary": previous.summary
+    }
@@ -0,0 +1,79 @@
+import re
+from typing import List, Type
+from pydantic import BaseModel, ValidationError
+from app.models.schema import Recommendation
+from loguru import logger
+
+
+_RECOMMENDATIONS_ARRAY = re.compile(r'"recommendations"\s*:\s*\[')
+
+
+class RecommendationStreamParser:
+    """
+    Incrementally extract recommendation objects from a streamed analysis.
+    
+    Text is fed as it arrives from the provider; every recommendation whose
+    JSON object has been fully received is validated against the model and
+    returned exactly once.
+    """
+    
+    def __init__(self, model: Type[BaseModel] = Recommendation):
+        self.model = model
+        self.invalid = 0
+        self.buffer = ""
+        self._array_start = None  # index just past the '[' of the recommendations array
+        self._pos = 0
+        self._depth = 0
+        self._object_start = None
+        self._in_string = False
+        self._escaped = False
+        self.done = False
+    
+    def feed(self, text: str) -> List[BaseModel]:
+        """Feed a chunk of streamed text and return newly completed, valid recommendations."""
+        self.buffer += text
+        if self.done:
+            return []
+        
+        if self._array_start is None:
+            match = _RECOMMENDATIONS_ARRAY.search(self.buffer)
+            if match is None:
+                return []
+            self._array_start = match.end()
+            self._pos = self._array_start
+        
+        completed = []
+        while self._pos < len(self.buffer):
+            char = self.buffer[self._pos]
+            
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._object_start is not None:
+                    raw = self.buffer[self._object_start:self._pos + 1]
+                    self._object_start = None
+                    try:
+                        completed.append(self.model.model_validate_json(raw))
+                    except ValidationError as e:
+                        self.invalid += 1
+                        logger.warning(f"Skipping invalid streamed recommendation: {str(e)[:200]}")
+            elif char == "]" and self._depth == 0:
+                self.done = True
+                self._pos += 1
+                break
+            
+            self._pos += 1
+        
+        return completed
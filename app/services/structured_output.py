@@ -0,0 +1,106 @@
+import json
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from pydantic import ValidationError
+from app.models.schema import SchemaAnalysis
+from loguru import logger
+
+
+ANALYSIS_SCHEMA_NAME = "schema_analysis"
+
+# JSON schema keywords dropped for provider structured-output modes (OpenAI strict
+# mode rejects most validation keywords; pydantic still enforces them on parse)
+_UNSUPPORTED_KEYWORDS = {"title", "default", "minimum", "maximum", "minLength", "maxLength", "minItems", "maxItems"}
+
+
+def _strict_schema(node: Any, defs: Dict[str, Any]) -> Any:
+    """Inline $refs and single-member allOf wrappers and close every object so the schema is accepted in strict mode."""
+    if isinstance(node, list):
+        return [_strict_schema(item, defs) for item in node]
+    if not isinstance(node, dict):
+        return node
+    
+    # pydantic wraps a described enum field as {"allOf": [<enum>], "description": ...}
+    if isinstance(node.get("allOf"), list) and len(node["allOf"]) == 1:
+        siblings = {key: value for key, value in node.items() if key != "allOf"}
+        return _strict_schema({**node["allOf"][0], **siblings}, defs)
+    
+    if "$ref" in node:
+        siblings = {key: value for key, value in node.items() if key != "$ref"}
+        return _strict_schema({**defs[node["$ref"].split("/")[-1]], **siblings}, defs)
+    
+    strict = {
+        key: _strict_schema(value, defs)
+        for key, value in node.items()
+        if key not in _UNSUPPORTED_KEYWORDS and key != "$defs"
+    }
+    if strict.get("type") == "object":
+        strict["required"] = list(strict.get("properties", {}))
+        strict["additionalProperties"] = False
+    return strict
+
+
+@lru_cache(maxsize=1)
+def analysis_json_schema() -> Dict[str, Any]:
+    """JSON schema of the analysis output, generated from the SchemaAnalysis model."""
+    schema = SchemaAnalysis.model_json_schema()
+    return _strict_schema(schema, schema.get("$defs", {}))
+
+
+class AnalysisOutputParser:
+    """
+    Parse and validate analysis output against the SchemaAnalysis model.
+    
+    Tracks how responses were parsed so structured-output, retry and
+    fallback rates can be monitored.
+    """
+    
+    def __init__(self):
+        self.parsed = 0  # response was valid JSON as a whole
+        self.extracted = 0  # JSON had to be extracted from surrounding text
+        self.invalid = 0
+        self.retries = 0
+        self.fallbacks = 0
+    
+    def parse(self, response: str) -> Optional[Dict[str, Any]]:
+        """Parse a response into a validated analysis dict, or None if it is unusable."""
+        try:
+            analysis = SchemaAnalysis.model_validate_json(response)
+            self.parsed += 1
+            return analysis.model_dump(mode="json")
+        except ValidationError:
+            pass
+        
+        # Fall back to the JSON object between the first '{' and the last '}'
+        start_idx = response.find('{')
+        end_idx = response.rfind('}') + 1
+        if start_idx != -1 and end_idx > start_idx:
+            try:
+                analysis = SchemaAnalysis.model_validate(json.loads(response[start_idx:end_idx]))
+                self.extracted += 1
+                return analysis.model_dump(mode="json")
+            except (json.JSONDecodeError, ValidationError) as e:
+                logger.warning(f"AI response failed analysis schema validation: {str(e)[:200]}")
+        
+        self.invalid += 1
+        return None
+    
+    def record_retry(self):
+        self.retries += 1
+    
+    def record_fallback(self):
+        self.fallbacks += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get parse outcome counters and rates."""
+        total = self.parsed + self.extracted + self.invalid
+        return {
+            "responses": total,
+            "parsed": self.parsed,
+            "extracted": self.extracted,
+            "invalid": self.invalid,
+            "retries": self.retries,
+            "fallbacks": self.fallbacks,
+            "retry_rate": round(self.retries / total, 4) if total else 0.0,
+            "fallback_rate": round(self.fallbacks / total, 4) if total else 0.0
+        }
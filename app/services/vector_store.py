@@ -1,14 +1,82 @@
+import asyncio
 import chromadb
+import contextvars
+import functools
+import threading
 from chromadb.config import Settings as ChromaSettings
-from typing import List, Dict, Any, Optional
+from chromadb.utils import embedding_functions
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 from app.core.config import settings
+from app.core.metrics import (
+    EMBEDDING_CACHE_HIT_RATIO,
+    EMBEDDING_CACHE_LOOKUPS,
+    EMBEDDING_SECONDS_SAVED,
+    VECTOR_LATENCY
+)
+from app.core.stats import stage
 from app.models.schema import BestPractice, SchemaType, Platform
+from app.services.cache import LRUCache
+from app.services.practice_catalog import PracticeCatalog
 from loguru import logger
+import hashlib
 import json
 import os
+import time
+
+
+# Applicability is also stored as one boolean flag per schema type and platform,
+# so Chroma can filter on it inside the query instead of after it
+ALL_PLATFORMS_FLAG = "pf_all"
+
+
+def schema_type_flag(schema_type: SchemaType) -> str:
+    return f"st_{schema_type.value}"
+
+
+def platform_flag(platform: Platform) -> str:
+    return f"pf_{platform.value}"
+
+
+FLAG_KEYS = frozenset(
+    [schema_type_flag(st) for st in SchemaType] + [platform_flag(p) for p in Platform] + [ALL_PLATFORMS_FLAG]
+)
+
+
+def applicability_flags(schema_types: List[str], platforms: List[str]) -> Dict[str, bool]:
+    """Get the filter flags for a practice's applicable schema types and platforms (empty = all platforms)."""
+    flags = {schema_type_flag(st): st.value in schema_types for st in SchemaType}
+    flags.update({platform_flag(p): p.value in platforms for p in Platform})
+    flags[ALL_PLATFORMS_FLAG] = not platforms
+    return flags
+
+
+def applicability_filter(schema_type: SchemaType, platform: Optional[Platform] = None) -> Dict[str, Any]:
+    """Build the Chroma `where` clause matching practices for a schema type and, optionally, a platform."""
+    schema_type_match = {schema_type_flag(schema_type): True}
+    if platform is None:
+        return schema_type_match
+    return {"$and": [
+        schema_type_match,
+        {"$or": [{ALL_PLATFORMS_FLAG: True}, {platform_flag(platform): True}]}
+    ]}
+
+
+def public_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip the filter flags from stored metadata before handing it out."""
+    return {key: value for key, value in metadata.items() if key not in FLAG_KEYS}
 
 
 class VectorStoreService:
+    """
+    Best practices corpus in ChromaDB, with an in-memory catalog for listings.
+    
+    Embedding and Chroma calls are blocking (ONNX inference and SQLite), so
+    async callers use the *_async methods, which run them on a dedicated
+    thread pool; writes are serialized behind an asyncio lock. The sync
+    methods remain for scripts and for use inside the pool.
+    """
+    
     def __init__(self):
         # Ensure the persist directory exists
         self._ensure_persist_directory()
@@ -19,7 +87,55 @@ class VectorStoreService:
                 anonymized_telemetry=False
             )
         )
+        # Held here so queries can be embedded (and timed, and cached) apart from the search itself
+        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        self.embedding_model = getattr(self.embedding_function, "MODEL_NAME", type(self.embedding_function).__name__)
+        self.embedding_cache = LRUCache(settings.embedding_cache_max_entries)
+        self.embedding_hits = 0
+        self.embedding_misses = 0
+        self.embedding_seconds = 0.0  # spent embedding cache misses
+        self.embedding_seconds_saved = 0.0
+        self._embedding_lock = threading.Lock()
+        EMBEDDING_CACHE_HIT_RATIO.set_function(lambda: self.get_embedding_cache_stats()["hit_ratio"])
         self.collection = self._get_or_create_collection()
+        self._migrate_applicability_flags()
+        self.catalog = PracticeCatalog()
+        self._load_catalog()
+        self.corpus_version = self._compute_corpus_version()
+        
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.vector_store_workers,
+            thread_name_prefix="vector-store"
+        )
+        self._write_lock = asyncio.Lock()
+    
+    async def run_in_executor(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking call on the vector store thread pool, keeping the caller's context (stage timings)."""
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(context.run, func, *args, **kwargs)
+        )
+    
+    async def search_relevant_practices_async(self, query: str, schema_type: SchemaType,
+                                              platform: Optional[Platform] = None,
+                                              limit: int = 10) -> List[Dict[str, Any]]:
+        return await self.run_in_executor(self.search_relevant_practices, query, schema_type, platform, limit)
+    
+    async def add_best_practice_async(self, practice: BestPractice) -> bool:
+        async with self._write_lock:
+            return await self.run_in_executor(self.add_best_practice, practice)
+    
+    async def update_practice_async(self, practice: BestPractice) -> bool:
+        async with self._write_lock:
+            return await self.run_in_executor(self.update_practice, practice)
+    
+    async def delete_practice_async(self, practice_id: str) -> bool:
+        async with self._write_lock:
+            return await self.run_in_executor(self.delete_practice, practice_id)
+    
+    def shutdown(self):
+        """Stop the thread pool once running calls finish."""
+        self.executor.shutdown(wait=True, cancel_futures=True)
     
     def _ensure_persist_directory(self):
         """Ensure the ChromaDB persistence directory exists."""
@@ -44,12 +160,16 @@ class VectorStoreService:
     def _get_or_create_collection(self):
         """Get or create the best practices collection."""
         try:
-            collection = self.client.get_collection(name=settings.collection_name)
+            collection = self.client.get_collection(
+                name=settings.collection_name,
+                embedding_function=self.embedding_function
+            )
             logger.info(f"Retrieved existing collection: {settings.collection_name}")
         except ValueError:
             collection = self.client.create_collection(
                 name=settings.collection_name,
-                metadata={"description": "Schema validation best practices"}
+                metadata={"description": "Schema validation best practices"},
+                embedding_function=self.embedding_function
             )
             logger.info(f"Created new collection: {settings.collection_name}")
             
@@ -62,6 +182,87 @@ class VectorStoreService:
         
         return collection
     
+    def _practice_metadata(self, practice: BestPractice) -> Dict[str, Any]:
+        """Build the stored metadata for a practice, including its filter flags."""
+        schema_types = [st.value for st in practice.applicable_schema_types]
+        platforms = [p.value for p in practice.applicable_platforms]
+        return {
+            "category": practice.category,
+            "schema_types": json.dumps(schema_types),
+            "platforms": json.dumps(platforms),
+            "severity": practice.severity_if_missing.value,
+            "examples": json.dumps(practice.examples),
+            **applicability_flags(schema_types, platforms)
+        }
+    
+    def _migrate_applicability_flags(self):
+        """Add or correct the filter flags on practices stored before they existed (one-time, idempotent)."""
+        try:
+            results = self.collection.get()
+            ids = []
+            metadatas = []
+            for practice_id, metadata in zip(results["ids"], results["metadatas"]):
+                metadata = metadata or {}
+                try:
+                    schema_types = json.loads(metadata.get("schema_types", "[]"))
+                    platforms = json.loads(metadata.get("platforms", "[]"))
+                except json.JSONDecodeError:
+                    # Malformed entries were never matched; keep it that way
+                    schema_types, platforms = [], [p.value for p in Platform]
+                
+                flags = applicability_flags(schema_types, platforms)
+                if any(metadata.get(key) != value for key, value in flags.items()):
+                    ids.append(practice_id)
+                    metadatas.append({**metadata, **flags})
+            
+            if ids:
+                self.collection.update(ids=ids, metadatas=metadatas)
+                logger.info(f"Migrated applicability flags for {len(ids)} best practices")
+        except Exception as e:
+            logger.error(f"Error migrating applicability flags: {e}")
+    
+    def _load_catalog(self):
+        """Load the whole collection into the in-memory catalog."""
+        try:
+            results = self.collection.get()
+            self.catalog.load(
+                results["ids"],
+                results["documents"],
+                [public_metadata(metadata or {}) for metadata in results["metadatas"]]
+            )
+        except Exception as e:
+            logger.error(f"Error loading best practices catalog, listings will query ChromaDB instead: {e}")
+    
+    def _query_practices(self, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Get practices straight from Chroma (used while the catalog is not loaded)."""
+        results = self.collection.get(where=where) if where else self.collection.get()
+        return [
+            {"id": practice_id, "content": document, "metadata": public_metadata(metadata or {})}
+            for practice_id, document, metadata in zip(results["ids"], results["documents"], results["metadatas"])
+        ]
+    
+    def has_practice(self, practice_id: str) -> bool:
+        """Whether a best practice with this id exists."""
+        if self.catalog.loaded:
+            return practice_id in self.catalog
+        return bool(self.collection.get(ids=[practice_id])["ids"])
+    
+    def _compute_corpus_version(self) -> str:
+        """Compute a content fingerprint of the best practices corpus."""
+        try:
+            entries = sorted(
+                (practice["id"], practice["content"], practice["metadata"]) for practice in self.get_all_practices()
+            )
+            digest = hashlib.sha256(json.dumps(entries, sort_keys=True).encode()).hexdigest()
+            return digest[:12]
+        except Exception as e:
+            logger.error(f"Error computing corpus version: {e}")
+            return "unknown"
+    
+    def _refresh_corpus_version(self):
+        """Refresh the corpus fingerprint after a write."""
+        self.corpus_version = self._compute_corpus_version()
+    
     def _populate_initial_best_practices(self, collection):
         """Populate the collection with initial best practices."""
         initial_practices = self._get_initial_best_practices()
@@ -72,13 +273,7 @@ class VectorStoreService:
         
         for practice in initial_practices:
             documents.append(f"{practice.title}: {practice.description}")
-            metadatas.append({
-                "category": practice.category,
-                "schema_types": json.dumps([st.value for st in practice.applicable_schema_types]),
-                "platforms": json.dumps([p.value for p in practice.applicable_platforms]),
-                "severity": practice.severity_if_missing.value,
-                "examples": json.dumps(practice.examples)
-            })
+            metadatas.append(self._practice_metadata(practice))
             ids.append(practice.id)
         
         collection.add(
@@ -247,18 +442,20 @@ class VectorStoreService:
     
     def add_best_practice(self, practice: BestPractice) -> bool:
         """Add a new best practice to the vector store."""
+        if self.has_practice(practice.id):
+            logger.warning(f"Best practice already exists: {practice.id}")
+            return False
+        
         try:
+            document = f"{practice.title}: {practice.description}"
+            metadata = self._practice_metadata(practice)
             self.collection.add(
-                documents=[f"{practice.title}: {practice.description}"],
-                metadatas=[{
-                    "category": practice.category,
-                    "schema_types": json.dumps([st.value for st in practice.applicable_schema_types]),
-                    "platforms": json.dumps([p.value for p in practice.applicable_platforms]),
-                    "severity": practice.severity_if_missing.value,
-                    "examples": json.dumps(practice.examples)
-                }],
+                documents=[document],
+                metadatas=[metadata],
                 ids=[practice.id]
             )
+            self.catalog.put(practice.id, document, public_metadata(metadata))
+            self._refresh_corpus_version()
             logger.info(f"Added best practice: {practice.id}")
             return True
         except Exception as e:
@@ -268,49 +465,35 @@ class VectorStoreService:
     def search_relevant_practices(self, query: str, schema_type: SchemaType, platform: Optional[Platform] = None, limit: int = 10) -> List[Dict[str, Any]]:
         """Search for relevant best practices based on query, schema type, and optionally platform."""
         try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=limit * 2  # Get more results to allow for filtering
-            )
+            with VECTOR_LATENCY.labels("embedding").time(), stage("embedding"):
+                query_embedding = self._embed_query(query)
+            # Documents and metadata come from the catalog, or from Chroma while it is not loaded
+            from_catalog = self.catalog.loaded
+            with VECTOR_LATENCY.labels("query").time(), stage("vector_query"):
+                # Platform-specific practices for other platforms and other schema types are filtered out by Chroma
+                results = self.collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=limit,
+                    where=applicability_filter(schema_type, platform),
+                    include=["distances"] if from_catalog else ["documents", "metadatas", "distances"]
+                )
             
             practices = []
-            if results["documents"]:
-                for i, doc in enumerate(results["documents"][0]):
-                    metadata = results["metadatas"][0][i]
-                    
-                    # Filter by schema type
-                    schema_types_str = metadata.get("schema_types", "[]")
-                    platforms_str = metadata.get("platforms", "[]")
-                    
-                    try:
-                        schema_types = json.loads(schema_types_str)
-                        platforms = json.loads(platforms_str)
-                        
-                        # Check schema type match
-                        if schema_type.value not in schema_types:
-                            continue
-                            
-                        # Check platform match (if platform is specified)
-                        if platform:
-                            # If platforms list is empty, it applies to all platforms
-                            # Otherwise, check if the specified platform is in the list
-                            if platforms and platform.value not in platforms:
-                                continue
-                        
-                        practices.append({
-                            "id": results["ids"][0][i],
-                            "content": doc,
-                            "metadata": metadata,
-                            "distance": results["distances"][0][i] if "distances" in results else None
-                        })
-                        
-                        # Stop if we have enough results
-                        if len(practices) >= limit:
-                            break
-                            
-                    except json.JSONDecodeError:
-                        # Skip if metadata is malformed
-                        continue
+            if from_catalog:
+                for practice_id, distance in zip(results["ids"][0], results["distances"][0]):
+                    practice = self.catalog.get(practice_id)
+                    if practice is not None:
+                        practices.append({**practice, "distance": distance})
+            else:
+                for practice_id, document, metadata, distance in zip(
+                    results["ids"][0], results["documents"][0], results["metadatas"][0], results["distances"][0]
+                ):
+                    practices.append({
+                        "id": practice_id,
+                        "content": document,
+                        "metadata": public_metadata(metadata or {}),
+                        "distance": distance
+                    })
             
             logger.info(f"Found {len(practices)} relevant practices for query: {query}, schema_type: {schema_type.value}, platform: {platform.value if platform else 'any'}")
             return practices
@@ -319,26 +502,53 @@ class VectorStoreService:
             logger.error(f"Error searching best practices: {e}")
             return []
     
+    def _embed_query(self, query: str) -> List[float]:
+        """Embed a search query, reusing the embedding of an identical earlier query."""
+        key = hashlib.sha256(f"{self.embedding_model}\n{query}".encode()).hexdigest()
+        with self._embedding_lock:
+            embedding = self.embedding_cache.get(key)
+            if embedding is not None:
+                saved = self.embedding_seconds / self.embedding_misses if self.embedding_misses else 0.0
+                self.embedding_hits += 1
+                self.embedding_seconds_saved += saved
+        if embedding is not None:
+            EMBEDDING_CACHE_LOOKUPS.labels("hit").inc()
+            EMBEDDING_SECONDS_SAVED.inc(saved)
+            return embedding
+        
+        start = time.perf_counter()
+        embedding = self.embedding_function([query])[0]
+        elapsed = time.perf_counter() - start
+        with self._embedding_lock:
+            self.embedding_seconds += elapsed
+            self.embedding_misses += 1
+            self.embedding_cache.set(key, embedding)
+        EMBEDDING_CACHE_LOOKUPS.labels("miss").inc()
+        return embedding
+    
+    def get_embedding_cache_stats(self) -> Dict[str, Any]:
+        """Get query embedding cache statistics; time saved is estimated from the average miss."""
+        lookups = self.embedding_hits + self.embedding_misses
+        return {
+            "model": self.embedding_model,
+            "entries": len(self.embedding_cache),
+            "max_entries": self.embedding_cache.max_entries,
+            "hits": self.embedding_hits,
+            "misses": self.embedding_misses,
+            "hit_ratio": round(self.embedding_hits / lookups, 4) if lookups else 0.0,
+            "avg_embedding_ms": round(self.embedding_seconds / self.embedding_misses * 1000, 3)
+            if self.embedding_misses else 0.0,
+            "time_saved_seconds": round(self.embedding_seconds_saved, 3)
+        }
+    
     def get_all_practices_for_schema_type(self, schema_type: SchemaType) -> List[Dict[str, Any]]:
         """Get all best practices applicable to a specific schema type."""
         try:
-            # Get all documents first, then filter
-            all_results = self.collection.get()
-            
-            practices = []
-            for i, metadata in enumerate(all_results["metadatas"]):
-                schema_types_str = metadata.get("schema_types", "[]")
-                try:
-                    schema_types = json.loads(schema_types_str)
-                    if schema_type.value in schema_types:
-                        practices.append({
-                            "id": all_results["ids"][i],
-                            "content": all_results["documents"][i],
-                            "metadata": metadata
-                        })
-                except json.JSONDecodeError:
-                    # Skip if schema_types is malformed
-                    continue
+            with VECTOR_LATENCY.labels("scan").time(), stage("practice_scan"):
+                if self.catalog.loaded:
+                    practices = self.catalog.practices(schema_type=schema_type)
+                else:
+                    practices = self._query_practices(applicability_filter(schema_type))
             
             logger.info(f"Found {len(practices)} practices for schema type: {schema_type.value}")
             return practices
@@ -347,20 +557,28 @@ class VectorStoreService:
             logger.error(f"Error getting practices for schema type {schema_type.value}: {e}")
             return []
     
+    def get_all_practices(self) -> List[Dict[str, Any]]:
+        """Get every best practice in the vector store."""
+        if self.catalog.loaded:
+            return self.catalog.practices()
+        return self._query_practices()
+    
     def update_practice(self, practice: BestPractice) -> bool:
         """Update an existing best practice."""
+        if not self.has_practice(practice.id):
+            logger.warning(f"Cannot update unknown best practice: {practice.id}")
+            return False
+        
         try:
+            document = f"{practice.title}: {practice.description}"
+            metadata = self._practice_metadata(practice)
             self.collection.update(
                 ids=[practice.id],
-                documents=[f"{practice.title}: {practice.description}"],
-                metadatas=[{
-                    "category": practice.category,
-                    "schema_types": json.dumps([st.value for st in practice.applicable_schema_types]),
-                    "platforms": json.dumps([p.value for p in practice.applicable_platforms]),
-                    "severity": practice.severity_if_missing.value,
-                    "examples": json.dumps(practice.examples)
-                }]
+                documents=[document],
+                metadatas=[metadata]
             )
+            self.catalog.put(practice.id, document, public_metadata(metadata))
+            self._refresh_corpus_version()
             logger.info(f"Updated best practice: {practice.id}")
             return True
         except Exception as e:
@@ -369,8 +587,14 @@ class VectorStoreService:
     
     def delete_practice(self, practice_id: str) -> bool:
         """Delete a best practice from the vector store."""
+        if not self.has_practice(practice_id):
+            logger.warning(f"Cannot delete unknown best practice: {practice_id}")
+            return False
+        
         try:
             self.collection.delete(ids=[practice_id])
+            self.catalog.remove(practice_id)
+            self._refresh_corpus_version()
             logger.info(f"Deleted best practice: {practice_id}")
             return True
         except Exception as e:
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Load and latency benchmarks for the Schema Validator API.
+
+Drives the API in-process through httpx's ASGI transport (no server needed)
+with the fake AI provider, so the full request path (vector search, prompt
+build, provider call, parsing) is exercised without using any API quota.
+
+Usage:
+    python benchmarks/run_benchmarks.py                    # run and print the results
+    python benchmarks/run_benchmarks.py --save-baseline    # store the results as the baseline
+    python benchmarks/run_benchmarks.py --compare          # exit 1 on a regression against the baseline
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, "benchmarks", "baseline.json")
+SCENARIOS = ["validate", "validate_simple", "best_practices"]
+
+# Metrics compared against the baseline, and whether higher is worse
+COMPARED_METRICS = {"p50": True, "p95": True, "p99": True, "throughput_rps": False, "peak_rss_mb": True}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the Schema Validator API in-process")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients per scenario")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests before each scenario")
+    parser.add_argument("--provider-latency", type=float, default=0.05,
+                        help="Median fake provider time to first token (seconds)")
+    parser.add_argument("--provider-tps", type=float, default=0.0,
+                        help="Fake provider completion tokens per second (0 = instant)")
+    parser.add_argument("--cache", action="store_true", help="Keep the validation result cache enabled")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare the results against the baseline")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Allowed relative regression per metric (0.2 = 20%%)")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    """Point the service at the fake provider; must run before the app is imported."""
+    os.environ["AI_PROVIDER"] = "fake"
+    os.environ["FAKE_LATENCY_SECONDS"] = str(args.provider_latency)
+    os.environ["FAKE_TOKENS_PER_SECOND"] = str(args.provider_tps)
+    os.environ.setdefault("FAKE_SEED", "42")
+    os.environ["CACHE_ENABLED"] = "true" if args.cache else "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def make_schema(index: int):
+    """A unique schema per request, so results are never served from cache or coalesced."""
+    kind = index % 4
+    if kind == 0:
+        return "sql_ddl", "\n".join(
+            f"CREATE TABLE orders_{index}_{t} (\n"
+            f"  id BIGINT PRIMARY KEY,\n"
+            f"  customer_id BIGINT NOT NULL,\n"
+            f"  totalAmount DECIMAL(10, 2),\n"
+            f"  created_at TIMESTAMP NOT NULL -- creation time\n"
+            f");"
+            for t in range(3)
+        )
+    if kind == 1:
+        return "avro", json.dumps({
+            "type": "record",
+            "name": f"UserEvent{index}",
+            "fields": [
+                {"name": "user_id", "type": "long", "doc": "User identifier"},
+                {"name": "eventType", "type": "string"},
+                {"name": "payload", "type": ["null", "string"], "default": None}
+            ]
+        })
+    if kind == 2:
+        return "protobuf", (
+            'syntax = "proto3";\n'
+            f"package bench{index};\n\n"
+            "// A customer\n"
+            "message Customer {\n"
+            "  int64 id = 1;\n"
+            "  string email = 2; // contact email\n"
+            "  repeated string tags = 3;\n"
+            "}\n"
+        )
+    return "json_schema", json.dumps({
+        "title": f"Product{index}",
+        "type": "object",
+        "properties": {
+            "sku": {"type": "string", "description": "Stock keeping unit"},
+            "price": {"type": "number"},
+            "qty": {"type": "integer"}
+        },
+        "required": ["sku"]
+    })
+
+
+def build_request(scenario: str, index: int):
+    """Get (method, url, kwargs) for one request of a scenario."""
+    schema_type, schema_content = make_schema(index)
+    if scenario == "validate":
+        return "POST", "/api/v1/validate", {"json": {"schema_content": schema_content, "schema_type": schema_type}}
+    if scenario == "validate_simple":
+        return "POST", "/api/v1/validate/simple", {
+            "params": {"schema_content": schema_content, "schema_type": schema_type}
+        }
+    return "GET", "/api/v1/best-practices", {"params": {"schema_type": schema_type}}
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process (falls back to the peak where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+async def run_scenario(client, scenario: str, total: int, concurrency: int, offset: int):
+    """Send `total` requests from `concurrency` clients and summarize latency and throughput."""
+    from app.core.stats import LatencyStats
+    
+    latency = LatencyStats(window=total)
+    errors = 0
+    next_index = iter(range(offset, offset + total))
+    
+    async def worker():
+        nonlocal errors
+        for index in next_index:
+            method, url, kwargs = build_request(scenario, index)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latency.record(time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    
+    stats = latency.get_stats()
+    return {
+        "requests": total,
+        "errors": errors,
+        "concurrency": concurrency,
+        "p50": stats["p50"],
+        "p95": stats["p95"],
+        "p99": stats["p99"],
+        "max": stats["max"],
+        "mean": stats["avg"],
+        "throughput_rps": round(total / elapsed, 2),
+        "rss_mb": round(current_rss_mb(), 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+
+
+async def run_benchmarks(args):
+    import httpx
+    from app.main import app
+    
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+        offset = 0
+        for scenario in args.scenarios:
+            if args.warmup:
+                await run_scenario(client, scenario, args.warmup, min(args.concurrency, args.warmup), offset)
+                offset += args.warmup
+            print(f"⏱️  {scenario}: {args.requests} requests at concurrency {args.concurrency}...")
+            results[scenario] = await run_scenario(client, scenario, args.requests, args.concurrency, offset)
+            offset += args.requests
+    return results
+
+
+def print_results(results):
+    print(f"\n{'scenario':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'errors':>8}{'rss MB':>9}")
+    for scenario, result in results.items():
+        print(
+            f"{scenario:<18}{result['p50'] * 1000:>9.1f}{result['p95'] * 1000:>9.1f}{result['p99'] * 1000:>9.1f}"
+            f"{result['throughput_rps']:>9.1f}{result['errors']:>8}{result['rss_mb']:>9.1f}"
+        )
+
+
+def compare(results, baseline, max_regression: float) -> list:
+    """List the metrics that regressed by more than max_regression against the baseline."""
+    regressions = []
+    for scenario, result in results.items():
+        base = baseline["scenarios"].get(scenario)
+        if base is None:
+            print(f"   ⚠️  No baseline for {scenario}, skipping")
+            continue
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            before, after = base.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if (change if higher_is_worse else -change) > max_regression:
+                regressions.append(f"{scenario}.{metric}: {before} -> {after} ({change:+.0%})")
+        if result["errors"] > base.get("errors", 0):
+            regressions.append(f"{scenario}.errors: {base.get('errors', 0)} -> {result['errors']}")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    configure_environment(args)
+    
+    print("🚀 Schema Validator Benchmarks")
+    print("=" * 50)
+    results = asyncio.run(run_benchmarks(args))
+    print_results(results)
+    
+    report = {
+        "created_at": datetime.datetime.utcnow().isoformat(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "provider_latency": args.provider_latency,
+            "provider_tps": args.provider_tps,
+            "cache": args.cache,
+            "python": platform.python_version()
+        },
+        "scenarios": results
+    }
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📝 Results written to {args.output}")
+    
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+    
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"\n❌ No baseline at {args.baseline}; run with --save-baseline first")
+            return 1
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        mismatched = [
+            key for key, value in report["config"].items()
+            if key != "python" and baseline.get("config", {}).get(key) != value
+        ]
+        if mismatched:
+            print(f"   ⚠️  Baseline was recorded with different {', '.join(mismatched)}; results may not be comparable")
+        
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) above {args.max_regression:.0%}:")
+            for regression in regressions:
+                print(f"   • {regression}")
+            return 1
+        print(f"\n✅ No regression above {args.max_regression:.0%} against the baseline")
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
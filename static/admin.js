@@ -7,6 +7,7 @@ class AdminPanel {
         this.bestPractices = [];
         this.schemaTypes = [];
         this.platforms = [];
+        this.usage = null;
         this.currentEditId = null;
         this.isAuthenticated = false;
         
@@ -168,6 +169,11 @@ class AdminPanel {
             this.updateGPTModel();
         });
 
+        // Usage events
+        document.getElementById('reset-usage-btn').addEventListener('click', () => {
+            this.resetUsage();
+        });
+
         // Close modals when clicking outside
         document.querySelectorAll('.modal').forEach(modal => {
             modal.addEventListener('click', (e) => {
@@ -186,12 +192,14 @@ class AdminPanel {
                 this.loadStats(),
                 this.loadSchemaTypes(),
                 this.loadBestPractices(),
-                this.loadCurrentModel()
+                this.loadCurrentModel(),
+                this.loadUsage()
             ]);
             
             this.populateFilters();
             this.updateDashboard();
             this.updateAnalytics();
+            this.updateUsage();
             this.renderBestPracticesTable();
             
         } catch (error) {
@@ -253,7 +261,8 @@ class AdminPanel {
             'dashboard': 'Dashboard',
             'best-practices': 'Best Practices',
             'add-practice': 'Add Practice',
-            'analytics': 'Analytics'
+            'analytics': 'Analytics',
+            'usage': 'Usage & Cost'
         };
         document.getElementById('page-title').textContent = titles[section] || section;
 
@@ -262,6 +271,8 @@ class AdminPanel {
         // Load section-specific data
         if (section === 'add-practice') {
             this.setupAddForm();
+        } else if (section === 'usage') {
+            this.loadUsage().then(() => this.updateUsage());
         }
     }
 
@@ -413,6 +424,70 @@ class AdminPanel {
             `).join('');
     }
 
+    async loadUsage() {
+        try {
+            const response = await fetch(`${this.baseUrl}/api/v1/usage`);
+            if (!response.ok) throw new Error('Failed to load usage');
+            this.usage = await response.json();
+        } catch (error) {
+            console.error('Error loading usage:', error);
+            this.usage = null;
+        }
+    }
+
+    updateUsage() {
+        if (!this.usage) {
+            ['usage-cost', 'usage-calls', 'usage-tokens', 'usage-savings'].forEach(id => {
+                document.getElementById(id).textContent = '-';
+            });
+            return;
+        }
+
+        const totals = this.usage.totals;
+        document.getElementById('usage-cost').textContent = `$${totals.cost_usd.toFixed(4)}`;
+        document.getElementById('usage-calls').textContent = totals.calls.toLocaleString();
+        document.getElementById('usage-tokens').textContent =
+            `${totals.prompt_tokens.toLocaleString()} / ${totals.completion_tokens.toLocaleString()}`;
+        document.getElementById('usage-savings').textContent = `$${totals.cache_savings_usd.toFixed(4)}`;
+
+        document.getElementById('usage-by-model').innerHTML = this.createUsageItems(this.usage.by_model);
+        document.getElementById('usage-by-schema-type').innerHTML = this.createUsageItems(this.usage.by_schema_type);
+        document.getElementById('usage-by-platform').innerHTML = this.createUsageItems(this.usage.by_platform);
+        document.getElementById('usage-by-client').innerHTML = this.createUsageItems(this.usage.by_client);
+    }
+
+    createUsageItems(data) {
+        if (!data || Object.keys(data).length === 0) {
+            return '<p class="text-muted">No LLM calls recorded yet</p>';
+        }
+
+        // Already ordered by cost, highest first
+        return Object.entries(data)
+            .map(([label, usage]) => `
+                <div class="analytics-item">
+                    <span class="analytics-label">${label}</span>
+                    <span class="analytics-value">$${usage.cost_usd.toFixed(4)} · ${usage.calls} calls · ${(usage.prompt_tokens + usage.completion_tokens).toLocaleString()} tokens</span>
+                </div>
+            `).join('');
+    }
+
+    async resetUsage() {
+        if (!confirm('Reset all usage totals?')) {
+            return;
+        }
+
+        try {
+            const response = await fetch(`${this.baseUrl}/api/v1/usage`, { method: 'DELETE' });
+            if (!response.ok) throw new Error('Failed to reset usage');
+            this.showToast('Usage totals reset', 'success');
+            await this.loadUsage();
+            this.updateUsage();
+        } catch (error) {
+            console.error('Error resetting usage:', error);
+            this.showToast(`Failed to reset usage: ${error.message}`, 'error');
+        }
+    }
+
     populateFilters() {
         // Schema type filter
         const schemaFilter = document.getElementById('filter-schema-type');
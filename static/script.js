@@ -142,7 +142,7 @@ class SchemaValidator {
                 platform: platform // Add platform info for backend
             };
 
-            const response = await fetch(`${this.baseUrl}/api/v1/validate`, {
+            const response = await fetch(`${this.baseUrl}/api/v1/validate/stream`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -154,7 +154,7 @@ class SchemaValidator {
                 throw new Error(`HTTP ${response.status}: ${response.statusText}`);
             }
 
-            const result = await response.json();
+            const result = await this.consumeValidationStream(response);
             this.displayResults(result);
 
         } catch (error) {
@@ -165,6 +165,71 @@ class SchemaValidator {
         }
     }
 
+    async consumeValidationStream(response) {
+        // Read Server-Sent Events from the streaming endpoint, rendering
+        // recommendations as they arrive and resolving with the final result
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let streamedCount = 0;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+
+            for (const rawEvent of events) {
+                let eventName = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                    if (line.startsWith('data:')) data += line.slice(5).trim();
+                });
+                if (!data) continue;
+
+                const payload = JSON.parse(data);
+                if (eventName === 'recommendation') {
+                    if (streamedCount === 0) this.showStreamingResults();
+                    this.appendStreamingRecommendation(payload);
+                    streamedCount++;
+                } else if (eventName === 'result') {
+                    return payload;
+                } else if (eventName === 'error') {
+                    throw new Error(payload.detail);
+                }
+            }
+        }
+
+        throw new Error('Stream ended before the analysis completed');
+    }
+
+    showStreamingResults() {
+        const resultsSection = document.getElementById('results-section');
+        const resultsContent = document.getElementById('results-content');
+        const overallScore = document.getElementById('overall-score');
+
+        this.showLoading(false);
+        document.getElementById('validate-btn').disabled = true;
+
+        resultsSection.style.display = 'block';
+        overallScore.className = 'score-badge';
+        overallScore.innerHTML = '<div class="score-display"><div class="score-number"><i class="fas fa-spinner fa-spin"></i> Scoring...</div></div>';
+        resultsContent.innerHTML = `
+            <h3 style="margin-bottom: 20px;"><i class="fas fa-lightbulb"></i> Recommendations</h3>
+            <div id="streaming-recommendations"></div>
+        `;
+    }
+
+    appendStreamingRecommendation(recommendation) {
+        const container = document.getElementById('streaming-recommendations');
+        if (container) {
+            container.insertAdjacentHTML('beforeend', this.createRecommendationCard(recommendation));
+        }
+    }
+
     displayResults(result) {
         const resultsSection = document.getElementById('results-section');
         const resultsContent = document.getElementById('results-content');
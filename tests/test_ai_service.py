@@ -0,0 +1,129 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.models.schema import SchemaType, SchemaValidationRequest
+from app.services.ai_service import AIService
+from app.services.llm_providers import LLMProvider, LLMResult
+from app.services.practice_catalog import PracticeCatalog
+
+
+SCHEMA = """CREATE TABLE customers (id BIGINT PRIMARY KEY, email VARCHAR(255) NOT NULL);
+CREATE TABLE orders (id BIGINT PRIMARY KEY, customer_id BIGINT NOT NULL);
+"""
+
+ANALYSIS = json.dumps({
+    "overall_score": 7,
+    "recommendations": [{"category": "naming", "severity": "low", "description": "Looks fine",
+                         "suggestion": "None", "impact": "None"}],
+    "best_practices_applied": [],
+    "missing_best_practices": [],
+    "summary": "ok"
+})
+
+
+class BadRequestError(Exception):
+    status_code = 400  # not retried
+
+
+class StubVectorStore:
+    corpus_version = "v1"
+    
+    def __init__(self):
+        self.catalog = PracticeCatalog()
+    
+    def get_all_practices_for_schema_type(self, schema_type):
+        return []
+    
+    async def search_relevant_practices_async(self, query, schema_type, platform=None, limit=10):
+        return []
+    
+    async def run_in_executor(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+
+class ScriptedProvider(LLMProvider):
+    """Answers with a scripted text; the first prompt mentioning `fail_on` is rejected."""
+    
+    name = "scripted"
+    
+    def __init__(self, fail_on=None, text=ANALYSIS):
+        super().__init__()
+        self.fail_on = fail_on
+        self.text = text
+        self.requests = 0
+    
+    @property
+    def model(self):
+        return "scripted-model"
+    
+    async def _complete(self, system, prompt, max_tokens, timeout, model, json_schema):
+        self.requests += 1
+        if self.fail_on and self.fail_on in prompt:
+            self.fail_on = None
+            raise BadRequestError("rejected")
+        return LLMResult(provider=self.name, model=model, text=self.text)
+    
+    async def _stream(self, system, prompt, max_tokens, timeout, result, json_schema):
+        self.requests += 1
+        yield self.text
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(settings, "ai_provider", "fake")
+    monkeypatch.setattr(settings, "llm_parse_retries", 0)
+    monkeypatch.setattr(settings, "chunk_max_chars", 100)
+    return AIService(vector_store=StubVectorStore())
+
+
+def use_provider(service, provider):
+    service.providers = {provider.name: provider}
+    service.llm = provider
+    service.provider = provider.name
+
+
+def request():
+    return SchemaValidationRequest(schema_content=SCHEMA, schema_type=SchemaType.SQL_DDL, chunking=True)
+
+
+def test_partial_chunked_analysis_is_not_cached(service):
+    provider = ScriptedProvider(fail_on="CREATE TABLE orders")
+    use_provider(service, provider)
+    
+    first = asyncio.run(service.analyze_schema(request()))
+    assert first.metadata["partial"] and first.metadata["failed_chunks"] == 1
+    assert provider.requests == 2
+    
+    second = asyncio.run(service.analyze_schema(request()))
+    assert provider.requests == 4  # analyzed again rather than served from cache
+    assert "partial" not in second.metadata
+    
+    asyncio.run(service.analyze_schema(request()))
+    assert provider.requests == 4  # the complete analysis was cached
+
+
+def test_unparseable_answers_are_not_cached(service):
+    provider = ScriptedProvider(text="Not JSON at all")
+    use_provider(service, provider)
+    plain = SchemaValidationRequest(schema_content=SCHEMA, schema_type=SchemaType.SQL_DDL, chunking=False)
+    
+    response = asyncio.run(service.analyze_schema(plain))
+    assert response.metadata["partial"]
+    asyncio.run(service.analyze_schema(plain))
+    assert provider.requests == 2
+
+
+def test_unparseable_streamed_answers_are_not_cached(service):
+    provider = ScriptedProvider(text="Not JSON at all")
+    use_provider(service, provider)
+    plain = SchemaValidationRequest(schema_content=SCHEMA, schema_type=SchemaType.SQL_DDL, chunking=False)
+    
+    async def stream():
+        return [event async for event, _ in service.analyze_schema_stream(plain)]
+    
+    assert asyncio.run(stream())[-1] == "result"
+    asyncio.run(stream())
+    assert provider.requests == 2
@@ -0,0 +1,107 @@
+import importlib
+
+import pytest
+
+from app.core.config import settings
+from app.core.usage import ANONYMOUS_CLIENT
+
+fastapi_testclient = pytest.importorskip("fastapi.testclient")
+
+
+def validation(schema_content, **fields):
+    return {"schema_content": schema_content, "schema_type": "sql_ddl", "include_best_practices": False, **fields}
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    """The app on the fake provider, with an empty corpus and job store in a temporary directory."""
+    directory = tmp_path_factory.mktemp("api")
+    with pytest.MonkeyPatch.context() as patch:
+        for name, value in {
+            "chroma_persist_directory": str(directory / "chroma"),
+            "auto_populate_defaults": False,
+            "database_url": f"sqlite:///{directory / 'jobs.db'}",
+            "ai_provider": "fake",
+            "fake_latency_seconds": 0.0,
+            "fake_tokens_per_second": 0.0,
+            "fake_error_rate": 0.0,
+            "fake_timeout_rate": 0.0,
+        }.items():
+            patch.setattr(settings, name, value)
+
+        main = importlib.import_module("app.main")
+        from app.core.auth import require_admin_auth
+
+        main.app.dependency_overrides[require_admin_auth] = lambda: True
+        with fastapi_testclient.TestClient(main.app) as client:
+            yield client
+        main.app.dependency_overrides.clear()
+
+
+def test_stats_report_prompt_prefix_cache_hits(client):
+    before = client.get("/api/v1/stats").json()["prompt_cache"]
+    client.post("/api/v1/validate", json=validation("CREATE TABLE a (id INT);"))
+    client.post("/api/v1/validate", json=validation("CREATE TABLE b (id INT);"))
+
+    prompt_cache = client.get("/api/v1/stats").json()["prompt_cache"]
+    assert prompt_cache["calls"] == before["calls"] + 2
+    assert prompt_cache["cached_tokens"] > before["cached_tokens"]  # the second call reused the system prefix
+    assert 0 < prompt_cache["cached_ratio"] < 1
+
+
+def test_validate_reports_stage_timings_and_completion_tokens(client):
+    before = client.get("/api/v1/stats").json()["stage_latency"].get("llm", {}).get("count", 0)
+    response = client.post("/api/v1/validate", json=validation("CREATE TABLE timings (id INT);"))
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["completion_tokens"] > 0
+    assert {"cache_lookup", "prompt_build", "llm", "parse"} <= set(body["timings"])
+    assert all(milliseconds >= 0 for milliseconds in body["timings"].values())
+
+    stage_latency = client.get("/api/v1/stats").json()["stage_latency"]
+    assert stage_latency["llm"]["count"] == before + 1
+    assert stage_latency["llm"]["p50"] is not None
+
+
+def test_metrics_label_requests_by_route_template(client):
+    assert client.get("/api/v1/jobs/does-not-exist").status_code == 404
+    client.post("/api/v1/validate", json=validation("CREATE TABLE metrics (id INT);"))
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'schema_validator_http_request_duration_seconds_count{method="GET",route="/api/v1/jobs/{job_id}",status="404"}' in text
+    assert "does-not-exist" not in text
+    assert 'schema_validator_stage_duration_seconds_count{stage="llm"}' in text
+
+
+def test_metrics_can_be_disabled(client, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_enabled", False)
+
+    assert client.get("/metrics").status_code == 404
+
+
+def test_usage_is_priced_and_broken_down_by_client(client, monkeypatch):
+    monkeypatch.setattr(settings, "model_prices", {"fake-schema-analyzer": {"input": 1.0, "cached_input": 0.5, "output": 2.0}})
+    assert client.delete("/api/v1/usage").status_code == 200
+    client.post("/api/v1/validate", json=validation("CREATE TABLE usage_a (id INT);"), headers={"X-Client-Id": "team-a"})
+    client.post("/api/v1/validate", json=validation("CREATE TABLE usage_b (id INT);"))
+
+    report = client.get("/api/v1/usage").json()
+    totals = report["totals"]
+    assert totals["calls"] == 2
+    expected_cost = (
+        (totals["prompt_tokens"] - totals["cached_tokens"]) * 1.0 + totals["cached_tokens"] * 0.5
+        + totals["completion_tokens"] * 2.0
+    ) / 1_000_000
+    assert totals["cost_usd"] == pytest.approx(expected_cost, abs=1e-6)
+    assert set(report["by_client"]) == {"team-a", ANONYMOUS_CLIENT}
+    assert report["by_client"]["team-a"]["calls"] == 1
+    assert report["by_schema_type"]["sql_ddl"]["calls"] == 2
+    assert report["by_model"]["fake-schema-analyzer"]["cost_usd"] == totals["cost_usd"]
+    assert report["unpriced_models"] == []
+
+    assert client.delete("/api/v1/usage").status_code == 200
+    assert client.get("/api/v1/usage").json()["totals"]["calls"] == 0
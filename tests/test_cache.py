@@ -0,0 +1,83 @@
+import asyncio
+
+from app.core.config import settings
+from app.models.schema import Platform, SchemaType, SchemaValidationRequest, SchemaValidationResponse
+from app.services import cache as cache_module
+from app.services.cache import LRUCache, ValidationCache
+
+
+def request(**overrides):
+    return SchemaValidationRequest(**{"schema_content": "CREATE TABLE t (id INT);", "schema_type": SchemaType.SQL_DDL, **overrides})
+
+
+def response(score=7):
+    return SchemaValidationResponse(
+        overall_score=score, recommendations=[], best_practices_applied=[], missing_best_practices=[], summary="ok"
+    )
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1  # "b" is now the oldest
+    lru.set("c", 3)
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == (1, None, 3)
+    assert len(lru) == 2
+
+
+def test_lru_expires_entries_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    lru = LRUCache(max_entries=10, ttl=60)
+    lru.set("a", 1)
+    now[0] += 59
+    assert lru.get("a") == 1
+    now[0] += 2
+    assert lru.get("a") is None
+    assert len(lru) == 0
+
+
+def test_cache_key_covers_everything_that_changes_the_analysis():
+    cache = ValidationCache()
+    base = cache.make_key(request(), "gpt-4o-mini", "v1")
+    assert cache.make_key(request(), "gpt-4o-mini", "v1") == base
+    for other in (
+        cache.make_key(request(schema_content="CREATE TABLE u (id INT);"), "gpt-4o-mini", "v1"),
+        cache.make_key(request(platform=Platform.MYSQL), "gpt-4o-mini", "v1"),
+        cache.make_key(request(), "gpt-4o", "v1"),
+        cache.make_key(request(), "gpt-4o-mini", "v2"),
+    ):
+        assert other != base
+
+
+def test_cached_responses_are_copies(monkeypatch):
+    monkeypatch.setattr(settings, "cache_enabled", True)
+    monkeypatch.setattr(settings, "redis_cache_enabled", False)
+    
+    async def scenario():
+        cache = ValidationCache()
+        stored = response()
+        await cache.set("key", stored)
+        stored.summary = "changed after caching"
+        first = await cache.get("key")
+        first.summary = "changed by a reader"
+        second = await cache.get("key")
+        missing = await cache.get("other")
+        return second, missing, cache.get_stats()
+    
+    second, missing, stats = asyncio.run(scenario())
+    assert second.summary == "ok"
+    assert missing is None
+    assert (stats["memory_hits"], stats["misses"]) == (2, 1)
+
+
+def test_disabled_cache_stores_nothing(monkeypatch):
+    monkeypatch.setattr(settings, "cache_enabled", False)
+    
+    async def scenario():
+        cache = ValidationCache()
+        await cache.set("key", response())
+        return await cache.get("key")
+    
+    assert asyncio.run(scenario()) is None
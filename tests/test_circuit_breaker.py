@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import circuit_breaker
+from app.services.circuit_breaker import (
+    AdaptiveConcurrencyLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    ConcurrencyLimitError,
+    is_transient_error,
+)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+@pytest.fixture
+def breaker_settings(monkeypatch):
+    monkeypatch.setattr(settings, "breaker_window", 4)
+    monkeypatch.setattr(settings, "breaker_min_calls", 4)
+    monkeypatch.setattr(settings, "breaker_error_rate", 0.5)
+    monkeypatch.setattr(settings, "breaker_cooldown", 10.0)
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_transient_errors():
+    assert is_transient_error(asyncio.TimeoutError())
+    assert is_transient_error(StatusError(429))
+    assert is_transient_error(StatusError(503))
+    assert not is_transient_error(StatusError(400))
+    assert not is_transient_error(ValueError("bad request"))
+
+
+def test_breaker_opens_on_error_rate_and_closes_after_successful_probe(breaker_settings):
+    breaker = CircuitBreaker("openai")
+    for failed in (False, True, False, True):
+        breaker.before_call()
+        breaker.record_failure() if failed else breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_after == 10.0
+
+    breaker_settings[0] += 10.0
+    breaker.before_call()  # the probe
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one probe at a time
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_probe_reopens_and_cancelled_probe_frees_the_slot(breaker_settings):
+    breaker = CircuitBreaker("openai")
+    for _ in range(4):
+        breaker.record_failure()
+    breaker_settings[0] += 10.0
+
+    breaker.before_call()
+    breaker.record_cancelled()
+    breaker.before_call()  # slot was released
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 2
+
+
+def test_slow_calls_count_as_failures(breaker_settings, monkeypatch):
+    monkeypatch.setattr(settings, "breaker_slow_call_seconds", 1.0)
+    breaker = CircuitBreaker("openai")
+    for _ in range(4):
+        breaker.record_success(5.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_concurrency_limit_grows_additively_and_shrinks_multiplicatively(monkeypatch):
+    monkeypatch.setattr(settings, "llm_concurrency_initial", 4)
+    monkeypatch.setattr(settings, "llm_concurrency_latency_target", 1.0)
+    monkeypatch.setattr(settings, "llm_concurrency_backoff", 0.5)
+
+    async def scenario():
+        limiter = AdaptiveConcurrencyLimiter("openai")
+        await limiter.acquire()
+        limiter.release(latency=0.1)
+        grown = limiter.limit
+        await limiter.acquire()
+        limiter.release(overloaded=True)
+        return grown, limiter.limit, limiter.in_flight
+
+    grown, shrunk, in_flight = asyncio.run(scenario())
+    assert grown == pytest.approx(4.25)
+    assert shrunk == pytest.approx(2.125)
+    assert in_flight == 0
+
+
+def test_waiters_get_freed_slots_in_order_and_time_out(monkeypatch):
+    monkeypatch.setattr(settings, "llm_concurrency_initial", 1)
+    monkeypatch.setattr(settings, "llm_concurrency_queue_timeout", 0.05)
+
+    async def scenario():
+        limiter = AdaptiveConcurrencyLimiter("openai")
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release()
+        await waiter  # granted the freed slot
+
+        with pytest.raises(ConcurrencyLimitError):
+            await limiter.acquire()
+        return limiter.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["in_flight"], stats["queued"], stats["rejected"]) == (1, 0, 1)
@@ -0,0 +1,58 @@
+import asyncio
+
+from app.models.schema import SchemaType, SchemaValidationRequest
+from app.services.ai_service import AIService
+from app.services.coalescer import SingleFlight
+
+
+def test_concurrent_calls_with_the_same_key_share_one_upstream_call():
+    calls = []
+    
+    async def upstream(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+    
+    async def scenario():
+        single_flight = SingleFlight()
+        results = await asyncio.gather(
+            single_flight.do("a", lambda: upstream(1)),
+            single_flight.do("a", lambda: upstream(2)),
+            single_flight.do("b", lambda: upstream(3))
+        )
+        return results, single_flight.get_stats()
+    
+    results, stats = asyncio.run(scenario())
+    assert results == [1, 1, 3]
+    assert calls == [1, 3]
+    assert (stats["upstream_calls"], stats["coalesced_calls"], stats["in_flight"]) == (2, 1, 0)
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def scenario():
+        single_flight = SingleFlight()
+        
+        async def upstream():
+            await asyncio.sleep(0.05)
+            return "done"
+        
+        first = asyncio.ensure_future(single_flight.do("a", upstream))
+        second = asyncio.ensure_future(single_flight.do("a", upstream))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+    
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_incremental_requests_with_different_baselines_are_not_coalesced():
+    service = AIService.__new__(AIService)  # key derivation needs no providers
+    
+    def key(**previous):
+        request = SchemaValidationRequest(schema_content="CREATE TABLE t (id INT);", schema_type=SchemaType.SQL_DDL, **previous)
+        return service._single_flight_key(request, "cache-key")
+    
+    assert key() == "cache-key"
+    assert key(previous_schema_content="CREATE TABLE t (a INT);") != key(previous_schema_content="CREATE TABLE t (b INT);")
+    assert key(previous_schema_id="sql_ddl_1") != key(previous_schema_id="sql_ddl_2")
+    assert key(previous_schema_id="sql_ddl_1") == key(previous_schema_id="sql_ddl_1")
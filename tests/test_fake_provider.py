@@ -0,0 +1,103 @@
+import asyncio
+import statistics
+
+import pytest
+
+from app.core.config import settings
+from app.models.schema import SchemaAnalysis
+from app.services.fake_provider import FAKE_MODEL, FakeProvider, FakeProviderError
+
+
+SCHEMA = "CREATE TABLE users (id INT, email VARCHAR(255));"
+ANALYSIS_PROMPT = f"Schema Type: sql_ddl\nSchema Content:\n{SCHEMA}\n\nAnalyze this schema and respond with JSON."
+
+
+@pytest.fixture(autouse=True)
+def instant_provider(monkeypatch):
+    monkeypatch.setattr(settings, "fake_latency_seconds", 0.0)
+    monkeypatch.setattr(settings, "fake_tokens_per_second", 0.0)
+    monkeypatch.setattr(settings, "fake_error_rate", 0.0)
+    monkeypatch.setattr(settings, "fake_timeout_rate", 0.0)
+    monkeypatch.setattr(settings, "fake_seed", 7)
+
+
+def test_latency_follows_the_configured_distribution(monkeypatch):
+    monkeypatch.setattr(settings, "fake_latency_seconds", 0.5)
+    provider = FakeProvider()
+
+    monkeypatch.setattr(settings, "fake_latency_distribution", "fixed")
+    assert {provider.sample_latency() for _ in range(10)} == {0.5}
+
+    monkeypatch.setattr(settings, "fake_latency_distribution", "uniform")
+    assert all(0 <= provider.sample_latency() <= 1.0 for _ in range(100))
+
+    monkeypatch.setattr(settings, "fake_latency_distribution", "exponential")
+    assert all(provider.sample_latency() >= 0 for _ in range(100))
+
+    monkeypatch.setattr(settings, "fake_latency_distribution", "lognormal")
+    samples = [provider.sample_latency() for _ in range(2000)]
+    assert min(samples) > 0
+    assert statistics.median(samples) == pytest.approx(0.5, rel=0.1)
+
+
+def test_seed_makes_latencies_reproducible(monkeypatch):
+    monkeypatch.setattr(settings, "fake_latency_seconds", 1.0)
+    first, second = FakeProvider(), FakeProvider()
+
+    assert [first.sample_latency() for _ in range(5)] == [second.sample_latency() for _ in range(5)]
+
+
+def test_answers_analysis_prompts_with_a_valid_analysis():
+    result = asyncio.run(FakeProvider().complete(ANALYSIS_PROMPT))
+
+    assert result.model == FAKE_MODEL
+    analysis = SchemaAnalysis.model_validate_json(result.text)
+    assert analysis.recommendations
+    assert "fake provider" in analysis.summary
+    assert result.prompt_tokens > 0 and result.completion_tokens > 0
+
+
+def test_stream_yields_the_same_analysis_in_pieces():
+    provider = FakeProvider()
+
+    async def collect():
+        return [piece async for piece in provider.stream(ANALYSIS_PROMPT)]
+
+    pieces = asyncio.run(collect())
+    assert len(pieces) > 1
+    SchemaAnalysis.model_validate_json("".join(pieces))
+
+
+def test_repeated_system_prompt_is_reported_as_cached():
+    provider = FakeProvider()
+
+    async def run():
+        first = await provider.complete(ANALYSIS_PROMPT, system="stable prefix " * 50)
+        second = await provider.complete(ANALYSIS_PROMPT.replace("users", "orders"), system="stable prefix " * 50)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.cached_tokens == 0
+    assert 0 < second.cached_tokens < second.prompt_tokens
+    assert provider.get_prompt_cache_stats()["cached_tokens"] == second.cached_tokens
+
+
+def test_injected_errors_look_like_a_503(monkeypatch):
+    monkeypatch.setattr(settings, "fake_error_rate", 1.0)
+    provider = FakeProvider()
+
+    with pytest.raises(FakeProviderError) as error:
+        asyncio.run(provider.complete(ANALYSIS_PROMPT))
+    assert error.value.status_code == 503
+    assert provider.get_stats()["injected_errors"] == 1
+
+
+def test_injected_timeouts_hang_until_the_request_timeout(monkeypatch):
+    monkeypatch.setattr(settings, "fake_timeout_rate", 1.0)
+    provider = FakeProvider()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(provider.complete(ANALYSIS_PROMPT, timeout=0.05))
+    stats = provider.get_stats()
+    assert stats["injected_timeouts"] == 1
+    assert stats["injected_errors"] == 0
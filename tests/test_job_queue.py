@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.models.schema import JobStatus, SchemaType, SchemaValidationRequest, SchemaValidationResponse
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.job_queue import JobQueue, JobStore
+
+
+REQUEST = SchemaValidationRequest(schema_content='{"type": "object"}', schema_type=SchemaType.JSON_SCHEMA)
+
+
+class StubAIService:
+    def __init__(self, unavailable=0):
+        self.unavailable = unavailable  # calls failing with an open breaker before the provider recovers
+        self.calls = 0
+    
+    async def analyze_schema(self, request, raise_on_error=False):
+        self.calls += 1
+        if self.calls <= self.unavailable:
+            raise CircuitOpenError("Circuit breaker for openai is open", retry_after=0.0)
+        return SchemaValidationResponse(
+            overall_score=8, recommendations=[], best_practices_applied=[], missing_best_practices=[], summary="ok"
+        )
+
+
+class StaleReadStore(JobStore):
+    """Job store whose next read returns what it read only after `release` is set."""
+    
+    def __init__(self, database_url):
+        super().__init__(database_url)
+        self.armed = False
+        self.reading = threading.Event()
+        self.release = threading.Event()
+    
+    def get(self, job_id):
+        job = super().get(job_id)
+        if self.armed:
+            self.armed = False
+            self.reading.set()
+            self.release.wait(5)
+        return job
+
+
+def make_queue(tmp_path, store_class=JobStore, ai_service=None):
+    return JobQueue(ai_service or StubAIService(), store_class(f"sqlite:///{tmp_path / 'jobs.db'}"))
+
+
+@pytest.fixture
+def fast_job_retries(monkeypatch):
+    monkeypatch.setattr(settings, "job_retry_base_delay", 0.01)
+    monkeypatch.setattr(settings, "job_max_attempts", 3)
+
+
+def test_job_runs_and_long_poll_returns_result(tmp_path):
+    async def scenario():
+        queue = make_queue(tmp_path)
+        await queue.start()
+        try:
+            job = await queue.submit(REQUEST)
+            finished = await queue.get(job.job_id, wait=5)
+        finally:
+            await queue.stop()
+        assert finished.status == JobStatus.COMPLETED
+        assert finished.result.summary == "ok"
+        assert queue._waiters == {}
+    
+    asyncio.run(scenario())
+
+
+def test_long_poll_wakes_when_job_finishes_during_first_read(tmp_path):
+    async def scenario():
+        queue = make_queue(tmp_path, StaleReadStore)
+        job = await queue.submit(REQUEST)
+        
+        queue.store.armed = True
+        poll = asyncio.create_task(queue.get(job.job_id, wait=10))
+        await asyncio.to_thread(queue.store.reading.wait, 5)
+        await queue._run_job(job.job_id)  # finishes while the poller holds a stale "pending" read
+        queue.store.release.set()
+        
+        finished = await asyncio.wait_for(poll, timeout=2)
+        assert finished.status == JobStatus.COMPLETED
+        assert queue._waiters == {}
+    
+    asyncio.run(scenario())
+
+
+def test_timed_out_long_poll_removes_its_waiter(tmp_path):
+    async def scenario():
+        queue = make_queue(tmp_path)
+        job = await queue.submit(REQUEST)  # no workers, so it stays pending
+        pending = await queue.get(job.job_id, wait=0.05)
+        assert pending.status == JobStatus.PENDING
+        assert queue._waiters == {}
+        assert queue._waiter_counts == {}
+    
+    asyncio.run(scenario())
+
+
+def test_unfinished_jobs_are_resumed_on_start(tmp_path):
+    async def scenario():
+        store = JobStore(f"sqlite:///{tmp_path / 'jobs.db'}")
+        job = await asyncio.to_thread(store.create, REQUEST)
+        queue = JobQueue(StubAIService(), store)
+        await queue.start()
+        try:
+            finished = await queue.get(job.job_id, wait=5)
+        finally:
+            await queue.stop()
+        assert finished.status == JobStatus.COMPLETED
+    
+    asyncio.run(scenario())
+
+
+def test_jobs_are_retried_while_the_provider_is_unavailable(tmp_path, fast_job_retries):
+    async def scenario():
+        ai_service = StubAIService(unavailable=2)
+        queue = make_queue(tmp_path, ai_service=ai_service)
+        await queue.start()
+        try:
+            job = await queue.submit(REQUEST)
+            finished = await queue.get(job.job_id, wait=5)
+        finally:
+            await queue.stop()
+        assert finished.status == JobStatus.COMPLETED
+        assert finished.error is None
+        assert (ai_service.calls, queue.retries) == (3, 2)
+        assert queue._attempts == {}
+    
+    asyncio.run(scenario())
+
+
+def test_jobs_fail_once_retry_attempts_are_used_up(tmp_path, fast_job_retries):
+    async def scenario():
+        ai_service = StubAIService(unavailable=10)
+        queue = make_queue(tmp_path, ai_service=ai_service)
+        await queue.start()
+        try:
+            job = await queue.submit(REQUEST)
+            finished = await queue.get(job.job_id, wait=5)
+        finally:
+            await queue.stop()
+        assert finished.status == JobStatus.FAILED
+        assert "gave up after 3 attempts" in finished.error
+        assert ai_service.calls == 3
+    
+    asyncio.run(scenario())
+
+
+def test_prune_deletes_only_old_finished_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "job_retention_seconds", 3600)
+    
+    async def scenario():
+        queue = make_queue(tmp_path)
+        store = queue.store
+        old_completed, old_failed, recent, pending = [(await queue.submit(REQUEST)).job_id for _ in range(4)]
+        for job_id in (old_completed, recent):
+            await queue._run_job(job_id)
+        store.mark_failed(old_failed, "boom")
+        for job_id in (old_completed, old_failed):
+            store._update(job_id, completed_at=time.time() - 7200)
+        
+        assert await queue.prune() == 2
+        assert store.get(old_completed) is None and store.get(old_failed) is None
+        assert store.get(recent).status == JobStatus.COMPLETED
+        assert store.get(pending).status == JobStatus.PENDING
+        assert (await queue.get_stats())["pruned"] == 2
+    
+    asyncio.run(scenario())
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import time
+
+import anthropic
+import httpx
+import openai
+import pytest
+
+from app.core.config import settings
+from app.services import llm_providers
+from app.services.llm_providers import AnthropicProvider, OpenAIProvider, close_http_client, get_http_client
+
+
+def openai_completion(content="{}", prompt_tokens=100, cached_tokens=0):
+    return {
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 5, "total_tokens": prompt_tokens + 5,
+                  "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+    }
+
+
+def anthropic_message(input_tokens=10, cache_read=0, cache_write=0):
+    return {
+        "id": "msg_1", "type": "message", "role": "assistant", "model": "claude-3-haiku-20240307",
+        "content": [{"type": "text", "text": "{}"}], "stop_reason": "end_turn", "stop_sequence": None,
+        "usage": {"input_tokens": input_tokens, "output_tokens": 5,
+                  "cache_read_input_tokens": cache_read, "cache_creation_input_tokens": cache_write}
+    }
+
+
+def mock_client(handler):
+    """Pooled-style HTTP client answering every request with handler(request) (may be async)."""
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.fixture(autouse=True)
+def unlimited_providers(monkeypatch):
+    for limit in ("openai_rpm", "openai_tpm", "anthropic_rpm", "anthropic_tpm"):
+        monkeypatch.setattr(settings, limit, 0)
+    yield
+    asyncio.run(close_http_client())
+
+
+def test_http_client_is_shared_until_closed():
+    async def scenario():
+        client = get_http_client()
+        assert get_http_client() is client
+        await close_http_client()
+        assert client.is_closed
+        assert get_http_client() is not client
+    
+    asyncio.run(scenario())
+
+
+def test_providers_use_the_shared_pool_without_sdk_retries():
+    provider = OpenAIProvider("sk-test")
+    assert provider.client._client is get_http_client()
+    assert provider.client.max_retries == 0
+
+
+def test_completions_do_not_block_the_event_loop():
+    async def handler(request):
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json=openai_completion())
+    
+    async def scenario():
+        provider = OpenAIProvider("sk-test")
+        provider.client = openai.AsyncOpenAI(api_key="sk-test", http_client=mock_client(handler), max_retries=0)
+        await provider.complete("warm-up")  # the SDK imports its response types on first use
+        start = time.perf_counter()
+        results = await asyncio.gather(*(provider.complete("prompt") for _ in range(10)))
+        return time.perf_counter() - start, results
+    
+    elapsed, results = asyncio.run(scenario())
+    assert elapsed < 1.0  # ten 0.2s calls overlap instead of running back to back
+    assert [result.text for result in results] == ["{}"] * 10
+
+
+def recording(response_body, requests):
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json=response_body)
+    return handler
+
+
+def test_openai_sends_the_stable_prefix_first_and_reads_cached_tokens():
+    requests = []
+    provider = OpenAIProvider("sk-test")
+    provider.client = openai.AsyncOpenAI(
+        api_key="sk-test", http_client=mock_client(recording(openai_completion(cached_tokens=64), requests)),
+        max_retries=0
+    )
+    result = asyncio.run(provider.complete("schema", system="instructions"))
+    
+    assert [message["role"] for message in requests[0]["messages"]] == ["system", "user"]
+    assert requests[0]["messages"][0]["content"] == "instructions"
+    assert (result.prompt_tokens, result.cached_tokens) == (100, 64)
+    assert provider.get_prompt_cache_stats() == {"calls": 1, "prompt_tokens": 100, "cached_tokens": 64,
+                                                 "cached_ratio": 0.64}
+
+
+@pytest.mark.parametrize("caching", [True, False])
+def test_anthropic_marks_the_prefix_cacheable_and_counts_cache_reads(monkeypatch, caching):
+    monkeypatch.setattr(settings, "prompt_caching_enabled", caching)
+    requests = []
+    provider = AnthropicProvider("sk-ant-test")
+    provider.client = anthropic.AsyncAnthropic(
+        api_key="sk-ant-test", http_client=mock_client(recording(anthropic_message(10, 80, 10), requests)),
+        max_retries=0
+    )
+    result = asyncio.run(provider.complete("schema", system="instructions"))
+    
+    if caching:
+        assert requests[0]["system"] == [{"type": "text", "text": "instructions", "cache_control": {"type": "ephemeral"}}]
+    else:
+        assert requests[0]["system"] == "instructions"
+    # input_tokens excludes cache reads and writes
+    assert (result.prompt_tokens, result.cached_tokens) == (100, 80)
+    assert provider.get_prompt_cache_stats()["cached_ratio"] == 0.8
@@ -0,0 +1,72 @@
+import pytest
+
+from app.core.config import settings
+from app.models.schema import SchemaType, SchemaValidationRequest
+from app.services.model_router import FAST_TIER, STRONG_TIER, ModelRouter
+
+
+class StubProvider:
+    def __init__(self, name, model):
+        self.name = name
+        self.model = model
+
+
+def request(schema_content, schema_type=SchemaType.SQL_DDL):
+    return SchemaValidationRequest(schema_content=schema_content, schema_type=schema_type)
+
+
+def tables(count):
+    return "\n".join(f"CREATE TABLE t{i} (id INT);" for i in range(count))
+
+
+@pytest.fixture(autouse=True)
+def routing(monkeypatch):
+    monkeypatch.setattr(settings, "router_enabled", True)
+    monkeypatch.setattr(settings, "router_score_threshold", 6.0)
+    monkeypatch.setattr(settings, "gpt_model", "gpt-4o")
+    monkeypatch.setattr(settings, "router_fast_model", "gpt-4o-mini")
+    monkeypatch.setattr(settings, "claude_model", "claude-3-sonnet-20240229")
+    monkeypatch.setattr(settings, "claude_fast_model", "claude-3-haiku-20240307")
+
+
+def test_score_weights_relational_schemas_above_others():
+    router = ModelRouter()
+    sql = tables(2)
+    assert router.score(request(sql)) == round((len(sql) / 1000 + 2) * 1.25, 2)
+    
+    avro = '{"type": "record", "name": "A", "fields": []}'
+    assert router.score(request(avro, SchemaType.AVRO)) == round(len(avro) / 1000 + 1, 2)
+
+
+def test_requests_at_or_above_threshold_use_the_strong_model():
+    router = ModelRouter()
+    openai = StubProvider("openai", "gpt-4o")
+    assert router.route(request(tables(2)), openai).tier == FAST_TIER
+    
+    decision = router.route(request(tables(5)), openai)
+    assert decision.complexity_score >= 6.0
+    assert (decision.tier, decision.model) == (STRONG_TIER, "gpt-4o")
+
+
+def test_disabled_router_always_uses_the_strong_model(monkeypatch):
+    monkeypatch.setattr(settings, "router_enabled", False)
+    decision = ModelRouter().route(request(tables(1)), StubProvider("openai", "gpt-4o"))
+    assert (decision.tier, decision.model) == (STRONG_TIER, "gpt-4o")
+
+
+def test_fast_model_is_provider_specific():
+    router = ModelRouter()
+    assert router.route(request(tables(1)), StubProvider("openai", "gpt-4o")).model == "gpt-4o-mini"
+    assert router.route(request(tables(1)), StubProvider("anthropic", "claude-3-sonnet-20240229")).model == \
+        "claude-3-haiku-20240307"
+    assert router.model_for_tier(StubProvider("fake", "fake-schema-analyzer"), FAST_TIER) == "fake-schema-analyzer"
+
+
+def test_identical_tiers_are_reported(monkeypatch):
+    router = ModelRouter()
+    assert router.check_tiers("openai")
+    
+    monkeypatch.setattr(settings, "gpt_model", "gpt-4o-mini")
+    assert not router.check_tiers("openai")
+    assert router.get_config()["tiers_identical"] == {"openai": True, "anthropic": False}
+    assert router.check_tiers("fake")  # single-model provider, nothing to route
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from app.models.schema import Platform, SchemaType
+from app.services.practice_catalog import PracticeCatalog
+
+
+def metadata(schema_types, platforms=(), category="naming"):
+    return {"category": category, "schema_types": json.dumps(list(schema_types)), "platforms": json.dumps(list(platforms))}
+
+
+def ids(practices):
+    return [practice["id"] for practice in practices]
+
+
+@pytest.fixture
+def catalog():
+    catalog = PracticeCatalog()
+    catalog.load(
+        ["general", "venice", "sql_only"],
+        ["General: d", "Venice: d", "SQL: d"],
+        [metadata(["avro", "sql_ddl"]), metadata(["avro"], ["venice"], "schema_evolution"), metadata(["sql_ddl"])]
+    )
+    return catalog
+
+
+def test_practices_are_filtered_by_schema_type_platform_and_category(catalog):
+    assert catalog.loaded
+    assert ids(catalog.practices()) == ["general", "venice", "sql_only"]
+    assert ids(catalog.practices(schema_type=SchemaType.AVRO)) == ["general", "venice"]
+    assert ids(catalog.practices(schema_type=SchemaType.AVRO, platform=Platform.KAFKA)) == ["general"]
+    assert ids(catalog.practices(platform=Platform.VENICE, category="schema_evolution")) == ["venice"]
+
+
+def test_put_replaces_and_remove_unindexes(catalog):
+    catalog.put("general", "General: changed", metadata(["protobuf"]))
+    assert ids(catalog.practices(schema_type=SchemaType.AVRO)) == ["venice"]
+    assert catalog.get("general")["content"] == "General: changed"
+    
+    assert catalog.remove("venice")
+    assert not catalog.remove("venice")
+    assert catalog.get_stats()["by_platform"] == {}
+
+
+@pytest.mark.parametrize("bad_metadata", [
+    {"schema_types": "not json"},
+    {"schema_types": 3},
+    {"schema_types": json.dumps({"avro": True})},
+    {"schema_types": json.dumps(["avro"]), "platforms": json.dumps([1])},
+    None,
+])
+def test_malformed_metadata_is_listed_but_never_matched(catalog, bad_metadata):
+    catalog.put("broken", "Broken: d", bad_metadata)
+    assert "broken" in ids(catalog.practices())
+    assert "broken" not in ids(catalog.practices(schema_type=SchemaType.AVRO))
+
+
+def test_failed_load_leaves_catalog_empty_and_not_loaded(catalog):
+    with pytest.raises(ValueError):
+        catalog.load(["a", "b"], ["A: d"], [metadata(["avro"])])
+    assert not catalog.loaded
+    assert len(catalog) == 0
+
+
+def test_vector_store_lists_from_chroma_while_catalog_is_not_loaded():
+    vector_store = pytest.importorskip("app.services.vector_store", exc_type=ImportError)
+    
+    class StubCollection:
+        def __init__(self):
+            self.wheres = []
+        
+        def get(self, where=None, ids=None):
+            self.wheres.append(where)
+            return {"ids": ["naming_001"], "documents": ["Naming: d"],
+                    "metadatas": [{**metadata(["avro"]), "st_avro": True}]}
+    
+    store = vector_store.VectorStoreService.__new__(vector_store.VectorStoreService)
+    store.catalog = PracticeCatalog()
+    store.collection = StubCollection()
+    
+    practices = store.get_all_practices_for_schema_type(SchemaType.AVRO)
+    assert practices == [{"id": "naming_001", "content": "Naming: d", "metadata": metadata(["avro"])}]
+    assert store.collection.wheres == [vector_store.applicability_filter(SchemaType.AVRO)]
+    assert store.has_practice("naming_001")
+
+
+def test_vector_store_searches_chroma_documents_while_catalog_is_not_loaded():
+    vector_store = pytest.importorskip("app.services.vector_store", exc_type=ImportError)
+    
+    class StubCollection:
+        def __init__(self):
+            self.includes = []
+        
+        def query(self, query_embeddings, n_results, where, include):
+            self.includes.append(include)
+            return {"ids": [["naming_001"]], "documents": [["Naming: d"]],
+                    "metadatas": [[{**metadata(["avro"]), "st_avro": True}]], "distances": [[0.25]]}
+    
+    store = vector_store.VectorStoreService.__new__(vector_store.VectorStoreService)
+    store.catalog = PracticeCatalog()
+    store.collection = StubCollection()
+    store._embed_query = lambda query: [0.0]
+    
+    practices = store.search_relevant_practices("naming", SchemaType.AVRO)
+    assert practices == [{"id": "naming_001", "content": "Naming: d", "metadata": metadata(["avro"]), "distance": 0.25}]
+    assert store.collection.includes == [["documents", "metadatas", "distances"]]
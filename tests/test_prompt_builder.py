@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+from app.core.config import settings
+from app.models.schema import Platform, SchemaType, SchemaValidationRequest
+from app.services.prompt_builder import PromptBuilder
+from app.services.rule_engine import RuleReport, RuleResult
+
+
+def practice(practice_id, platforms=(), severity="medium", distance=None):
+    entry = {
+        "id": practice_id,
+        "content": f"{practice_id}: description",
+        "metadata": {
+            "category": "naming",
+            "schema_types": json.dumps(["avro"]),
+            "platforms": json.dumps(list(platforms)),
+            "severity": severity,
+            "examples": json.dumps([])
+        }
+    }
+    if distance is not None:
+        entry["distance"] = distance
+    return entry
+
+
+CORPUS = [
+    practice("general_low", severity="low"),
+    practice("general_high", severity="high"),
+    practice("venice_only", platforms=["venice"]),
+    practice("kafka_only", platforms=["kafka"]),
+]
+
+
+class StubVectorStore:
+    corpus_version = "v1"
+    
+    def __init__(self, practices, hits=()):
+        self.practices = practices
+        self.hits = list(hits)
+        self.offloaded = []
+    
+    def get_all_practices_for_schema_type(self, schema_type):
+        return self.practices
+    
+    async def run_in_executor(self, func, *args, **kwargs):
+        self.offloaded.append(func.__name__)
+        return func(*args, **kwargs)
+    
+    async def search_relevant_practices_async(self, query, schema_type, platform=None, limit=10):
+        return self.hits
+
+
+def request(platform=None):
+    return SchemaValidationRequest(schema_content='{"type": "record"}', schema_type=SchemaType.AVRO, platform=platform)
+
+
+def ranked_ids(practices, platform=None):
+    return [p["id"] for p in PromptBuilder(StubVectorStore(practices))._rank_practices(practices, request(platform))]
+
+
+def test_platform_requests_drop_other_platforms_and_rank_their_own_first():
+    assert ranked_ids(CORPUS, Platform.VENICE) == ["venice_only", "general_high", "general_low"]
+
+
+def test_requests_without_platform_keep_platform_practices_after_general_ones():
+    assert ranked_ids(CORPUS) == ["general_high", "general_low", "kafka_only", "venice_only"]
+
+
+def test_semantic_hits_rank_by_distance_first():
+    hits = [practice("far", distance=0.9), practice("near", distance=0.1), practice("unscored", severity="high")]
+    assert ranked_ids(hits) == ["near", "far", "unscored"]
+
+
+def test_built_prompt_combines_type_and_semantic_practices_and_reuses_prefix():
+    builder = PromptBuilder(StubVectorStore(CORPUS, hits=[practice("semantic_hit", distance=0.2)]))
+    built = asyncio.run(builder.build(request()))
+    assert "general_high" in built.practices_included
+    assert "semantic_hit" in built.practices_included
+    assert built.prompt_tokens >= built.prefix_tokens > 0
+    
+    again = asyncio.run(builder.build(request()))
+    assert again.system == built.system
+    assert builder.get_stats()["static_hits"] == 1
+
+
+def test_practices_settled_by_rules_are_left_out():
+    report = RuleReport(results=[RuleResult(practice_id="general_high", title="General high", passed=True)])
+    built = asyncio.run(PromptBuilder(StubVectorStore(CORPUS)).build(request(), report))
+    assert "general_high" not in built.practices_included
+    assert "general_low" in built.practices_included
+
+
+def test_context_caches_count_hits_and_are_dropped_when_the_corpus_changes():
+    store = StubVectorStore(CORPUS)
+    builder = PromptBuilder(store)
+    asyncio.run(builder.build(request()))
+    asyncio.run(builder.build(request()))
+    asyncio.run(builder.build(request(Platform.VENICE)))
+    assert store.offloaded == ["get_all_practices_for_schema_type"] * 2  # scans run off the event loop, once per block
+    stats = builder.get_stats()
+    assert (stats["static_hits"], stats["static_misses"], stats["static_blocks"]) == (1, 2, 2)
+    assert stats["rendered_practices"] == len(CORPUS)
+    
+    store.corpus_version = "v2"
+    store.practices = [practice("replacement")]
+    built = asyncio.run(builder.build(request()))
+    assert built.practices_included == ["replacement"]
+    stats = builder.get_stats()
+    assert (stats["corpus_version"], stats["static_misses"], stats["static_blocks"]) == ("v2", 3, 1)
+    assert stats["rendered_practices"] == 1
+
+
+def test_static_blocks_are_bounded(monkeypatch):
+    monkeypatch.setattr(settings, "prompt_static_cache_max_entries", 2)
+    builder = PromptBuilder(StubVectorStore(CORPUS))
+    for platform in (None, Platform.VENICE, Platform.KAFKA):
+        asyncio.run(builder.build(request(platform)))
+    assert builder.get_stats()["static_blocks"] == 2
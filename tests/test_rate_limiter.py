@@ -0,0 +1,64 @@
+import asyncio
+
+from app.services import rate_limiter
+from app.services.rate_limiter import ProviderRateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+    
+    def monotonic(self):
+        return self.now
+    
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket_refills_at_its_per_minute_rate(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    bucket = TokenBucket(rate_per_minute=60)
+    
+    bucket.consume(60)
+    assert bucket.time_until_available(1) == 1.0
+    clock.now += 0.5
+    assert bucket.time_until_available(1) == 0.5
+    clock.now += 0.5
+    assert bucket.time_until_available(1) == 0.0
+
+
+def test_requests_larger_than_capacity_wait_for_a_full_bucket(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    bucket = TokenBucket(rate_per_minute=60)
+    bucket.consume(30)
+    assert bucket.time_until_available(1000) == 30.0
+
+
+def test_limiter_throttles_callers_over_the_request_rate(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", clock.sleep)
+    
+    async def scenario():
+        limiter = ProviderRateLimiter(requests_per_minute=2, tokens_per_minute=0)
+        for _ in range(3):
+            await limiter.acquire()
+        return limiter.get_stats()
+    
+    stats = asyncio.run(scenario())
+    assert stats["acquired"] == 3
+    assert stats["throttled"] == 1
+    assert stats["total_wait_time"] == 30.0
+    assert stats["tokens_per_minute"] is None
+
+
+def test_unlimited_limiter_never_waits():
+    async def scenario():
+        limiter = ProviderRateLimiter(0, 0)
+        await asyncio.gather(*(limiter.acquire(10_000) for _ in range(50)))
+        return limiter.get_stats()
+    
+    stats = asyncio.run(scenario())
+    assert (stats["acquired"], stats["throttled"]) == (50, 0)
@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.llm_providers import LLMProvider, LLMResult
+from app.services.resilience import FAILOVER_PATH, PRIMARY_PATH, ResilientCaller
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+class ScriptedProvider(LLMProvider):
+    """Provider whose calls follow a script: an exception to raise, or the delay and chunks of an answer."""
+    
+    def __init__(self, name, script):
+        self.name = name
+        super().__init__()
+        self.script = list(script)
+        self.attempts = 0
+    
+    @property
+    def model(self):
+        return f"{self.name}-model"
+    
+    def _next(self):
+        self.attempts += 1
+        step = self.script.pop(0) if len(self.script) > 1 else self.script[0]
+        if isinstance(step, Exception):
+            raise step
+        return step
+    
+    async def _complete(self, system, prompt, max_tokens, timeout, model, json_schema):
+        delay, chunks = self._next()
+        await asyncio.sleep(delay)
+        return LLMResult(provider=self.name, model=model, text="".join(chunks))
+    
+    async def _stream(self, system, prompt, max_tokens, timeout, result, json_schema):
+        delay, chunks = self._next()
+        await asyncio.sleep(delay)
+        for chunk in chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "llm_retry_base_delay", 0.01)
+    monkeypatch.setattr(settings, "llm_max_retries", 2)
+
+
+def complete(provider, model):
+    return provider.complete("prompt", model=model)
+
+
+def stream(provider, model, result):
+    return provider.stream("prompt", model=model, result=result)
+
+
+async def collect(llm_stream):
+    try:
+        return "".join([text async for text in llm_stream])
+    finally:
+        await llm_stream.aclose()
+
+
+def test_transient_errors_are_retried():
+    provider = ScriptedProvider("primary", [ServerError("busy"), (0, ["ok"])])
+    result = asyncio.run(ResilientCaller().call(complete, (provider, provider.model)))
+    assert result.text == "ok"
+    assert result.attempts == 2
+
+
+def test_call_fails_over_to_alternate():
+    primary = ScriptedProvider("primary", [ServerError("down")])
+    alternate = ScriptedProvider("alternate", [(0, ["ok"])])
+    caller = ResilientCaller()
+    result = asyncio.run(caller.call(complete, (primary, primary.model), (alternate, alternate.model)))
+    assert (result.provider, result.path) == ("alternate", FAILOVER_PATH)
+    assert primary.attempts == 3
+    assert caller.failovers == 1
+
+
+def test_timeout_starts_after_the_concurrency_limiter_admits_the_call(monkeypatch):
+    monkeypatch.setattr(settings, "llm_request_timeout", 0.2)
+    
+    async def scenario():
+        provider = ScriptedProvider("primary", [(0.1, ["ok"])])
+        provider.concurrency.limit = 1.0
+        await provider.concurrency.acquire()
+        asyncio.get_running_loop().call_later(0.3, provider.concurrency.release)
+        return await ResilientCaller().call(complete, (provider, provider.model))
+    
+    result = asyncio.run(scenario())
+    assert (result.text, result.attempts) == ("ok", 1)
+
+
+def test_stream_is_retried_and_failed_over_before_the_first_chunk(monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_retries", 1)
+    primary = ScriptedProvider("primary", [ServerError("down")])
+    alternate = ScriptedProvider("alternate", [(0, ["a", "b", "c"])])
+    
+    async def scenario():
+        llm_stream = await ResilientCaller().open_stream(stream, (primary, primary.model), (alternate, alternate.model))
+        return await collect(llm_stream), llm_stream.result
+    
+    text, result = asyncio.run(scenario())
+    assert text == "abc"
+    assert (result.provider, result.text, result.path) == ("alternate", "abc", FAILOVER_PATH)
+    assert primary.attempts == 2
+
+
+def test_stream_first_chunk_timeout_is_retried(monkeypatch):
+    monkeypatch.setattr(settings, "llm_request_timeout", 0.05)
+    provider = ScriptedProvider("primary", [(1.0, ["late"]), (0, ["ok"])])
+    
+    async def scenario():
+        llm_stream = await ResilientCaller().open_stream(stream, (provider, provider.model))
+        return await collect(llm_stream), llm_stream.result
+    
+    text, result = asyncio.run(scenario())
+    assert (text, result.attempts, result.path) == ("ok", 2, PRIMARY_PATH)
+    assert provider.concurrency.in_flight == 0
+
+
+def test_stream_errors_after_the_first_chunk_reach_the_caller():
+    provider = ScriptedProvider("primary", [(0, ["partial", ServerError("dropped")])])
+    
+    async def scenario():
+        llm_stream = await ResilientCaller().open_stream(stream, (provider, provider.model))
+        await collect(llm_stream)
+    
+    with pytest.raises(ServerError):
+        asyncio.run(scenario())
+    assert provider.attempts == 1
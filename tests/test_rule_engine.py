@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from app.models.schema import Platform, SchemaType, SchemaValidationRequest
+from app.services.rule_engine import RULES, RuleEngine
+
+
+def field_names(schema_content, schema_type=SchemaType.SQL_DDL):
+    return [field.name for field in RuleEngine().parse(schema_content, schema_type)[1]]
+
+
+def test_split_keeps_parenthesized_and_generic_types_together():
+    items = RuleEngine()._split_top_level("a DECIMAL(10, 2), b STRUCT<x INT64, y ARRAY<STRING>>, c MAP<STRING, INT64>")
+    assert [item.strip() for item in items] == [
+        "a DECIMAL(10, 2)", "b STRUCT<x INT64, y ARRAY<STRING>>", "c MAP<STRING, INT64>"
+    ]
+
+
+def test_split_ignores_comparisons_in_check():
+    items = RuleEngine()._split_top_level("a INT CHECK (a > 0), b INT, c INT")
+    assert [item.strip() for item in items] == ["a INT CHECK (a > 0)", "b INT", "c INT"]
+
+
+def test_split_ignores_commas_in_comment_literal():
+    items = RuleEngine()._split_top_level("a INT COMMENT 'x, y', b INT")
+    assert [item.strip() for item in items] == ["a INT COMMENT 'x, y'", "b INT"]
+
+
+def test_columns_after_check_default_and_comment_are_parsed():
+    ddl = """
+    CREATE TABLE orders (
+        order_id BIGINT NOT NULL,
+        amount INT CHECK (amount > 0 AND amount < 1000),
+        status VARCHAR(10) DEFAULT 'new, pending)' COMMENT 'it''s, a status',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- user's local time
+        `note, text` STRING
+    );
+    """
+    assert field_names(ddl) == ["order_id", "amount", "status", "created_at", "note, text"]
+
+
+def test_not_null_rule_flags_nullable_id_and_passes_required_columns():
+    ddl = "CREATE TABLE users (user_id INT, email VARCHAR(255) NOT NULL COMMENT 'login email');"
+    report = RuleEngine().evaluate(SchemaValidationRequest(schema_content=ddl, schema_type=SchemaType.SQL_DDL))
+    results = {result.practice_id: result for result in report.results}
+    assert not results["constraints_001"].passed
+    assert "users.user_id" in results["constraints_001"].recommendation.description
+
+
+def test_avro_defaults_rule_only_applies_to_venice():
+    schema = json.dumps({
+        "type": "record", "name": "Member",
+        "fields": [{"name": "member_id", "type": "long", "doc": "Member id"}]
+    })
+    engine = RuleEngine()
+    venice = engine.evaluate(SchemaValidationRequest(schema_content=schema, schema_type=SchemaType.AVRO, platform=Platform.VENICE))
+    kafka = engine.evaluate(SchemaValidationRequest(schema_content=schema, schema_type=SchemaType.AVRO, platform=Platform.KAFKA))
+    assert "venice_001" in venice.settled
+    assert "venice_001" not in kafka.settled
+
+
+def test_unparseable_schema_settles_nothing():
+    report = RuleEngine().evaluate(SchemaValidationRequest(schema_content="{not json", schema_type=SchemaType.JSON_SCHEMA))
+    assert report.settled == []
+
+
+def test_common_short_names_are_not_flagged():
+    ddl = "CREATE TABLE events (event_id INT NOT NULL, ts TIMESTAMP, ce VARCHAR(10));"
+    report = RuleEngine().evaluate(SchemaValidationRequest(schema_content=ddl, schema_type=SchemaType.SQL_DDL))
+    naming = next(result for result in report.results if result.practice_id == "naming_001")
+    assert "events.ce" in naming.recommendation.description
+    assert "events.ts" not in naming.recommendation.description
+
+
+def test_rules_for_practices_missing_from_corpus_are_skipped():
+    ddl = "CREATE TABLE users (user_id INT);"
+    request = SchemaValidationRequest(schema_content=ddl, schema_type=SchemaType.SQL_DDL)
+    engine = RuleEngine()
+    report = engine.evaluate(request, {"naming_001", "naming_002", "documentation_001"})
+    assert "constraints_001" not in report.settled
+    assert "naming_001" in report.settled
+    assert engine.get_stats()["rules_disabled"] == ["constraints_001"]
+
+
+def test_check_corpus_reports_missing_practices():
+    missing = RuleEngine().check_corpus({"naming_001", "naming_002", "constraints_001"})
+    assert missing == ["documentation_001", "venice_001"]
+
+
+def test_rules_reference_seeded_practices():
+    vector_store = pytest.importorskip("app.services.vector_store", exc_type=ImportError)
+    seeded = {practice.id: practice for practice in vector_store.VectorStoreService._get_initial_best_practices(None)}
+    for rule in RULES:
+        assert rule.practice_id in seeded
+        assert seeded[rule.practice_id].category == rule.category
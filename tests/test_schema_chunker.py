@@ -0,0 +1,94 @@
+from app.models.schema import SchemaType
+from app.services.schema_chunker import SchemaChunk, SchemaChunker, merge_chunk_analyses
+
+
+SQL = """-- orders schema
+CREATE TABLE customers (
+    id BIGINT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id BIGINT PRIMARY KEY,
+    customer_id BIGINT
+);
+CREATE INDEX idx_orders_customer ON orders (customer_id);
+"""
+
+PROTO = """syntax = "proto3";
+package shop;
+
+// A customer
+message Customer {
+  string id = 1;
+  message Address {
+    string city = 1;
+  }
+}
+
+enum Status {
+  STATUS_UNSPECIFIED = 0;
+}
+"""
+
+
+def test_sql_is_split_per_statement_keeping_leading_comments():
+    header, units = SchemaChunker().split(SQL, SchemaType.SQL_DDL)
+    assert header == ""
+    assert [unit.name for unit in units] == ["customers", "orders", "idx_orders_customer"]
+    assert units[0].content.startswith("-- orders schema")
+
+
+def test_protobuf_repeats_header_and_keeps_nested_messages_with_parent():
+    chunks = SchemaChunker().chunk(PROTO, SchemaType.PROTOBUF, max_chars=1)
+    assert [chunk.entities for chunk in chunks] == [["Customer"], ["Status"]]
+    for chunk in chunks:
+        assert chunk.content.startswith('syntax = "proto3";\npackage shop;')
+    assert "// A customer" in chunks[0].content
+    assert "message Address" in chunks[0].content
+
+
+def test_json_schema_definitions_become_units():
+    schema = '{"title": "Order", "type": "object", "$defs": {"Item": {"type": "object"}, "Money": {"type": "number"}}}'
+    _, units = SchemaChunker().split(schema, SchemaType.JSON_SCHEMA)
+    assert [unit.name for unit in units] == ["Order", "Item", "Money"]
+
+
+def test_unsplittable_schemas_stay_whole():
+    chunker = SchemaChunker()
+    assert len(chunker.split('{"type": "record", "name": "A"}', SchemaType.AVRO)[1]) == 1
+    assert len(chunker.split("not json", SchemaType.JSON_SCHEMA)[1]) == 1
+    assert len(chunker.split("CREATE TABLE a (id INT);", SchemaType.SQL_DDL)[1]) == 1
+
+
+def test_pack_fills_chunks_greedily_in_order():
+    chunks = SchemaChunker().chunk(SQL, SchemaType.SQL_DDL, max_chars=len(SQL))
+    assert len(chunks) == 1
+    assert chunks[0].entities == ["customers", "orders", "idx_orders_customer"]
+
+    chunks = SchemaChunker().chunk(SQL, SchemaType.SQL_DDL, max_chars=100)
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+    assert sum((chunk.entities for chunk in chunks), []) == ["customers", "orders", "idx_orders_customer"]
+
+
+def test_merge_weights_scores_by_size_and_dedupes_recommendations():
+    small = SchemaChunk(index=0, entities=["a"], content="x" * 10)
+    large = SchemaChunk(index=1, entities=["b"], content="x" * 30)
+    rec = {"category": "naming", "severity": "low", "description": "Use snake_case column names.",
+           "suggestion": "Rename", "impact": "Consistency"}
+    merged = merge_chunk_analyses([
+        (small, {"overall_score": 2, "recommendations": [rec], "best_practices_applied": ["Keys"]}),
+        (large, {"overall_score": 10, "recommendations": [dict(rec, severity="high", description="Use snake_case column names")],
+                 "best_practices_applied": ["keys"]}),
+    ])
+    assert merged["overall_score"] == 8
+    assert len(merged["recommendations"]) == 1
+    assert merged["recommendations"][0]["severity"] == "high"
+    assert merged["best_practices_applied"] == ["Keys"]
+
+
+def test_merge_reports_failed_chunks():
+    done = SchemaChunk(index=0, entities=["a"], content="x")
+    failed = SchemaChunk(index=1, entities=["b", "c"], content="y")
+    merged = merge_chunk_analyses([(done, {"overall_score": 7})], failed_chunks=[failed])
+    assert merged["recommendations"][0]["category"] == "error"
+    assert "1 of 2 schema parts" in merged["recommendations"][0]["description"]
+    assert "b, c" in merged["recommendations"][0]["description"]
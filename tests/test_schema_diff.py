@@ -0,0 +1,70 @@
+from app.models.schema import SchemaType, SchemaValidationResponse
+from app.services.schema_chunker import SchemaChunker
+from app.services.schema_diff import carry_over_analysis, diff_schemas
+
+
+PREVIOUS = """CREATE TABLE customers (id BIGINT PRIMARY KEY);
+CREATE TABLE orders (id BIGINT PRIMARY KEY);
+CREATE TABLE legacy (id INT);
+"""
+
+CURRENT = """CREATE TABLE customers (id BIGINT
+    PRIMARY KEY);
+CREATE TABLE orders (id BIGINT PRIMARY KEY, total NUMERIC);
+CREATE TABLE payments (id BIGINT PRIMARY KEY);
+"""
+
+
+def _recommendation(description, category="naming"):
+    return {"category": category, "severity": "low", "description": description,
+            "suggestion": "Fix it", "impact": "Clarity"}
+
+
+def test_entities_are_classified_ignoring_whitespace():
+    diff, reason = diff_schemas(PREVIOUS, CURRENT, SchemaType.SQL_DDL, SchemaChunker())
+    assert reason is None
+    assert diff.unchanged == ["customers"]
+    assert diff.modified == ["orders"]
+    assert diff.added == ["payments"]
+    assert diff.removed == ["legacy"]
+    assert [unit.name for unit in diff.changed_units] == ["orders", "payments"]
+    assert diff.unchanged_chunk.entities == ["customers"]
+
+
+def test_versions_that_cannot_be_compared_return_a_reason():
+    chunker = SchemaChunker()
+    diff, reason = diff_schemas("CREATE TABLE a (id INT);", CURRENT, SchemaType.SQL_DDL, chunker)
+    assert diff is None and "cannot be split" in reason
+
+    duplicated = "CREATE TABLE a (id INT);\nCREATE TABLE a (id BIGINT);\n"
+    diff, reason = diff_schemas(duplicated, CURRENT, SchemaType.SQL_DDL, chunker)
+    assert diff is None and "not unique" in reason
+
+    proto = 'syntax = "proto3";\nmessage A {}\nmessage B {}\n'
+    diff, reason = diff_schemas(proto, proto.replace("proto3", "proto2"), SchemaType.PROTOBUF, chunker)
+    assert diff is None and "shared declarations" in reason
+
+
+def test_carry_over_keeps_only_findings_about_unchanged_entities():
+    diff, _ = diff_schemas(PREVIOUS, CURRENT, SchemaType.SQL_DDL, SchemaChunker())
+    previous = SchemaValidationResponse(
+        overall_score=6,
+        recommendations=[
+            _recommendation("customers should have a created_at column"),
+            _recommendation("orders lacks a total column"),
+            _recommendation("Drop the LEGACY table"),
+            _recommendation("Local rule finding"),
+            _recommendation("Part failed", category="error"),
+            _recommendation("customers_archive is unused"),
+        ],
+        best_practices_applied=["Primary keys"],
+        missing_best_practices=[],
+        summary="ok"
+    )
+    carried = carry_over_analysis(previous, diff, stale_descriptions={"Local rule finding"})
+    assert [rec["description"] for rec in carried["recommendations"]] == [
+        "customers should have a created_at column",
+        "customers_archive is unused",
+    ]
+    assert carried["overall_score"] == 6
+    assert carried["best_practices_applied"] == ["Primary keys"]
@@ -0,0 +1,38 @@
+import json
+
+from app.services.stream_parser import RecommendationStreamParser
+
+
+def recommendation(description):
+    return {"category": "naming", "severity": "low", "description": description, "suggestion": "s", "impact": "i"}
+
+
+ANALYSIS = json.dumps({
+    "overall_score": 6,
+    "recommendations": [
+        recommendation("braces } and \"quotes\" { inside strings"),
+        {"category": "naming", "severity": "extreme", "description": "d", "suggestion": "s", "impact": "i"},
+        recommendation("second"),
+    ],
+    "best_practices_applied": [],
+    "missing_best_practices": [],
+    "summary": "{not a recommendation}"
+})
+
+
+def test_recommendations_are_emitted_once_as_soon_as_complete():
+    parser = RecommendationStreamParser()
+    emitted = []
+    for i in range(0, len(ANALYSIS), 7):
+        emitted += [rec.description for rec in parser.feed(ANALYSIS[i:i + 7])]
+    
+    assert emitted == ["braces } and \"quotes\" { inside strings", "second"]
+    assert parser.invalid == 1
+    assert parser.done
+    assert parser.buffer == ANALYSIS
+
+
+def test_nothing_is_emitted_before_the_recommendations_array():
+    parser = RecommendationStreamParser()
+    assert parser.feed('{"overall_score": 6, "summary": "{\\"a\\": 1}", ') == []
+    assert [rec.description for rec in parser.feed('"recommendations": [' + json.dumps(recommendation("x")))] == ["x"]
@@ -0,0 +1,48 @@
+import json
+
+from app.services.structured_output import AnalysisOutputParser, analysis_json_schema
+
+
+ANALYSIS = {
+    "overall_score": 7,
+    "recommendations": [{
+        "category": "naming", "severity": "high", "description": "d", "suggestion": "s", "impact": "i"
+    }],
+    "best_practices_applied": ["Use NOT NULL"],
+    "missing_best_practices": [],
+    "summary": "Good"
+}
+
+
+def walk(node):
+    yield node
+    children = node.values() if isinstance(node, dict) else node if isinstance(node, list) else []
+    for child in children:
+        yield from walk(child)
+
+
+def test_schema_has_no_wrappers_or_references():
+    nodes = list(walk(analysis_json_schema()))
+    for keyword in ("allOf", "anyOf", "$ref", "$defs", "title", "minimum", "maximum"):
+        assert not any(isinstance(node, dict) and keyword in node for node in nodes), keyword
+
+
+def test_schema_inlines_severity_enum():
+    severity = analysis_json_schema()["properties"]["recommendations"]["items"]["properties"]["severity"]
+    assert severity == {"type": "string", "enum": ["low", "medium", "high"], "description": "Severity level of the issue"}
+
+
+def test_every_object_is_closed_and_fully_required():
+    for node in walk(analysis_json_schema()):
+        if isinstance(node, dict) and node.get("type") == "object":
+            assert node["additionalProperties"] is False
+            assert node["required"] == list(node["properties"])
+
+
+def test_parser_accepts_plain_and_wrapped_json():
+    parser = AnalysisOutputParser()
+    assert parser.parse(json.dumps(ANALYSIS))["overall_score"] == 7
+    assert parser.parse(f"Here you go:\n{json.dumps(ANALYSIS)}\nThanks")["summary"] == "Good"
+    assert parser.parse(json.dumps({**ANALYSIS, "overall_score": 11})) is None
+    stats = parser.get_stats()
+    assert (stats["parsed"], stats["extracted"], stats["invalid"]) == (1, 1, 1)
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.core.usage import ClientIdMiddleware, UsageTracker, call_cost, set_usage_labels
+
+
+def record_as(tracker, client_id, **usage):
+    """Record one call the way it happens inside a request from client_id."""
+    async def app(scope, receive, send):
+        set_usage_labels("avro", "venice")
+        tracker.record(**{"provider": "openai", "model": "gpt-4o-mini", "prompt_tokens": 1000,
+                          "cached_tokens": 0, "completion_tokens": 100, **usage})
+    
+    headers = [(b"x-client-id", client_id.encode())] if client_id is not None else []
+    asyncio.run(ClientIdMiddleware(app)({"type": "http", "headers": headers}, None, None))
+
+
+def test_call_cost_prices_cached_tokens_separately():
+    cost = call_cost("gpt-4o", prompt_tokens=1_000_000, cached_tokens=500_000, completion_tokens=0)
+    assert cost == pytest.approx(0.5 * 2.5 + 0.5 * 1.25)
+    assert call_cost("no-such-model", 10, 0, 10) is None
+
+
+def test_usage_is_broken_down_by_every_dimension():
+    tracker = UsageTracker()
+    record_as(tracker, "team-a")
+    record_as(tracker, "team-b", model="no-such-model")
+    report = tracker.get_report()
+    
+    assert report["totals"]["calls"] == 2
+    assert report["by_schema_type"]["avro"]["calls"] == 2
+    assert report["by_platform"]["venice"]["calls"] == 2
+    assert set(report["by_client"]) == {"team-a", "team-b"}
+    assert report["unpriced_models"] == ["no-such-model"]
+
+
+def test_client_ids_are_sanitized_and_default_to_anonymous():
+    tracker = UsageTracker()
+    record_as(tracker, "team <a>")
+    record_as(tracker, None)
+    assert set(tracker.get_report()["by_client"]) == {"team__a_", "anonymous"}
+
+
+def test_distinct_clients_are_capped(monkeypatch):
+    monkeypatch.setattr(settings, "usage_max_clients", 3)
+    tracker = UsageTracker()
+    for i in range(10):
+        record_as(tracker, f"client-{i}")
+    record_as(tracker, "client-0")
+    
+    by_client = tracker.get_report()["by_client"]
+    assert set(by_client) == {"client-0", "client-1", "client-2", "other"}
+    assert by_client["other"]["calls"] == 7
+    assert by_client["client-0"]["calls"] == 2
@@ -0,0 +1,153 @@
+import json
+import uuid
+
+import pytest
+
+from app.models.schema import Platform, SchemaType
+from app.services.practice_catalog import PracticeCatalog
+
+chromadb = pytest.importorskip("chromadb")
+vector_store = pytest.importorskip("app.services.vector_store", exc_type=ImportError)
+
+
+def legacy_metadata(schema_types, platforms=()):
+    """Metadata as stored before the filter flags existed."""
+    return {"category": "naming", "severity": "medium", "examples": "[]",
+            "schema_types": json.dumps(list(schema_types)), "platforms": json.dumps(list(platforms))}
+
+
+class CountingCollection:
+    """Chroma collection wrapper counting metadata rewrites."""
+    
+    def __init__(self, collection):
+        self.collection = collection
+        self.updates = 0
+    
+    def update(self, **kwargs):
+        self.updates += 1
+        return self.collection.update(**kwargs)
+    
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+@pytest.fixture
+def store():
+    from chromadb.config import Settings as ChromaSettings
+    
+    client = chromadb.EphemeralClient(settings=ChromaSettings(anonymized_telemetry=False))
+    name = f"practices-{uuid.uuid4().hex[:12]}"
+    collection = client.create_collection(name, embedding_function=None)
+    collection.add(
+        ids=["general", "venice", "kafka", "sql_only", "broken"],
+        documents=["General: d", "Venice: d", "Kafka: d", "SQL: d", "Broken: d"],
+        embeddings=[[1.0, 0.0], [0.9, 0.1], [0.8, 0.2], [0.0, 1.0], [0.5, 0.5]],
+        metadatas=[
+            legacy_metadata(["avro", "sql_ddl"]),
+            legacy_metadata(["avro"], ["venice"]),
+            legacy_metadata(["avro"], ["kafka"]),
+            legacy_metadata(["sql_ddl"]),
+            {**legacy_metadata(["avro"]), "schema_types": "not json"},
+        ]
+    )
+    
+    service = vector_store.VectorStoreService.__new__(vector_store.VectorStoreService)
+    service.collection = CountingCollection(collection)
+    service.catalog = PracticeCatalog()
+    yield service
+    client.delete_collection(name)
+
+
+def matching(store, schema_type, platform=None):
+    where = vector_store.applicability_filter(schema_type, platform)
+    return sorted(store.collection.get(where=where)["ids"])
+
+
+def test_applicability_flags_mark_types_and_platforms():
+    flags = vector_store.applicability_flags(["avro"], [])
+    assert flags["st_avro"] and not flags["st_sql_ddl"]
+    assert flags[vector_store.ALL_PLATFORMS_FLAG]
+    assert not any(flags[vector_store.platform_flag(p)] for p in Platform)
+    
+    flags = vector_store.applicability_flags(["avro"], ["venice"])
+    assert flags["pf_venice"] and not flags["pf_kafka"] and not flags[vector_store.ALL_PLATFORMS_FLAG]
+    assert set(flags) == vector_store.FLAG_KEYS
+
+
+def test_migration_backfills_legacy_metadata_once(store):
+    store._migrate_applicability_flags()
+    assert store.collection.updates == 1
+    
+    metadata = dict(zip(*(store.collection.get()[key] for key in ("ids", "metadatas"))))
+    assert metadata["venice"]["pf_venice"] and not metadata["venice"][vector_store.ALL_PLATFORMS_FLAG]
+    assert metadata["general"]["st_sql_ddl"] and metadata["general"][vector_store.ALL_PLATFORMS_FLAG]
+    assert metadata["venice"]["schema_types"] == json.dumps(["avro"])  # original fields are kept
+    
+    before = store.collection.get()["metadatas"]
+    store._migrate_applicability_flags()
+    assert store.collection.updates == 1
+    assert store.collection.get()["metadatas"] == before
+
+
+def test_filters_match_schema_type_and_platform(store):
+    store._migrate_applicability_flags()
+    assert matching(store, SchemaType.AVRO) == ["general", "kafka", "venice"]
+    assert matching(store, SchemaType.AVRO, Platform.VENICE) == ["general", "venice"]
+    assert matching(store, SchemaType.SQL_DDL, Platform.KAFKA) == ["general", "sql_only"]
+    assert matching(store, SchemaType.PROTOBUF) == []
+
+
+def test_search_applies_the_filter_inside_the_query(store):
+    store._migrate_applicability_flags()
+    store._embed_query = lambda query: [1.0, 0.0]
+    results = store.search_relevant_practices("naming", SchemaType.AVRO, Platform.KAFKA, limit=5)
+    assert [practice["id"] for practice in results] == ["general", "kafka"]
+    assert "pf_kafka" not in results[0]["metadata"]
+
+
+class CountingEmbedding:
+    def __init__(self, name, value):
+        self.MODEL_NAME = name
+        self.value = value
+        self.calls = 0
+    
+    def __call__(self, texts):
+        self.calls += 1
+        return [[self.value, float(len(text))] for text in texts]
+
+
+@pytest.fixture
+def embedding_store():
+    import threading
+    
+    from app.services.cache import LRUCache
+    
+    service = vector_store.VectorStoreService.__new__(vector_store.VectorStoreService)
+    service.embedding_function = CountingEmbedding("model-a", 1.0)
+    service.embedding_model = "model-a"
+    service.embedding_cache = LRUCache(8)
+    service.embedding_hits = service.embedding_misses = 0
+    service.embedding_seconds = service.embedding_seconds_saved = 0.0
+    service._embedding_lock = threading.Lock()
+    return service
+
+
+def test_repeated_queries_reuse_the_embedding(embedding_store):
+    first = embedding_store._embed_query("orders table")
+    assert embedding_store._embed_query("orders table") == first
+    embedding_store._embed_query("customers table")
+    
+    stats = embedding_store.get_embedding_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+    assert stats["hit_ratio"] == pytest.approx(1 / 3, abs=1e-4)
+    assert embedding_store.embedding_function.calls == 2
+
+
+def test_embeddings_are_keyed_by_model(embedding_store):
+    embedding_store._embed_query("orders table")
+    embedding_store.embedding_function = CountingEmbedding("model-b", 2.0)
+    embedding_store.embedding_model = "model-b"
+    
+    assert embedding_store._embed_query("orders table")[0] == 2.0  # not the model-a vector
+    assert embedding_store.embedding_function.calls == 1
+    assert embedding_store.get_embedding_cache_stats()["misses"] == 2